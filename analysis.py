@@ -0,0 +1,662 @@
+import threading
+import numpy as np
+import pandas as pd
+from classification import CLASS_COLUMN, ERROR, INFO, WARNING, add_classes, message_classes
+from loader import concat_frames
+from tracing import span, traced
+
+MIN_COATING_DURATION = pd.Timedelta(minutes=30)  # Shorter coating processes are ignored
+FAIL_WINDOW = pd.Timedelta(seconds=30)  # Errors this close to the end of a coating process led to its failure
+CO_OCCURRENCE_WINDOW = pd.Timedelta(seconds=10)  # Errors of different machines this close happened together
+PAIR_BLOCK = 2 ** 22  # Candidate pairs of errors counted at once by co_occurrences
+NS_PER_DAY = 24 * 3600 * 10 ** 9
+
+# Process kinds
+SETUP, VENTILATION, PUMP_OUT, COATING = range(4)
+PROCESS_COLORS = {SETUP: 'purple', VENTILATION: 'cyan', PUMP_OUT: 'blue', COATING: 'green'}
+
+# (kind, messages starting the process, messages ending the process)
+PROCESS_SEQUENCE = [
+    (SETUP, ["Anlagezustand-BM : Quelle einrichten"], ["Anlagezustand-BM : Belüften", "Anlagezustand-VM : Belüften", "Anlagezustand-BM : Abpumpen", "Anlagezustand-VM : Abpumpen", "Anlagezustand-BM : Prozess starten"]),
+    (VENTILATION, ["Anlagezustand-BM : Belüften", "Anlagezustand-VM : Belüften"], ["Anlagezustand-BM : Quelle einrichten", "Anlagezustand-BM : Abpumpen", "Anlagezustand-VM : Abpumpen", "Anlagezustand-BM : Prozess starten"]),
+    (PUMP_OUT, ["Anlagezustand-BM : Abpumpen", "Anlagezustand-VM : Abpumpen"], ["Anlagezustand-BM : Quelle einrichten", "Anlagezustand-BM : Belüften", "Anlagezustand-VM : Belüften", "Anlagezustand-BM : Prozess starten"]),
+    (COATING, ["Anlagezustand-BM : Prozess starten"], ["Anlagezustand-BM : Prozess beenden", "Anlagezustand-VM : Anfahren Fehlerstatus", "Anlagezustand-BM : Anfahren Fehlerstatus"]),
+]
+# Bits of the state event codes, a message can start and end several process kinds
+START_EVENTS = {kind: 1 << (2 * kind) for kind, _, _ in PROCESS_SEQUENCE}
+END_EVENTS = {kind: 2 << (2 * kind) for kind, _, _ in PROCESS_SEQUENCE}
+
+
+class ProcessSegments:
+    """ Process intervals of one dataset as parallel arrays, built once per load by segment_processes """
+    def __init__(self, start, end, kind, end_row, open_row, open_start, end_events):
+        self.start = start  # datetime64[ns] of the starting message
+        self.end = end  # datetime64[ns] of the ending message
+        self.kind = kind  # One of SETUP, VENTILATION, PUMP_OUT, COATING
+        self.end_row = end_row  # Row position of the ending message
+        self.open_row = open_row  # Kind -> row position of the start of the process still running at the end of the data, -1 if none
+        self.open_start = open_start  # Kind -> start time of this process, NaT if none
+        self.end_events = end_events  # Times of all messages ending a coating process, with or without a start
+
+    @classmethod
+    def empty(cls):
+        no_times = np.zeros(0, dtype='datetime64[ns]')
+        return cls(no_times, no_times, np.zeros(0, dtype=np.int8), np.zeros(0, dtype=np.int64),
+                   {kind: -1 for kind, _, _ in PROCESS_SEQUENCE},
+                   {kind: np.datetime64('NaT', 'ns') for kind, _, _ in PROCESS_SEQUENCE}, no_times)
+
+    def __len__(self):
+        return len(self.start)
+
+    def intervals(self, kind, min_duration=None):
+        """ Return the (start, end) arrays of one process kind """
+        selected = self.kind == kind
+        if min_duration is not None:
+            selected &= (self.end - self.start) >= min_duration
+        return self.start[selected], self.end[selected]
+
+    def coating(self):
+        """ Return the (start, end) arrays of the coating processes which last long enough to count """
+        return self.intervals(COATING, MIN_COATING_DURATION)
+
+    def coating_ends(self):
+        return self.coating()[1]
+
+    def extend(self, data, first_row, offset=0):
+        """
+        Return the segments with the rows of data from first_row on added, processes still open are carried over.
+        data holds the rows from offset on; a process which started before offset takes its start from open_start.
+        """
+        times = data['TimeString'].to_numpy(dtype='datetime64[ns]')
+        events = state_events(data['MsgText'].iloc[first_row - offset:])
+        starts, ends, kinds, end_rows = [self.start], [self.end], [self.kind], [self.end_row]
+        open_row, open_start = {}, {}
+        end_events = self.end_events
+
+        for kind, start_messages, end_messages in PROCESS_SEQUENCE:
+            is_end = (events & END_EVENTS[kind]) != 0
+            start_rows, kind_end_rows, open_row[kind] = pair_events((events & START_EVENTS[kind]) != 0, is_end,
+                                                                    first_row, self.open_row[kind])
+            start_times = times[np.maximum(start_rows - offset, 0)]
+            start_times[start_rows < offset] = self.open_start[kind]
+            starts.append(start_times)
+            ends.append(times[kind_end_rows - offset])
+            kinds.append(np.full(len(start_rows), kind, dtype=np.int8))
+            end_rows.append(kind_end_rows)
+            if open_row[kind] < 0:
+                open_start[kind] = np.datetime64('NaT', 'ns')
+            else:
+                open_start[kind] = times[open_row[kind] - offset] if open_row[kind] >= offset else self.open_start[kind]
+            if kind == COATING:
+                end_events = np.concatenate((end_events, times[first_row - offset:][is_end]))
+
+        # Sort by end row so every kind is in chronological order of the data
+        end_row = np.concatenate(end_rows)
+        order = np.argsort(end_row, kind='stable')
+        return ProcessSegments(np.concatenate(starts)[order], np.concatenate(ends)[order], np.concatenate(kinds)[order],
+                               end_row[order], open_row, open_start, end_events)
+
+
+def message_events(messages):
+    """ State event code of every distinct message: the START_EVENTS and END_EVENTS bits of the processes it starts and ends """
+    codes = np.zeros(len(messages), dtype=np.uint8)
+    for i, message in enumerate(messages):
+        if not isinstance(message, str):
+            continue
+        for kind, start_messages, end_messages in PROCESS_SEQUENCE:
+            if any(pattern in message for pattern in start_messages):
+                codes[i] |= START_EVENTS[kind]
+            if any(pattern in message for pattern in end_messages):
+                codes[i] |= END_EVENTS[kind]
+    return codes
+
+
+def state_events(texts):
+    """
+    State event code of every row of a text column. The patterns are only matched against the distinct messages,
+    a few hundred, and the codes taken per row, so the cost of matching does not grow with the rows.
+    """
+    if isinstance(texts.dtype, pd.CategoricalDtype):
+        codes, messages = texts.cat.codes.to_numpy(), texts.cat.categories
+    else:
+        codes, messages = pd.factorize(texts)
+    return np.append(message_events(messages), 0)[codes]  # Code -1 (missing text) takes the last entry
+
+
+def message_counts(texts):
+    """
+    texts.value_counts() counted on the categorical codes: only messages which occur, in the same order
+    as the count of a text column (by count, ties by first occurrence)
+    """
+    if not isinstance(texts.dtype, pd.CategoricalDtype):
+        return texts.value_counts()
+    codes = texts.cat.codes.to_numpy()
+    codes = codes[codes >= 0]
+    present, first = np.unique(codes, return_index=True)
+    present = present[np.argsort(first)]
+    counts = np.bincount(codes, minlength=len(texts.cat.categories))[present]
+    index = pd.Index(np.asarray(texts.cat.categories)[present], dtype=object, name=texts.name)
+    return pd.Series(counts, index=index, name='count').sort_values(ascending=False)
+
+
+def pair_events(is_start, is_end, first_row=0, open_row=-1):
+    """
+    Pair start and end rows the way a row-by-row scan would: a start row (re)opens the process,
+    the next end row closes it. The rows are numbered from first_row on, open_row is an earlier start which is still open.
+    Return the row numbers of the closed pairs and of the start still open afterwards (-1 if none).
+    """
+    positions = np.arange(first_row, first_row + len(is_start))
+    last_start = np.maximum.accumulate(np.where(is_start, positions, open_row)) if len(is_start) else positions
+    end_rows = positions[is_end]
+    no_end = open_row - 1 if open_row >= 0 else first_row - 1
+    previous_end = np.concatenate(([no_end], end_rows[:-1]))
+    candidate_starts = last_start[end_rows - first_row]
+    closed = candidate_starts > previous_end
+    last_start_row = last_start[-1] if len(last_start) else open_row
+    last_end = end_rows[-1] if len(end_rows) else no_end
+    still_open = last_start_row if last_start_row > last_end else -1
+    return candidate_starts[closed], end_rows[closed], still_open
+
+
+@traced('segment_processes')
+def segment_processes(data):
+    """ Find the set up, ventilation, pump out and coating intervals of a dataset in one vectorized pass per kind """
+    return ProcessSegments.empty().extend(data, 0)
+
+
+def error_mask(data):
+    """ Errors and warnings which became active (StateAfter 1) """
+    return (message_classes(data) != INFO) & (data['StateAfter'] == 1).to_numpy()
+
+
+def warning_mask(data):
+    return (message_classes(data) == WARNING) & (data['StateAfter'] == 1).to_numpy()
+
+
+def fail_error_mask(data):
+    """ Errors which can make a coating process fail, i.e. active errors which are not warnings """
+    return (message_classes(data) == ERROR) & (data['StateAfter'] == 1).to_numpy()
+
+
+def daily_error_counts(data):
+    """ Amount of every active error or warning per (date, message) of one machine """
+    errors = data.iloc[np.flatnonzero(error_mask(data))]
+    dates = errors['TimeString'].dt.normalize().rename('Date')
+    messages = errors['MsgText'].astype(object).rename('Error Message')
+    return errors.groupby([dates, messages], sort=False).size()
+
+
+@traced('common_errors')
+def common_errors(frames):
+    """ Errors which occurred on the same date on every machine, with the smallest amount among them """
+    counts = pd.concat([daily_error_counts(data) for data in frames], axis=1, keys=range(len(frames))).sort_index()
+    if counts.empty:
+        return pd.DataFrame({'Date': pd.Series(dtype='datetime64[ns]'), 'Error Message': pd.Series(dtype=object),
+                             'Count': pd.Series(dtype=np.int64)})
+    values = counts.to_numpy(dtype=float)
+    keep = ~np.isnan(values).any(axis=1)  # A machine without the error that date counts 0
+    minimum = np.nanmin(values, axis=1)  # Every row has a count of at least one machine
+    return pd.DataFrame({'Date': counts.index.get_level_values(0)[keep], 'Error Message': counts.index.get_level_values(1)[keep],
+                         'Count': minimum[keep].astype(np.int64)})
+
+
+@traced('co_occurrences')
+def co_occurrences(frames, machines, window=CO_OCCURRENCE_WINDOW):
+    """
+    Pairs of active errors or warnings of two different machines within +-window of each other, ranked by how often
+    they occurred together. The error times of all machines are merged into one sorted array; the partners of every
+    error are the ones up to window later, found by binary search, so the cost grows with the pairs found and not
+    with the product of the errors of the machines. Offset is the mean time from message A to message B.
+    """
+    times, machine, texts = [], [], []
+    for i, data in enumerate(frames):
+        errors = data.iloc[np.flatnonzero(error_mask(data) & data['MsgText'].notna().to_numpy())]
+        times.append(errors['TimeString'].to_numpy(dtype='datetime64[ns]').view(np.int64))
+        machine.append(np.full(len(errors), i, dtype=np.int64))
+        texts.append(errors['MsgText'].astype(object).to_numpy())
+    order = np.argsort(np.concatenate(times), kind='stable')  # Merges the sorted runs of the machines
+    times, machine = np.concatenate(times)[order], np.concatenate(machine)[order]
+    messages, vocabulary = pd.factorize(np.concatenate(texts)[order])
+    size = max(len(vocabulary), 1)
+    nodes = machine * size + messages  # (machine, message) as one number
+    node_count = len(frames) * size
+
+    # Error i pairs with the errors after it up to row hi[i], counted in blocks of about PAIR_BLOCK pairs
+    hi = np.searchsorted(times, times + _ns(window), side='right')
+    pairs = np.cumsum(hi - np.arange(len(times)) - 1)
+    total = int(pairs[-1]) if len(pairs) else 0
+    bounds = np.unique(np.concatenate(([0], np.searchsorted(pairs, np.arange(PAIR_BLOCK, total, PAIR_BLOCK)) + 1, [len(times)])))
+    keys, counts, sums = [], [], []
+    for first, last in zip(bounds[:-1], bounds[1:]):
+        rows = np.arange(first, last)
+        left = np.repeat(rows, hi[first:last] - rows - 1)
+        right = _ranges(rows + 1, hi[first:last])
+        other = machine[left] != machine[right]
+        left, right = left[other], right[other]
+        swap = nodes[left] > nodes[right]  # Every pair is counted as (smaller node, larger node)
+        a, b = np.where(swap, nodes[right], nodes[left]), np.where(swap, nodes[left], nodes[right])
+        offset = np.where(swap, times[left] - times[right], times[right] - times[left])
+        unique, inverse = np.unique(a * node_count + b, return_inverse=True)
+        keys.append(unique)
+        counts.append(np.bincount(inverse, minlength=len(unique)))
+        sums.append(np.bincount(inverse, weights=offset, minlength=len(unique)))
+
+    unique, inverse = np.unique(np.concatenate(keys) if keys else np.zeros(0, dtype=np.int64), return_inverse=True)
+    count = np.bincount(inverse, weights=np.concatenate(counts), minlength=len(unique)) if keys else np.zeros(0)
+    offset = np.bincount(inverse, weights=np.concatenate(sums), minlength=len(unique)) if keys else np.zeros(0)
+    a, b = unique // max(node_count, 1), unique % max(node_count, 1)
+    names, vocabulary = np.asarray(machines, dtype=object), np.append(np.asarray(vocabulary, dtype=object), '')
+    result = pd.DataFrame({
+        'Machine A': names[a // size], 'Error Message A': vocabulary[a % size],
+        'Machine B': names[b // size], 'Error Message B': vocabulary[b % size],
+        'Count': count.astype(np.int64),
+        'Offset (s)': np.divide(offset, count, out=np.zeros(len(count)), where=count > 0) / 1e9,
+    })
+    return result.sort_values('Count', ascending=False, kind='stable', ignore_index=True)
+
+
+class Timeline:
+    """ What the lane of a machine shows: its process intervals and the times of its warnings and errors """
+    def __init__(self, start, end, kind, warnings, errors):
+        self.start = start  # datetime64[ns], coating processes only if they last long enough to count
+        self.end = end
+        self.kind = kind
+        self.warnings = warnings  # Sorted int64 nanoseconds of the active warnings
+        self.errors = errors  # and of the other active errors
+        # Nanoseconds of the first and the last thing to show, None if there is nothing
+        firsts = [times.min() for times in (start.view(np.int64), warnings, errors) if len(times)]
+        lasts = [times.max() for times in (end.view(np.int64), warnings, errors) if len(times)]
+        self.first = int(min(firsts)) if firsts else None
+        self.last = int(max(lasts)) if lasts else None
+
+
+@traced('machine_timeline')
+def machine_timeline(data):
+    """ Timeline of the messages of one machine, in any order """
+    data = sort_by_time(data)
+    segments = segment_processes(data)
+    counted = (segments.kind != COATING) | ((segments.end - segments.start) >= MIN_COATING_DURATION)
+    times = data['TimeString'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+    is_warning = warning_mask(data)
+    return Timeline(segments.start[counted], segments.end[counted], segments.kind[counted],
+                    times[is_warning], times[error_mask(data) & ~is_warning])
+
+
+def sort_by_time(data):
+    """ Stable sort by TimeString, messages of the same time keep the order of the file """
+    if data['TimeString'].is_monotonic_increasing:
+        return data
+    return data.sort_values(by='TimeString', kind='stable', ignore_index=True)
+
+
+class TimeIndex:
+    """ Binary search over the int64 nanoseconds of a TimeString column, the data must be sorted by time """
+    def __init__(self, data=None, times=None):
+        if times is None:
+            times = data['TimeString'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+            if len(times) and (np.diff(times) < 0).any():
+                raise ValueError("TimeIndex needs data sorted by TimeString")
+        self.times = times
+
+    def __len__(self):
+        return len(self.times)
+
+    def slice(self, lo, hi):
+        """ Return the index of the rows [lo, hi), matching data.iloc[lo:hi] """
+        return TimeIndex(times=self.times[lo:hi])
+
+    def days(self):
+        """ Return the dates (datetime64[D], ascending) of the messages and the row range [lo, hi) of every date """
+        days = self.times // NS_PER_DAY
+        lo = np.flatnonzero(np.diff(days, prepend=days[:1] - 1)) if len(days) else np.zeros(0, dtype=np.int64)
+        hi = np.append(lo[1:], len(days))
+        return days[lo].astype('datetime64[D]'), lo, hi
+
+    def window_bounds(self, anchors, window, rows=None):
+        """
+        Return for every anchor the range [lo, hi) of the rows within +-window.
+        With rows only these row positions (sorted ascending) are searched and lo, hi index into rows.
+        """
+        times = self.times if rows is None else self.times[rows]
+        anchors = _ns(anchors)
+        lo = np.searchsorted(times, anchors - _ns(window), side='left')
+        hi = np.searchsorted(times, anchors + _ns(window), side='right')
+        return lo, hi
+
+
+def _ns(value):
+    """ Nanoseconds as int64 of a timestamp, timedelta or array of them """
+    if isinstance(value, np.ndarray):
+        return value.astype('datetime64[ns]').view(np.int64) if value.dtype.kind == 'M' else value.astype(np.int64)
+    if isinstance(value, (pd.Timedelta, np.timedelta64)):
+        return pd.Timedelta(value).value
+    return pd.Timestamp(value).value
+
+
+def _ranges(lo, hi):
+    """ Concatenation of np.arange(lo[i], hi[i]) for all i without a Python loop """
+    lengths = np.maximum(hi - lo, 0)
+    total = int(lengths.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+    block_starts = np.cumsum(lengths) - lengths
+    return np.repeat(lo - block_starts, lengths) + np.arange(total)
+
+
+class History:
+    """
+    Alarm messages sorted by time together with the arrays derived from them. The process segments are found
+    once per load, everything else is computed on first use and kept until the data changes; version counts
+    the changes so views can tell whether they are up to date. The results are computed and kept under a lock, as the
+    days are also prepared by a background thread (see prefetch_day).
+    """
+    def __init__(self, data, segments=None, time_index=None):
+        self.data = data if CLASS_COLUMN in data.columns else add_classes(data)
+        self.time_index = time_index if time_index is not None else TimeIndex(data)
+        self.segments = segments if segments is not None else segment_processes(data)
+        self.version = 0
+        self._error_rows = None
+        self._error_counts = None
+        self._fail_candidates = None
+        self._coating_windows = None
+        self._results = {}
+        self._ranges = {}  # Date -> History of that day
+        self._days = None
+        self._lock = threading.RLock()  # Reentrant, a result is computed from others under the same lock
+
+    def _memo(self, key, compute):
+        with self._lock:
+            if key not in self._results:
+                with span(key, rows=len(self.data)):
+                    self._results[key] = compute()
+            return self._results[key]
+
+    def __len__(self):
+        return len(self.data)
+
+    def days(self):
+        """ Dict of every date with messages (datetime64[D]) to its row range [lo, hi), built once """
+        with self._lock:
+            if self._days is None:
+                days, lo, hi = self.time_index.days()
+                self._days = dict(zip(days, zip(lo, hi)))
+            return self._days
+
+    def day(self, date):
+        """
+        Return the messages of one date as a History without copying the data, sliced by the day index. It shares the
+        process segments of this history, so processes reaching into the day are kept whole. The day is kept with
+        its results until the data changes.
+        """
+        date = np.datetime64(date, 'D')
+        with self._lock:
+            if date not in self._ranges:
+                lo, hi = self.days().get(date, (0, 0))
+                self._ranges[date] = History(self.data.iloc[lo:hi], self.segments, self.time_index.slice(lo, hi))
+            return self._ranges[date]
+
+    def prefetch_day(self, date):
+        """ Compute everything the day views show of a date, so showing it later takes no time """
+        day = self.day(date)
+        day.errors()
+        day.error_counts()
+        day.end_event_fail_data()
+
+    def time_range(self):
+        """ Times of the first and the last message, None for an empty history """
+        if not len(self):
+            return None, None
+        return pd.Timestamp(self.time_index.times[0]), pd.Timestamp(self.time_index.times[-1])
+
+    def within(self, times):
+        """ Return which of the times lie in the time range of this history """
+        if not len(self):
+            return np.zeros(len(times), dtype=bool)
+        return (_ns(times) >= self.time_index.times[0]) & (_ns(times) <= self.time_index.times[-1])
+
+    def error_rows(self):
+        """ Row positions of the active errors and warnings """
+        with self._lock:
+            if self._error_rows is None:
+                self._error_rows = np.flatnonzero(error_mask(self.data))
+            return self._error_rows
+
+    def errors(self):
+        """ Active errors and warnings in chronological order """
+        return self.data.iloc[self.error_rows()]
+
+    def error_counts(self):
+        """ Amount of every active error or warning message, most frequent first """
+        with self._lock:
+            if self._error_counts is None:
+                with span('error_counts', rows=len(self.data)):
+                    self._error_counts = message_counts(self.errors()['MsgText'])
+            return self._error_counts
+
+    def fail_candidates(self):
+        """ Row positions of the errors which can make a process fail """
+        with self._lock:
+            if self._fail_candidates is None:
+                self._fail_candidates = np.flatnonzero(fail_error_mask(self.data))
+            return self._fail_candidates
+
+    def coating_windows(self):
+        """ End times of the counted coating processes and the ranges [lo, hi) of fail candidates around them """
+        with self._lock:
+            if self._coating_windows is None:
+                ends = self.segments.coating_ends()
+                ends = ends[self.within(ends)]
+                self._coating_windows = (ends,) + self.time_index.window_bounds(ends, FAIL_WINDOW, self.fail_candidates())
+            return self._coating_windows
+
+    def fail_data(self):
+        """ Fail errors within +-FAIL_WINDOW of the end of every counted coating process, one block per process """
+        def compute():
+            _, lo, hi = self.coating_windows()
+            return self.data.iloc[self.fail_candidates()[_ranges(lo, hi)]]
+        return self._memo('fail_data', compute)
+
+    def end_event_fail_data(self):
+        """ Fail errors within +-FAIL_WINDOW of every message ending a coating process, no matter how long it was """
+        def compute():
+            anchors = self.segments.end_events[self.within(self.segments.end_events)]
+            lo, hi = self.time_index.window_bounds(anchors, FAIL_WINDOW, self.fail_candidates())
+            return self.data.iloc[self.fail_candidates()[_ranges(lo, hi)]]
+        return self._memo('end_event_fail_data', compute)
+
+    def fail_percentage(self, fail_data):
+        """ Portion of the fail errors to all errors which are not warnings """
+        total_errors = len(self.fail_candidates())
+        return (len(fail_data) / total_errors) * 100 if total_errors > 0 else 0
+
+    def process_statistics(self):
+        """ Return the durations in minutes of all counted coating processes and the amount of failed ones """
+        def compute():
+            starts, ends = self.segments.coating()
+            within = self.within(ends)
+            _, lo, hi = self.coating_windows()
+            return (ends[within] - starts[within]) / np.timedelta64(1, 'm'), int((hi > lo).sum())
+        return self._memo('process_statistics', compute)
+
+    def append(self, new_data):
+        """
+        Add the messages appended to the log, updating only what the new rows change. If they go back in time
+        the history is rebuilt from scratch instead; returns whether the update was incremental.
+        """
+        if not len(new_data):
+            return True
+        with self._lock, span('append', rows=len(new_data)):
+            return self._append(new_data)
+
+    def _append(self, new_data):
+        version = self.version + 1
+        first_row = len(self.data)
+        if CLASS_COLUMN not in new_data.columns:
+            new_data = add_classes(new_data.copy())
+        new_times = new_data['TimeString'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+        data = concat_frames([self.data, new_data])
+        if (np.diff(new_times) < 0).any() or (first_row and new_times[0] < self.time_index.times[-1]):
+            lock = self._lock
+            self.__init__(sort_by_time(data))
+            self._lock = lock
+            self.version = version
+            return False
+
+        self.data = data
+        self.version = version
+        self._results.clear()
+        self._ranges.clear()
+        self._days = None
+        self.time_index = TimeIndex(times=np.concatenate((self.time_index.times, new_times)))
+        self.segments = self.segments.extend(data, first_row)
+        if self._error_rows is not None:
+            new_errors = np.flatnonzero(error_mask(new_data))
+            self._error_rows = np.concatenate((self._error_rows, new_errors + first_row))
+        self._error_counts = None  # Recounted from the error rows, so ties keep the order of a full count
+        if self._fail_candidates is not None:
+            new_candidates = np.flatnonzero(fail_error_mask(new_data)) + first_row
+            self._fail_candidates = np.concatenate((self._fail_candidates, new_candidates))
+        if self._coating_windows is not None:
+            # Only windows reaching into the new rows change
+            old_ends, old_lo, old_hi = self._coating_windows
+            kept = np.searchsorted(_ns(old_ends), new_times[0] - _ns(FAIL_WINDOW), side='left')
+            ends = self.segments.coating_ends()
+            ends = ends[self.within(ends)]
+            lo, hi = self.time_index.window_bounds(ends[kept:], FAIL_WINDOW, self._fail_candidates)
+            self._coating_windows = (ends, np.concatenate((old_lo[:kept], lo)), np.concatenate((old_hi[:kept], hi)))
+        return True
+
+
+class StreamingHistory:
+    """
+    The results of a History computed chunk by chunk, for histories too large to be kept in memory. The chunks must
+    follow each other in time (see loader.stream_rotated). Only aggregates are kept: the error counts, the fail error
+    counts and the process durations, besides the processes still open and the fail candidates which a coating end
+    still to come can reach. The rows of errors() and of fail_data() sorted by time are handed to rows_done(name, rows)
+    as soon as no later chunk can change them, with name 'errors' or 'fail_data'.
+    """
+    def __init__(self, rows_done):
+        self.rows = 0
+        self.segments = ProcessSegments.empty()
+        self._rows_done = rows_done
+        self._times = None  # First and latest time in nanoseconds
+        self._error_counts = {}  # MsgText -> count, in the order of first occurrence like message_counts
+        self._fail_counts = {}
+        self._errors = 0
+        self._fail_errors = 0
+        self._fail_candidates = 0
+        self._tail = None  # Fail candidates within FAIL_WINDOW of the oldest window still open
+        self._anchors = np.zeros(0, dtype=np.int64)  # Ends of the coating processes whose window is still open
+        self._pending = None  # Fail errors of the windows cut, sorted by time, which an open window can still precede
+        self._durations = []
+        self._failed = 0
+
+    def __len__(self):
+        return self.rows
+
+    def add(self, chunk):
+        """ Analyse the next messages, none of them older than the messages added before """
+        if not len(chunk):
+            return
+        if CLASS_COLUMN not in chunk.columns:
+            chunk = add_classes(chunk.copy())
+        times = _ns(chunk['TimeString'].to_numpy(dtype='datetime64[ns]'))
+        if (np.diff(times) < 0).any() or (self._times is not None and times[0] < self._times[1]):
+            raise ValueError("StreamingHistory needs the messages sorted by TimeString")
+        with span('stream chunk', rows=len(chunk)):
+            first_row = self.rows
+            self.segments = self.segments.extend(chunk, first_row, first_row)
+            self.rows += len(chunk)
+            self._times = (times[0] if self._times is None else self._times[0], times[-1])
+
+            errors = chunk.iloc[np.flatnonzero(error_mask(chunk))]
+            self._errors += len(errors)
+            self._count(self._error_counts, errors)
+            self._rows_done('errors', errors)
+
+            candidates = chunk.iloc[np.flatnonzero(fail_error_mask(chunk))]
+            self._fail_candidates += len(candidates)
+            self._tail = candidates if self._tail is None else concat_frames([self._tail, candidates])
+
+            # Coating processes of this chunk, their windows are cut once the rows after them are read
+            segments = self.segments
+            new = (segments.end_row >= first_row) & (segments.kind == COATING)
+            new &= (segments.end - segments.start) >= MIN_COATING_DURATION
+            self._durations.append((segments.end[new] - segments.start[new]) / np.timedelta64(1, 'm'))
+            self._anchors = np.concatenate((self._anchors, _ns(segments.end[new])))
+            self._cut_windows(self._times[1])
+
+    @staticmethod
+    def _count(counts, rows):
+        texts = rows['MsgText'].dropna().astype(object)
+        amounts = texts.value_counts()
+        for text in pd.unique(texts):
+            counts[text] = counts.get(text, 0) + int(amounts[text])
+
+    def _cut_windows(self, latest=None):
+        """
+        Take the fail candidates of every window ending before latest, all windows without latest, and drop the
+        candidates no window still open or to come can reach. The fail errors older than every window still open
+        are final.
+        """
+        if self._tail is None:
+            return
+        window = _ns(FAIL_WINDOW)
+        tail_times = _ns(self._tail['TimeString'].to_numpy(dtype='datetime64[ns]'))
+        done = len(self._anchors) if latest is None else np.searchsorted(self._anchors, latest - window, side='left')
+        lo = np.searchsorted(tail_times, self._anchors[:done] - window, side='left')
+        hi = np.searchsorted(tail_times, self._anchors[:done] + window, side='right')
+        fail_data = self._tail.iloc[_ranges(lo, hi)]
+        self._fail_errors += len(fail_data)
+        self._count(self._fail_counts, fail_data)
+        self._failed += int((hi > lo).sum())
+        self._anchors = self._anchors[done:]
+
+        # Sorted stably, the fail errors of earlier windows come first among the same times like in the full sort
+        pending = fail_data if self._pending is None else concat_frames([self._pending, fail_data])
+        pending = pending.sort_values(by='TimeString', kind='stable')
+        if latest is None:
+            self._rows_done('fail_data', pending)
+            self._pending = None
+            return
+        oldest = min(self._anchors[0] if len(self._anchors) else latest, latest) - window
+        final = np.searchsorted(_ns(pending['TimeString'].to_numpy(dtype='datetime64[ns]')), oldest, side='left')
+        self._rows_done('fail_data', pending.iloc[:final])
+        self._pending = pending.iloc[final:]
+        self._tail = self._tail.iloc[np.searchsorted(tail_times, oldest, side='left'):]
+
+    def finish(self):
+        """ Cut the windows still open, call after the last chunk """
+        self._cut_windows()
+
+    def time_range(self):
+        if self._times is None:
+            return None, None
+        return pd.Timestamp(self._times[0]), pd.Timestamp(self._times[1])
+
+    def error_count(self):
+        """ Amount of active errors and warnings, len(errors()) of a History """
+        return self._errors
+
+    def fail_count(self):
+        """ Amount of fail errors, len(fail_data()) of a History """
+        return self._fail_errors
+
+    def error_counts(self):
+        return self._counts(self._error_counts)
+
+    def fail_counts(self):
+        """ message_counts of the fail errors """
+        return self._counts(self._fail_counts)
+
+    def fail_percentage(self):
+        return (self._fail_errors / self._fail_candidates) * 100 if self._fail_candidates > 0 else 0
+
+    def process_statistics(self):
+        return np.concatenate(self._durations) if self._durations else np.zeros(0), self._failed
+
+    @staticmethod
+    def _counts(counts):
+        index = pd.Index(list(counts), dtype=object, name='MsgText')
+        amounts = np.fromiter(counts.values(), dtype=np.int64, count=len(counts))
+        return pd.Series(amounts, index=index, name='count').sort_values(ascending=False)
@@ -0,0 +1,157 @@
+"""
+Synthetic Fehlerhistorie CSV files in the WinCC layout of the files under Data/, for benchmarks at any size.
+
+Every machine cycle ventilates, sets up the source, pumps out and coats for about an hour and a half, with the
+German state messages of the real machines. Around them run license and status messages, warnings which come and
+go, and sporadic errors; a part of the coating processes ends in the error state after a burst of errors.
+
+    python benchmarks/generate.py 1000000 --output bench_data/1M.csv
+"""
+import argparse
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from loader import OLE_EPOCH, TIME_FORMAT
+
+HEADER = ('"Time_ms";"MsgProc";"StateAfter";"MsgClass";"MsgNumber";"Var1";"Var2";"Var3";"Var4";"Var5";"Var6";'
+          '"Var7";"Var8";"TimeString";"MsgText";"PLC"')
+START = pd.Timestamp('2024-01-01 06:00:00')
+MEAN_GAP_SECONDS = 20.0
+BURST_GAP_SECONDS = 2.0
+CYCLE_ROWS = 400  # Rows per machine cycle, about 2 h 15 min at MEAN_GAP_SECONDS
+FAIL_RATE = 0.15  # Portion of the coating processes ending in the error state
+CHUNK_ROWS = 1000000
+
+# (MsgNumber, MsgClass, MsgProc, PLC, MsgText)
+STATE = (60000, 3, 1, '')
+STATE_SEQUENCE = [  # Row within the cycle, state message
+    (0, "Anlagezustand-VM : Belüften"),
+    (1, "Anlagezustand-BM : Belüften"),
+    (30, "Anlagezustand-BM : Quelle einrichten"),
+    (60, "Anlagezustand-BM : Abpumpen"),
+    (61, "Anlagezustand-VM : Abpumpen"),
+    (100, "Anlagezustand-BM : Bereit für Beschichtung"),
+    (102, "Anlagezustand-BM : Prozess starten"),
+    (103, "Anlagezustand-BM : Prozess läuft"),
+]
+END_ROW = CYCLE_ROWS - 10
+END_MESSAGE = "Anlagezustand-BM : Prozess beenden"
+FAIL_MESSAGES = ["Anlagezustand-BM : Anfahren Fehlerstatus", "Anlagezustand-VM : Anfahren Fehlerstatus"]
+BURST_ROWS = 8  # Errors right before a failed end
+BACKGROUND = [  # (weight, MsgNumber, MsgClass, MsgProc, PLC, MsgText), warnings and errors come (1) and go (0)
+    (25, 240000, 3, 1, '', "License Key nicht verfügbar! WinCC Logging for Runtime Advanced"),
+    (13, 240000, 3, 1, '', "License Key nicht verfügbar! WinCC Recipes for Runtime Advanced"),
+    (13, 240001, 3, 1, '', "Es wurden zu viele Variablen (Powertags) projektiert!"),
+    (8, 60000, 3, 1, '', "Programm Status des BM ist :  2  Programmschritt  ist : 290"),
+    (30, 79, 64, 2, 'AME', "Warnung Differenz der Zugspannungen zwischen Einlauf und Auslauf zu groß"),
+    (2, 174, 64, 2, 'AME', "Warnung, Barathron nicht kalibriert!"),
+    (1, 153, 64, 2, 'AME', "Warnung Filmetrics Kanal 2 nicht kalibriert"),
+    (1, 58, 64, 2, 'BM', "Warnung Bandspeicher Schutzband Einlauf"),
+    (1, 134, 64, 2, 'SM', "Warnung Lifetime Quarz #2 niedrig!"),
+    (1, 49, 64, 2, 'BM', "Fehler Bandspeicher Schutzband Auslauf"),
+    (1, 38, 64, 2, 'BM', "Fehler Bandspeicher Schutzband Einlauf"),
+    (1, 1, 64, 2, 'VM', "Kühlwasserfluss Vorpumpen zu gering"),
+    (1, 9, 64, 2, 'VM', "Kühlwassertemperatur E-Gun zu hoch"),
+    (1, 43, 64, 2, 'BM', "Fehler Bandspeicher Prozessband Einlauf"),
+]
+BURST_ERRORS = [
+    (97, 64, 2, 'VM', "Kühlwasserfluss Drehtiegel 1 zu gering"),
+    (83, 64, 2, 'SM', "Allgemeiner Fehler Filamentheizung Quelle 1"),
+    (128, 64, 2, 'SM', "Allgemeiner Fehler Filamentheizung Quelle 2"),
+    (101, 64, 2, 'VM', "Kühlwasserfluss Joche zu gering"),
+    (3, 64, 2, 'VM', "Kühlwasserfluss Turbopumpen zu gering"),
+]
+
+
+def generate_rows(rows, seed=0, start=START):
+    """ Return the columns of rows synthetic messages as a DataFrame in file order """
+    rng = np.random.default_rng(seed)
+    position = np.arange(rows) % CYCLE_ROWS
+    cycle = np.arange(rows) // CYCLE_ROWS
+    failed = (rng.random(cycle[-1] + 1 if rows else 0) < FAIL_RATE)[cycle]
+
+    # Background messages, then the state sequence, the end of the coating and the error bursts on top
+    weights = np.array([entry[0] for entry in BACKGROUND], dtype=float)
+    catalog = [entry[1:] for entry in BACKGROUND]
+    message = rng.choice(len(BACKGROUND), size=rows, p=weights / weights.sum())
+    state_after = np.where(np.array([number <= 175 for number, *_ in catalog])[message], rng.integers(0, 2, rows), 1)
+
+    def overwrite(mask, entries, choice):
+        nonlocal message, state_after
+        offset = len(catalog)
+        catalog.extend(entries)
+        message = np.where(mask, offset + choice, message)
+        state_after = np.where(mask, 1, state_after)
+
+    for row, text in STATE_SEQUENCE:
+        overwrite(position == row, [STATE + (text,)], 0)
+    overwrite((position == END_ROW) & ~failed, [STATE + (END_MESSAGE,)], 0)
+    overwrite((position == END_ROW) & failed, [STATE + (text,) for text in FAIL_MESSAGES], rng.integers(0, 2, rows))
+    burst = failed & (position >= END_ROW - BURST_ROWS) & (position < END_ROW)
+    overwrite(burst, BURST_ERRORS, rng.integers(0, len(BURST_ERRORS), rows))
+
+    gaps = rng.exponential(MEAN_GAP_SECONDS, rows)
+    gaps[burst | ((position == END_ROW) & failed)] = rng.uniform(0.2, BURST_GAP_SECONDS, int((burst | ((position == END_ROW) & failed)).sum()))
+    times = start + pd.to_timedelta(np.cumsum(gaps) * 1000, unit='ms').round('ms')
+
+    numbers, classes, procs, plcs, texts = (np.array(column, dtype=object) for column in zip(*catalog))
+    return pd.DataFrame({
+        'Time_ms': (times - OLE_EPOCH) / pd.Timedelta(days=1) * 1e6,
+        'MsgProc': procs[message].astype(np.int64),
+        'StateAfter': state_after,
+        'MsgClass': classes[message].astype(np.int64),
+        'MsgNumber': numbers[message].astype(np.int64),
+        'TimeString': times,
+        'MsgText': texts[message],
+        'PLC': plcs[message],
+    })
+
+
+def format_rows(data):
+    """ The CSV lines of generated rows, numbers bare and texts quoted like WinCC writes them """
+    plc = data['PLC'].where(data['PLC'] == '', '"' + data['PLC'] + '"')
+    return (data['Time_ms'].map('{:.4f}'.format) + ';' + data['MsgProc'].astype(str) + ';'
+            + data['StateAfter'].astype(str) + ';' + data['MsgClass'].astype(str) + ';' + data['MsgNumber'].astype(str)
+            + ';;;;;;;;;"' + data['TimeString'].dt.strftime(TIME_FORMAT) + '";"' + data['MsgText'] + '";' + plc)
+
+
+def write_csv(path, rows, seed=0):
+    """ Write a synthetic Fehlerhistorie file of rows messages, generated in chunks so 10M rows fit into memory
+
+    Every chunk has its own seed and goes on from the last time of the chunk before; CHUNK_ROWS is a multiple of
+    CYCLE_ROWS, so the chunks start at the beginning of a cycle.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    start = START
+    with open(path, 'w', encoding='latin1', newline='') as f:
+        f.write(HEADER + '\r\n')
+        for index, first in enumerate(range(0, rows, CHUNK_ROWS)):
+            data = generate_rows(min(CHUNK_ROWS, rows - first), [seed, index], start)
+            f.write('\r\n'.join(format_rows(data)) + '\r\n')
+            start = data['TimeString'].iloc[-1]
+    return path
+
+
+def parse_rows(text):
+    """ Row counts like 100k, 1M or 10M """
+    factors = {'k': 10 ** 3, 'm': 10 ** 6}
+    text = text.strip().lower()
+    return int(float(text[:-1]) * factors[text[-1]]) if text[-1] in factors else int(text)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic Fehlerhistorie CSV file.")
+    parser.add_argument('rows', type=parse_rows, help="amount of messages, e.g. 100k, 1M or 10M")
+    parser.add_argument('-o', '--output', help="file to write, by default bench_data/<rows>.csv")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    print(write_csv(args.output or os.path.join('bench_data', f"{args.rows}.csv"), args.rows, args.seed))
+
+
+if __name__ == '__main__':
+    main()
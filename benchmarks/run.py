@@ -0,0 +1,158 @@
+"""
+Benchmarks of loading, time parsing, process segmentation, fail windows, common and co-occurring errors, the history
+store and canvas rendering on synthetic Fehlerhistorie files (see generate.py). The timings are written as JSON; compared with an
+earlier run, every step which got slower than the tolerance is listed and the exit code is 1.
+
+    python benchmarks/run.py --sizes 100k 1M --output bench.json
+    python benchmarks/run.py --sizes 100k 1M --baseline bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')  # The canvases render with Agg without a display
+from analysis import History, co_occurrences, common_errors, segment_processes, sort_by_time
+from loader import load_csv, parse_time_ms, parse_time_strings, read_csv
+from store import HistoryStore
+from generate import parse_rows, write_csv
+
+DEFAULT_SIZES = ['100k', '1M']
+TOLERANCE = 1.25  # A step is a regression when it takes longer than this factor times the baseline
+MIN_DELTA = 0.05  # and at least this many seconds longer, shorter differences are noise
+
+
+def measure(step, setup=lambda: (), repeat=3):
+    """ Best wall time of step(*setup()) in seconds, setup is not timed """
+    best = float('inf')
+    for _ in range(repeat):
+        arguments = setup()
+        start = time.perf_counter()
+        step(*arguments)
+        best = min(best, time.perf_counter() - start)
+    return round(best, 4)
+
+
+def render(history, start_time, end_time, day_view):
+    from views import BlockDiagramCanvas
+    canvas = BlockDiagramCanvas()
+    canvas.plot(history, start_time, end_time, day_view=day_view, plot_coating_only=not day_view)
+    canvas.close()
+
+
+def benchmark_parsing(path, repeat):
+    """ Time parsing the time columns of the raw file, which is freed again on return """
+    raw = pd.concat(read_csv(path, use_time_ms=True, chunksize=1000000), ignore_index=True)
+    return {'parse_time_strings': measure(parse_time_strings, lambda: (raw['TimeString'],), repeat),
+            'parse_time_ms': measure(parse_time_ms, lambda: (raw['Time_ms'],), repeat)}
+
+
+def benchmark_file(path, repeat):
+    """ Time every step on one file, each on fresh input """
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication([])
+    results = {}
+    results['load'] = measure(lambda: sort_by_time(load_csv(path)), repeat=repeat)
+    results['load_time_ms'] = measure(lambda: sort_by_time(load_csv(path, use_time_ms=True)), repeat=repeat)
+
+    results.update(benchmark_parsing(path, repeat))
+
+    data = sort_by_time(load_csv(path))
+    results['segment_processes'] = measure(segment_processes, lambda: (data,), repeat)
+    segments = segment_processes(data)
+
+    def fail_windows(history):
+        history.fail_data()
+        history.end_event_fail_data()
+        history.process_statistics()
+    results['fail_windows'] = measure(fail_windows, lambda: (History(data, segments),), repeat)
+
+    # Three machines with the same days, as on the Multiple tab
+    machines = [data.iloc[i::3].reset_index(drop=True) for i in range(3)]
+    results['common_errors'] = measure(common_errors, lambda: (machines,), repeat)
+    results['co_occurrences'] = measure(co_occurrences, lambda: (machines, ['A', 'B', 'C']), repeat)
+
+    # Ingested once, the further ingests find the file unchanged
+    with tempfile.TemporaryDirectory() as directory:
+        store = HistoryStore(os.path.join(directory, 'history.sqlite'))
+        results['store_ingest'] = measure(lambda: store.ingest('bench', os.path.dirname(path), [path]), repeat=1)
+        results['store_load'] = measure(lambda: store.load('bench'), repeat=repeat)
+
+    history = History(data, segments)
+    times = data['TimeString']
+    first, last = times.min().normalize(), times.max().normalize() + pd.Timedelta(days=1)
+    day = (first + (last - first) / 2).normalize()
+    render(history, day, day + pd.Timedelta(days=1), True)  # Fonts and the Agg renderer are set up on the first draw
+    results['render_all'] = measure(lambda: render(history, first, last, False), repeat=repeat)
+    results['render_day'] = measure(lambda: render(history, day, day + pd.Timedelta(days=1) - pd.Timedelta(seconds=1), True),
+                                    repeat=repeat)
+    app.processEvents()
+    return results
+
+
+def compare(results, baseline, tolerance=TOLERANCE, min_delta=MIN_DELTA):
+    """ Return the lines describing every step which got slower than the baseline allows """
+    regressions = []
+    for size, steps in results.items():
+        for step, seconds in steps.items():
+            before = baseline.get(size, {}).get(step)
+            if before is not None and seconds > before * tolerance and seconds - before > min_delta:
+                regressions.append(f"{size} rows {step}: {seconds:.3f} s, was {before:.3f} s ({seconds / before:.2f}x)")
+    return regressions
+
+
+def metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {'date': pd.Timestamp.now().isoformat(timespec='seconds'), 'commit': commit, 'python': platform.python_version(),
+            'pandas': pd.__version__, 'numpy': np.__version__, 'machine': platform.machine(), 'cpus': os.cpu_count()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the loaders and analyses on synthetic data.")
+    parser.add_argument('--sizes', nargs='+', default=DEFAULT_SIZES, help="row counts, e.g. 100k 1M 10M")
+    parser.add_argument('--data', default=os.path.join(ROOT, 'bench_data'), help="directory of the generated files")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per step, the best one counts")
+    parser.add_argument('-o', '--output', help="JSON file the results are written to")
+    parser.add_argument('--baseline', help="JSON file of an earlier run to compare with")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    args = parser.parse_args(argv)
+
+    results = {}
+    for size in args.sizes:
+        rows = parse_rows(size)
+        path = os.path.join(args.data, f"{rows}.csv")
+        if not os.path.exists(path):
+            print(f"Generating {path}", flush=True)
+            write_csv(path, rows)
+        results[str(rows)] = benchmark_file(path, 1 if rows >= 10 ** 7 else args.repeat)
+        for step, seconds in results[str(rows)].items():
+            print(f"{rows:>10} {step:<20} {seconds:8.3f} s", flush=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'meta': metadata(), 'results': results}, f, indent=1)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"No step slower than {args.tolerance:.2f}x the baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,177 @@
+import hashlib
+import os
+import sys
+import numpy as np
+import pandas as pd
+from tracing import traced
+
+CACHE_VERSION = 3  # Increase when the stored layout or the parsing changes
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def default_cache_dir():
+    """ Per-user cache directory, ERROR_REPORTER_CACHE overrides it """
+    if os.environ.get('ERROR_REPORTER_CACHE'):
+        return os.environ['ERROR_REPORTER_CACHE']
+    if sys.platform == 'win32':
+        root = os.environ.get('LOCALAPPDATA', os.path.expanduser('~'))
+    else:
+        root = os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(root, 'Error Reporter', 'cache')
+
+
+def file_hash(path, size=None, block_size=1024 * 1024):
+    """ Hash of the file, or of its first size bytes """
+    digest = hashlib.blake2b(digest_size=16)
+    remaining = float('inf') if size is None else size
+    with open(path, 'rb') as f:
+        while remaining > 0:
+            block = f.read(int(min(block_size, remaining)))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+    return digest.hexdigest()
+
+
+def encode_frame(data):
+    """ Split a frame into plain numpy arrays, text columns as codes into their distinct values """
+    arrays = {'__columns': np.array(data.columns, dtype=str)}
+    kinds = []
+    for i, column in enumerate(data.columns):
+        series = data[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            kinds.append('C')
+            arrays[f'col{i}'] = series.cat.codes.to_numpy()
+            arrays[f'col{i}_values'] = np.array(series.cat.categories, dtype=str)
+        elif series.dtype.kind == 'M':
+            kinds.append('M')
+            arrays[f'col{i}'] = series.to_numpy(dtype='datetime64[ns]').view(np.int64)
+        elif series.dtype.kind in 'biuf':
+            kinds.append('N')
+            arrays[f'col{i}'] = series.to_numpy()
+        else:
+            kinds.append('S')
+            codes, uniques = pd.factorize(series)
+            arrays[f'col{i}'] = codes.astype(np.int32)
+            arrays[f'col{i}_values'] = np.array([str(value) for value in uniques], dtype=str)
+    arrays['__kinds'] = np.array(kinds, dtype=str)
+    return arrays
+
+
+def decode_frame(archive):
+    columns = {}
+    for i, (column, kind) in enumerate(zip(archive['__columns'], archive['__kinds'])):
+        values = archive[f'col{i}']
+        if kind == 'C':
+            columns[column] = pd.Categorical.from_codes(values, archive[f'col{i}_values'].astype(object))
+        elif kind == 'M':
+            columns[column] = values.view('datetime64[ns]')
+        elif kind == 'N':
+            columns[column] = values
+        else:
+            uniques = archive[f'col{i}_values'].astype(object)
+            text = uniques[values] if len(uniques) else np.full(len(values), np.nan, dtype=object)
+            text[values < 0] = np.nan
+            columns[column] = text
+    return pd.DataFrame(columns)
+
+
+class FrameCache:
+    """
+    Parsed frames on disk, one .npz file of column arrays per source file and parse options.
+    An entry is valid while the source keeps its size and either its mtime or its content hash.
+    The least recently used entries are removed when the cache grows beyond max_bytes.
+    """
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+
+    def entry_path(self, path, options=''):
+        key = f"{CACHE_VERSION}|{os.path.abspath(path)}|{options}"
+        return os.path.join(self.directory, hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest() + '.npz')
+
+    def fingerprint(self, path, size=None):
+        """
+        Take (path, size, mtime, content hash) of a source before it is parsed.
+        Pass size when only the first size bytes of a growing file are parsed.
+        """
+        stat = os.stat(path)
+        if size is None or size == stat.st_size:
+            return path, stat.st_size, stat.st_mtime_ns, file_hash(path)
+        return path, size, -1, file_hash(path, size)  # Never valid again since the file has grown
+
+    @traced('cache_load')
+    def load(self, path, options=''):
+        """ Return the cached frame of a source or None if there is none or the source changed """
+        entry = self.entry_path(path, options)
+        try:
+            with np.load(entry, allow_pickle=False) as archive:
+                stat = os.stat(path)
+                if int(archive['__size']) != stat.st_size:
+                    raise ValueError("source changed")
+                if int(archive['__mtime']) != stat.st_mtime_ns and str(archive['__hash']) != file_hash(path):
+                    raise ValueError("source changed")
+                data = decode_frame(archive)
+            os.utime(entry)  # Mark as recently used for the eviction
+            return data
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Dropping cache entry of {path}: {e}")
+            self.remove(entry)
+            return None
+
+    def store(self, fingerprint, data, options=''):
+        self.store_arrays(fingerprint, encode_frame(data), options)
+
+    @traced('cache_store')
+    def store_arrays(self, fingerprint, arrays, options=''):
+        """ Store a frame already split by encode_frame """
+        path, size, mtime, content_hash = fingerprint
+        entry = self.entry_path(path, options)
+        arrays = dict(arrays)
+        arrays.update(__size=np.int64(size), __mtime=np.int64(mtime), __hash=np.array(content_hash))
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            temporary = f"{entry}.{os.getpid()}.tmp"
+            with open(temporary, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(temporary, entry)
+            self.evict()
+        except OSError as e:
+            print(f"Could not cache {path}: {e}")
+
+    def entries(self):
+        try:
+            names = [name for name in os.listdir(self.directory) if name.endswith('.npz')]
+        except FileNotFoundError:
+            return []
+        entries = []
+        for name in names:
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime, stat.st_size, os.path.join(self.directory, name)))
+            except FileNotFoundError:
+                pass
+        return sorted(entries)
+
+    def evict(self):
+        """ Remove the least recently used entries until the cache fits into max_bytes """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            self.remove(entry)
+            total -= size
+
+    def remove(self, entry):
+        try:
+            os.remove(entry)
+        except OSError:
+            pass
+
+    def clear(self):
+        for _, _, entry in self.entries():
+            self.remove(entry)
@@ -0,0 +1,87 @@
+import json
+import os
+import numpy as np
+
+# Message classes, stored per row in the Class column
+INFO, WARNING, ERROR = range(3)
+CLASS_NAMES = {'info': INFO, 'warning': WARNING, 'error': ERROR}
+CLASS_COLUMN = 'Class'
+
+PROFILE_NAME = 'profile.json'  # Profile in a machine directory, next to its Fehlerhistorie files
+PROFILE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles')  # Profiles named <machine>.json
+
+# Message numbers or inclusive [first, last] ranges per class; every other number is info. Later classes win,
+# so the warnings among the errors stay warnings.
+DEFAULT_PROFILE = {
+    'error': [[0, 175]],
+    'warning': [[29, 37], [58, 65], [73, 79], [90, 92], [125, 140], [148, 151], [173, 174]],
+}
+
+
+class Classification:
+    """ Class (INFO, WARNING or ERROR) of every message number, as a table indexed directly by MsgNumber """
+    def __init__(self, table):
+        self.table = np.asarray(table, dtype=np.int8)
+
+    @classmethod
+    def from_profile(cls, profile):
+        """ Build the table of a profile like DEFAULT_PROFILE, applying error, warning and then info """
+        rules = []
+        for name in ('error', 'warning', 'info'):
+            for entry in profile.get(name, []):
+                first, last = (entry, entry) if isinstance(entry, int) else entry
+                if first < 0 or last < first:
+                    raise ValueError(f"Invalid {name} message numbers in profile: {entry}")
+                rules.append((CLASS_NAMES[name], first, last))
+        table = np.full(max((last for _, _, last in rules), default=-1) + 1, INFO, dtype=np.int8)
+        for message_class, first, last in rules:
+            table[first:last + 1] = message_class
+        return cls(table)
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls.from_profile(json.load(f))
+
+    def classify(self, numbers):
+        """ Class of every message number, numbers outside the table (or missing) are info """
+        numbers = np.asarray(numbers)
+        classes = np.full(len(numbers), INFO, dtype=np.int8)
+        known = (numbers >= 0) & (numbers < len(self.table))  # False for NaN
+        classes[known] = self.table[numbers[known].astype(np.int64)]
+        return classes
+
+
+DEFAULT_CLASSIFICATION = Classification.from_profile(DEFAULT_PROFILE)
+
+
+def profile_path(source):
+    """
+    Profile of the machine a Fehlerhistorie file or machine directory belongs to: profile.json in the machine
+    directory, else profiles/<machine>.json, else None
+    """
+    directory = os.path.abspath(source if os.path.isdir(source) else os.path.dirname(source))
+    for path in (os.path.join(directory, PROFILE_NAME), os.path.join(PROFILE_DIRECTORY, os.path.basename(directory) + '.json')):
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def machine_classification(source):
+    """ Classification of the machine of a file or directory, DEFAULT_CLASSIFICATION without a profile """
+    path = profile_path(source)
+    return Classification.from_file(path) if path is not None else DEFAULT_CLASSIFICATION
+
+
+def add_classes(data, classification=None):
+    """ Add the Class column to loaded messages, in place, and return them """
+    classification = classification if classification is not None else DEFAULT_CLASSIFICATION
+    data[CLASS_COLUMN] = classification.classify(data['MsgNumber'].to_numpy())
+    return data
+
+
+def message_classes(data):
+    """ Class of every message, from the Class column or by the default profile for frames loaded without it """
+    if CLASS_COLUMN in data.columns:
+        return data[CLASS_COLUMN].to_numpy()
+    return DEFAULT_CLASSIFICATION.classify(data['MsgNumber'].to_numpy())
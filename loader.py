@@ -0,0 +1,419 @@
+import io
+import os
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+from classification import add_classes, profile_path
+from tracing import span, traced
+
+TIME_FORMAT = '%d.%m.%Y %H:%M:%S'
+TIME_FORMAT_NO_SECONDS = '%d.%m.%Y %H:%M'  # Files saved again by Excel lose the seconds
+OLE_EPOCH = pd.Timestamp('1899-12-30')  # Time_ms counts millionths of days since this date (OLE automation date * 1e6)
+TIME_MS_TOLERANCE = pd.Timedelta(minutes=1)  # Time_ms which differs more from TimeString is broken
+TRAILER_PREFIXES = (b'"$RT_', b'$RT_')  # WinCC bookkeeping lines like "$RT_COUNT$", rewritten with every write
+COLUMNS = ['TimeString', 'MsgNumber', 'StateAfter', 'MsgText']  # Columns the analyses use, Time_ms only on request
+# Numbers as float64 since WinCC trailer lines leave them empty, see compact; Time_ms as text since
+# files saved again by Excel contain it with thousands separators. A few hundred distinct messages repeat
+# over all rows, so MsgText is kept as categorical codes.
+COLUMN_DTYPES = {'Time_ms': str, 'StateAfter': 'float64', 'MsgNumber': 'float64', 'TimeString': str, 'MsgText': 'category'}
+INTEGER_DTYPES = {'MsgNumber': 'int32', 'StateAfter': 'int8', 'MsgClass': 'int8'}
+CHUNK_ROWS = 200000
+TIME_RESOLUTIONS_NS = (60 * 10 ** 9, 10 ** 9, 10 ** 6)  # Minute, second and millisecond timestamps
+REORDER_HORIZON = pd.Timedelta(days=1)  # Farthest a file may jump back in time, e.g. after a clock change, when streamed
+
+
+def parse_time_strings(strings):
+    """ Vectorized parsing of TimeString, with and without seconds, unparsable times become NaT """
+    times = pd.to_datetime(strings, format=TIME_FORMAT, errors='coerce')
+    missing = times.isna() & strings.notna()
+    if missing.any():
+        times = times.fillna(pd.to_datetime(strings[missing], format=TIME_FORMAT_NO_SECONDS, errors='coerce'))
+    return times
+
+
+def parse_time_ms(values):
+    """ Convert the numeric Time_ms column of WinCC to datetimes with millisecond resolution """
+    microdays = pd.to_numeric(values, errors='coerce')
+    return (OLE_EPOCH + pd.to_timedelta(microdays / 1e6, unit='D')).dt.round('ms')
+
+
+def time_ms_matches(data, times, sample_size=1000):
+    """ Check on an even sample of rows that Time_ms is numeric and tells the same time as TimeString """
+    step = max(len(data) // sample_size, 1)
+    expected = parse_time_strings(data['TimeString'].iloc[::step])
+    actual = times.iloc[::step]
+    if actual.isna().mean() > 0.01:  # Column mangled, e.g. by saving with thousands separators
+        return False
+    valid = expected.notna() & actual.notna()
+    return valid.any() and bool(((actual[valid] - expected[valid]).abs() <= TIME_MS_TOLERANCE).all())
+
+
+def parse_times(data, use_time_ms=False):
+    """
+    Replace the TimeString column by datetimes and drop the rows without a valid time.
+    With use_time_ms the time is taken from Time_ms, which orders the messages of the same second,
+    as long as the column is numeric and agrees with TimeString.
+    """
+    times = None
+    if use_time_ms and 'Time_ms' in data.columns:
+        times = parse_time_ms(data['Time_ms'])
+        if not time_ms_matches(data, times):
+            times = None
+        elif times.isna().any():
+            times = times.fillna(parse_time_strings(data.loc[times.isna(), 'TimeString']))
+    if times is None:
+        times = parse_time_strings(data['TimeString'])
+
+    data['TimeString'] = times
+    if times.isna().any():
+        data = data[times.notna()].reset_index(drop=True)
+    return data
+
+
+def read_csv(source, use_time_ms=False, chunksize=None):
+    """ Read the used columns of a Fehlerhistorie CSV from a path or binary file object """
+    columns = COLUMNS + ['Time_ms'] if use_time_ms else COLUMNS
+    return pd.read_csv(source, delimiter=';', encoding='latin1', usecols=lambda column: column in columns,
+                       dtype=COLUMN_DTYPES, chunksize=chunksize, on_bad_lines='skip')
+
+
+def compact(data):
+    """
+    Bring parsed rows into the in-memory schema: datetime TimeString, categorical MsgText, narrow integers
+    (once the rows without a time are dropped) and no other columns.
+    """
+    data = data.drop(columns=[column for column in data.columns if column not in COLUMNS and column not in INTEGER_DTYPES])
+    for column, dtype in INTEGER_DTYPES.items():
+        if column in data.columns and not data[column].isna().any():
+            data[column] = data[column].astype(dtype)
+    if not isinstance(data['MsgText'].dtype, pd.CategoricalDtype):
+        data['MsgText'] = data['MsgText'].astype('category')
+    return data
+
+
+def concat_frames(frames):
+    """ pd.concat which keeps categorical columns categorical, with the union of their categories """
+    frames = list(frames)
+    if len(frames) == 1:
+        return frames[0]
+    for column in frames[0].columns:
+        if isinstance(frames[0][column].dtype, pd.CategoricalDtype):
+            categories = union_categoricals([frame[column] for frame in frames]).categories
+            frames = [frame.assign(**{column: frame[column].cat.set_categories(categories)}) for frame in frames]
+    return pd.concat(frames, ignore_index=True)
+
+
+def memory_usage(data):
+    """ Bytes held by a frame, including the text of object and categorical columns """
+    return int(data.memory_usage(index=True, deep=True).sum())
+
+
+def describe_memory(data):
+    return f"{len(data):,} messages, {memory_usage(data) / 2 ** 20:.1f} MB in memory"
+
+
+def load_csv(path, size=None, use_time_ms=False, progress=None):
+    """
+    Load a Fehlerhistorie CSV in a single pass over the file, or over its first size bytes.
+    progress is called with the fraction of bytes consumed after every chunk.
+    """
+    size = os.path.getsize(path) if size is None else size
+    reader = LimitedReader(path, size)
+    with span('read_csv', bytes=size) as trace, io.BufferedReader(reader) as f:
+        chunks = []
+        for chunk in read_csv(f, use_time_ms, chunksize=CHUNK_ROWS):
+            chunks.append(chunk)
+            if progress is not None:
+                progress(reader.consumed / size if size else 1.0)
+        data = concat_frames(chunks)
+        trace.set(rows=len(data))
+    with span('parse_times', rows=len(data)):
+        data = parse_times(data, use_time_ms)
+    with span('compact', rows=len(data)):
+        return compact(data)
+
+
+def read_chunks(path, size=None, use_time_ms=False):
+    """ Parse a Fehlerhistorie CSV chunk by chunk, yield every compacted chunk with the bytes consumed so far """
+    size = os.path.getsize(path) if size is None else size
+    reader = LimitedReader(path, size)
+    with io.BufferedReader(reader) as f:
+        for chunk in read_csv(f, use_time_ms, chunksize=CHUNK_ROWS):
+            yield compact(parse_times(chunk, use_time_ms)), reader.consumed
+
+
+def rotated_files(directory):
+    """ The CSV files a machine rolled its history into, e.g. Fehlerhistorie0.csv and Fehlerhistorie01.csv """
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.lower().endswith('.csv'))
+
+
+def source_signature(path):
+    """ Size and modification time of a file, or of the CSV files of a machine directory, and of the machine profile """
+    paths = rotated_files(path) if os.path.isdir(path) else [path]
+    profile = profile_path(path)
+    return tuple((source, os.stat(source).st_size, os.stat(source).st_mtime_ns)
+                 for source in paths + ([profile] if profile is not None else []))
+
+
+def time_resolution(times):
+    """ Coarsest of minute, second and millisecond of which all times are a multiple, in nanoseconds """
+    ns = times.to_numpy(dtype='datetime64[ns]').view(np.int64)
+    for resolution in TIME_RESOLUTIONS_NS[:-1]:
+        if (ns % resolution == 0).all():
+            return resolution
+    return TIME_RESOLUTIONS_NS[-1]
+
+
+def drop_rotation_duplicates(block, key_columns):
+    """
+    Remove the records which several rotated files contain. Per key, the files keep as many records as the file
+    with most of them: a file contributes only the occurrences beyond the maximum count of the files ranked before.
+    Repeated records within one file are kept.
+    """
+    groups = key_columns + ['__rank']
+    counts = block.groupby(groups, sort=True, dropna=False).size()
+    earlier = counts.groupby(level=key_columns, dropna=False).cummax().groupby(level=key_columns, dropna=False).shift(1)
+    earlier = earlier.fillna(0).reindex(pd.MultiIndex.from_frame(block[groups])).to_numpy()
+    occurrence = block.groupby(groups, sort=False, dropna=False).cumcount().to_numpy()
+    return block[occurrence >= earlier]
+
+
+def merge_rotated(paths, use_time_ms=False, progress=None):
+    """
+    Stream the records of rotated Fehlerhistorie files merged by time, without the records the files share.
+    Every file is read chunk by chunk. The records older than the latest record read from every file are complete,
+    they are de-duplicated on (time, MsgNumber, StateAfter) and yielded in blocks, sorted by time; messages of the same
+    time keep the order of paths. Files which lost their seconds (saved again by Excel) are matched at minute resolution,
+    times from Time_ms are rounded to the second like WinCC rounds them for TimeString before they are matched.
+    progress is called with the fraction of all bytes consumed.
+    """
+    if not paths:
+        raise ValueError("No Fehlerhistorie CSV files to load")
+    sizes = [os.path.getsize(path) for path in paths]
+    total = sum(sizes)
+    consumed = [0] * len(paths)
+    streams = [read_chunks(path, size, use_time_ms) for path, size in zip(paths, sizes)]
+    buffers = [None] * len(paths)
+    latest = [None] * len(paths)  # Key of the latest record read per file, None once the file is exhausted
+
+    def read(i):
+        """ Append the next non-empty chunk of file i to its buffer, or mark the file as exhausted """
+        for chunk, position in streams[i]:
+            consumed[i] = position
+            if progress is not None:
+                progress(sum(consumed) / total if total else 1.0)
+            if len(chunk):
+                buffers[i] = chunk if buffers[i] is None else concat_frames([buffers[i], chunk])
+                newest = chunk['TimeString'].max()
+                latest[i] = newest if latest[i] is None else max(latest[i], newest)
+                return chunk
+        latest[i] = None
+        return None
+
+    first = [read(i) for i in range(len(paths))]
+    resolutions = [time_resolution(chunk['TimeString']) if chunk is not None else 0 for chunk in first]
+    resolution = max(resolutions)
+    ranks = np.argsort(resolutions, kind='stable').argsort()  # The files with the finest times are kept first
+
+    def key(times):
+        if resolution > TIME_RESOLUTIONS_NS[-1]:
+            times = (times - pd.Timedelta(milliseconds=500)).dt.ceil('s')  # Halves are rounded down
+        return times.dt.floor(pd.Timedelta(resolution, unit='ns'))
+
+    def take(boundary):
+        """ Remove the records before boundary from the buffers and return them de-duplicated and merged by time """
+        parts = []
+        for i, buffer in enumerate(buffers):
+            if buffer is None:
+                continue
+            keys = key(buffer['TimeString'])
+            complete = np.ones(len(buffer), dtype=bool) if boundary is None else (keys < boundary).to_numpy()
+            if complete.any():
+                parts.append(buffer[complete].assign(__key=keys[complete], __rank=ranks[i]))
+                buffers[i] = buffer[~complete] if not complete.all() else None
+        if not parts:
+            return None
+        block = drop_rotation_duplicates(concat_frames(parts), ['__key', 'MsgNumber', 'StateAfter'])
+        block = block.drop(columns=['__key', '__rank'])
+        return block.sort_values(by='TimeString', kind='stable', ignore_index=True)
+
+    while any(time is not None for time in latest):
+        boundary = min(key(pd.Series([time for time in latest if time is not None])))
+        block = take(boundary)
+        if block is not None:
+            yield block
+        read(min((i for i in range(len(paths)) if latest[i] is not None), key=lambda i: latest[i]))
+    block = take(None)
+    if block is not None:
+        yield block
+
+
+@traced('load_rotated')
+def load_rotated(paths, use_time_ms=False, progress=None):
+    """ Load the rotated Fehlerhistorie files of a machine as one dataset sorted by time, see merge_rotated """
+    if len(paths) == 1:
+        return load_csv(paths[0], use_time_ms=use_time_ms, progress=progress)
+    blocks = list(merge_rotated(paths, use_time_ms, progress))
+    if not blocks:
+        return load_csv(paths[0], use_time_ms=use_time_ms, progress=progress)
+    data = concat_frames(blocks)
+    if not data['TimeString'].is_monotonic_increasing:  # A file jumps back in time, e.g. after a clock change
+        data = data.sort_values(by='TimeString', kind='stable', ignore_index=True)
+    return data
+
+
+def sorted_blocks(blocks, horizon=REORDER_HORIZON):
+    """
+    Turn blocks of records into blocks sorted by time, as a stable sort of all records would order them, holding back
+    only the records of the latest horizon: a record is passed on once a record more than horizon later was read.
+    Raises ValueError if the records jump back in time by more than horizon.
+    """
+    pending = None
+    latest = released = None
+    for block in blocks:
+        if not len(block):
+            continue
+        times = block['TimeString']
+        if released is not None and times.min() < released:
+            raise ValueError(f"The records jump back in time by more than {horizon}")
+        latest = times.max() if latest is None else max(latest, times.max())
+        pending = block if pending is None else concat_frames([pending, block])
+        ready = (pending['TimeString'] <= latest - horizon).to_numpy()
+        if ready.any():
+            block = pending[ready].sort_values(by='TimeString', kind='stable', ignore_index=True)
+            pending = pending[~ready].reset_index(drop=True)
+            released = block['TimeString'].iloc[-1]
+            yield block
+    if pending is not None and len(pending):
+        yield pending.sort_values(by='TimeString', kind='stable', ignore_index=True)
+
+
+def stream_rotated(paths, use_time_ms=False, progress=None, horizon=REORDER_HORIZON):
+    """
+    The records load_rotated returns (sorted by time), as a stream of blocks for histories which do not fit into
+    memory; see sorted_blocks for the records held back
+    """
+    if len(paths) == 1:
+        size = os.path.getsize(paths[0])
+
+        def blocks():
+            for chunk, consumed in read_chunks(paths[0], size, use_time_ms):
+                if progress is not None:
+                    progress(consumed / size if size else 1.0)
+                yield chunk
+        return sorted_blocks(blocks(), horizon)
+    return sorted_blocks(merge_rotated(paths, use_time_ms, progress), horizon)
+
+
+class LimitedReader(io.RawIOBase):
+    """ Binary reader over the first limit bytes of a file, so lines appended while reading are left out """
+    def __init__(self, path, limit, offset=0):
+        super().__init__()
+        self.file = open(path, 'rb')
+        self.file.seek(offset)
+        self.remaining = limit - offset
+        self.consumed = offset
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = min(len(buffer), self.remaining)
+        if size <= 0:
+            return 0
+        data = self.file.read(size)
+        buffer[:len(data)] = data
+        self.remaining -= len(data)
+        self.consumed += len(data)
+        return len(data)
+
+    def close(self):
+        self.file.close()
+        super().close()
+
+
+def is_trailer(line):
+    return line.lstrip().startswith(TRAILER_PREFIXES)
+
+
+class TailReader:
+    """
+    Reads the lines appended to a growing Fehlerhistorie file since the last read. It remembers the byte offset
+    after the last record and the record itself; if that record is no longer found there, the file was rotated
+    or rewritten and read_new returns None so the file is loaded again from scratch.
+    """
+    def __init__(self, file_path, size, use_time_ms=False, classification=None):
+        """ size is the amount of bytes of the file which has been loaded already """
+        self.file_path = file_path
+        self.use_time_ms = use_time_ms
+        self.classification = classification
+        with open(file_path, 'rb') as f:
+            self.header = f.readline()
+            block_start = max(size - 65536, len(self.header))
+            f.seek(block_start)
+            block = f.read(size - block_start)
+        lines = block.splitlines(keepends=True)
+        if block_start > len(self.header) and lines:
+            block_start += len(lines[0])  # Probably cut in the middle
+            lines = lines[1:]
+
+        # Leave out the trailer lines and a last line still being written, they are read again next time
+        self.offset = size
+        self.partial_line = None  # Last line without line break, which has been loaded already
+        while lines and (is_trailer(lines[-1]) or not lines[-1].endswith(b'\n')):
+            line = lines.pop()
+            if not is_trailer(line):
+                self.partial_line = line
+            self.offset -= len(line)
+        self.last_line = lines[-1] if lines else b''
+
+    @classmethod
+    def resume(cls, file_path, offset, last_line, partial_line=None, use_time_ms=False, classification=None):
+        """ A reader continuing where an earlier one stopped, from its offset, last_line and partial_line """
+        reader = cls.__new__(cls)
+        reader.file_path = file_path
+        reader.use_time_ms = use_time_ms
+        reader.classification = classification
+        with open(file_path, 'rb') as f:
+            reader.header = f.readline()
+        reader.offset = offset
+        reader.last_line = last_line
+        reader.partial_line = partial_line
+        return reader
+
+    @traced('read_new')
+    def read_new(self):
+        """ Return the records appended since the last call, or None if the file has to be loaded again """
+        with open(self.file_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < self.offset:
+                return None
+            f.seek(self.offset - len(self.last_line))
+            if f.read(len(self.last_line)) != self.last_line:
+                return None
+            appended = f.read(size - self.offset)
+
+        lines = appended.splitlines(keepends=True)
+        if self.partial_line is not None and lines:
+            if lines[0].rstrip(b'\r\n') != self.partial_line.rstrip(b'\r\n'):
+                return None  # The line was loaded before it was complete
+            if lines[0].endswith(b'\n'):
+                self.offset += len(lines[0])
+                self.last_line = lines.pop(0)
+                self.partial_line = None
+            else:
+                lines = []
+
+        # Take the complete records, the offset stays in front of trailing bookkeeping lines and a partial line
+        records = []
+        position = self.offset
+        for line in lines:
+            if not line.endswith(b'\n'):
+                break
+            position += len(line)
+            if not is_trailer(line):
+                records.append(line)
+                self.offset = position
+                self.last_line = line
+        data = read_csv(io.BytesIO(self.header + b''.join(records)), self.use_time_ms)
+        return add_classes(compact(parse_times(data, self.use_time_ms)), self.classification)
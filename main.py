@@ -1,425 +1,46 @@
+import time
+STARTED = time.perf_counter()  # Taken before the imports, for the startup report
+import argparse
+import json
 import sys
 import os
-import pandas as pd
-from datetime import datetime, timedelta
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QWidget, QPushButton, QFileDialog,
-                             QTabWidget, QComboBox, QTableWidget, QTableWidgetItem, QHeaderView, QHBoxLayout,
-                             QLabel, QMessageBox, QProgressDialog, QDialog, QProgressBar)
-from PyQt5.QtGui import QIcon, QFont
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-from matplotlib.patches import Patch
-from concurrent.futures import ThreadPoolExecutor, as_completed
+                             QTabWidget, QComboBox, QHBoxLayout,
+                             QLabel, QMessageBox, QProgressDialog, QDialog, QProgressBar, QCheckBox, QShortcut, QSpinBox,
+                             QDateEdit, QDialogButtonBox)
+from PyQt5.QtGui import QIcon, QFont, QKeySequence
+from PyQt5.QtCore import Qt, QDate, QThread, QTimer, pyqtSignal
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import freeze_support
+from tracing import span, traced, tracer
+# pandas, matplotlib and the modules built on them (views, analysis, loader, cache, parallel, store) take most of the
+# startup time, so they are imported where they are used; see import_data_stack and --fast-start
+
+AUTO_REFRESH_INTERVAL_MS = 30000
 
 def resource_path(relative_path):
     """ Get absolute path to resource, works for dev and for PyInstaller """
     base_path = getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__)))
     return os.path.join(base_path, relative_path)
 
-class BlockDiagramCanvas(FigureCanvas):
-    def __init__(self, parent=None):
-        self.fig, self.ax = plt.subplots(figsize=(12, 4))  # Adjusted figsize for tighter plot
-        self.fig.subplots_adjust(left=0.02, right=0.98, top=0.98, bottom=0.17)  # Adjust subplots to remove outer borders
-        super().__init__(self.fig)
-        self.setParent(parent)
-        self.process_intervals = []
-
-    def add_interval(self, start_time, end_time, color):
-        duration = end_time - start_time
-        if duration.total_seconds() > 0:
-            self.process_intervals.append((start_time, duration, color))
-
-    def plot(self, data, start_time, end_time, day_view=False, plot_coating_only=False):
-        self.ax.clear()
-        block_height = 10
-        warning_msg_numbers = list(range(29, 38)) + list(range(58, 66)) + list(range(73, 80)) + list(range(90, 93)) + list(range(125, 141)) + list(range(148, 152)) + [173, 174]
-
-        if plot_coating_only:
-            current_start_time = None
-            for index, row in data.iterrows():
-                msg_text = row['MsgText']
-                time = pd.to_datetime(row['TimeString'])
-
-                if "Anlagezustand-BM : Prozess starten" in msg_text:
-                    current_start_time = time
-                if current_start_time is not None and any(end_process in msg_text for end_process in ["Anlagezustand-BM : Prozess beenden", "Anlagezustand-VM : Anfahren Fehlerstatus", "Anlagezustand-BM : Anfahren Fehlerstatus"]):
-                    duration = (time - current_start_time).total_seconds() / 60
-                    if duration >= 30:  # Only include intervals of at least 30 minutes
-                        self.add_interval(current_start_time, time, 'green')
-                    current_start_time = None
-
-            # Plot all intervals
-            for start, duration, color in self.process_intervals:
-                self.ax.broken_barh([(start, duration)], (0, block_height), facecolors=(color), alpha=1.0)
-
-            # Plot error and warning bars on top of the green blocks
-            for start, duration, color in self.process_intervals:
-                interval_data = data[(data['TimeString'] >= start) & (data['TimeString'] <= (start + duration))]
-                for index, row in interval_data.iterrows():
-                    time = pd.to_datetime(row['TimeString'])
-                    msg_number = row['MsgNumber']
-                    state_after = row['StateAfter']
-                    if msg_number in warning_msg_numbers and state_after == 1:  # Warning with StateAfter 1
-                        self.ax.vlines(x=time, ymin=0, ymax=block_height, colors='orange', alpha=1.0)
-                    elif msg_number <= 175 and state_after == 1:  # Error with StateAfter 1
-                        self.ax.vlines(x=time, ymin=0, ymax=block_height, colors='red', alpha=1.0)
-        else:
-            color_sequence = [
-                (["Anlagezustand-BM : Quelle einrichten"], ["Anlagezustand-BM : Belüften", "Anlagezustand-VM : Belüften", "Anlagezustand-BM : Abpumpen", "Anlagezustand-VM : Abpumpen", "Anlagezustand-BM : Prozess starten"], 'purple'),
-                (["Anlagezustand-BM : Belüften", "Anlagezustand-VM : Belüften"], ["Anlagezustand-BM : Quelle einrichten", "Anlagezustand-BM : Abpumpen", "Anlagezustand-VM : Abpumpen", "Anlagezustand-BM : Prozess starten"], 'cyan'),
-                (["Anlagezustand-BM : Abpumpen", "Anlagezustand-VM : Abpumpen"], ["Anlagezustand-BM : Quelle einrichten", "Anlagezustand-BM : Belüften", "Anlagezustand-VM : Belüften", "Anlagezustand-BM : Prozess starten"], 'blue'),
-                (["Anlagezustand-BM : Prozess starten"], ["Anlagezustand-BM : Prozess beenden", "Anlagezustand-VM : Anfahren Fehlerstatus", "Anlagezustand-BM : Anfahren Fehlerstatus"], 'green')
-            ]
-
-            for start_processes, end_processes, color in color_sequence:
-                current_start_time = None
-                for index, row in data.iterrows():
-                    msg_text = row['MsgText']
-                    time = pd.to_datetime(row['TimeString'])
-                    if any(start_process in msg_text for start_process in start_processes):
-                        current_start_time = time
-                    if current_start_time is not None and any(end_process in msg_text for end_process in end_processes):
-                        duration = (time - current_start_time).total_seconds() / 60
-                        if color == 'green' and duration >= 30:  # Only include green intervals of at least 30 minutes
-                            self.add_interval(current_start_time, time, color)
-                        elif color != 'green':
-                            self.add_interval(current_start_time, time, color)
-                        current_start_time = None
-
-                # Add the last interval if it exists
-                if current_start_time is not None:
-                    duration = (end_time - current_start_time).total_seconds() / 60
-                    if color == 'green' and duration >= 30:  # Only include green intervals of at least 30 minutes
-                        self.add_interval(current_start_time, end_time, color)
-                    elif color != 'green':
-                        self.add_interval(current_start_time, end_time, color)
-
-            # Plot all intervals
-            for start, duration, color in self.process_intervals:
-                self.ax.broken_barh([(start, duration)], (0, block_height), facecolors=(color), alpha=1.0)
-
-            # Plot error and warning bars on top of the colored blocks
-            for index, row in data.iterrows():
-                time = pd.to_datetime(row['TimeString'])
-                msg_number = row['MsgNumber']
-                state_after = row['StateAfter']
-                if msg_number in warning_msg_numbers and state_after == 1:  # Warning with StateAfter 1
-                    self.ax.vlines(x=time, ymin=0, ymax=block_height, colors='orange', alpha=1.0)
-                elif msg_number <= 175 and state_after == 1:  # Error with StateAfter 1
-                    self.ax.vlines(x=time, ymin=0, ymax=block_height, colors='red', alpha=1.0)
-
-        # Adjust axes
-        self.ax.set_ylim(0, block_height)
-        
-        if day_view:
-            self.ax.set_xlim(start_time, end_time)
-            self.ax.xaxis.set_major_locator(mdates.HourLocator(interval=1))
-            self.ax.xaxis.set_major_formatter(mdates.DateFormatter('%H'))
-            self.ax.set_xticks([start_time + pd.Timedelta(hours=i) for i in range(25)])
-            self.ax.set_xticklabels([str(i) for i in range(24)] + ['24'])
-            self.ax.set_xlabel('Hour')
-        else:
-            self.ax.set_xlim(data['TimeString'].min(), data['TimeString'].max())
-            self.ax.xaxis.set_major_locator(mdates.DayLocator(interval=1))
-            self.ax.xaxis.set_major_formatter(mdates.DateFormatter('%d.%m'))
-            plt.setp(self.ax.get_xticklabels(), rotation=45, ha="right")
-            self.ax.set_xlabel('')
-
-        self.ax.set_yticks([])
-        self.ax.grid(False)
-        
-        # Add legend
-        legend_elements = [
-            Patch(facecolor='cyan', edgecolor='black', label='Ventilation'),
-            Patch(facecolor='blue', edgecolor='black', label='Pump out'),
-            Patch(facecolor='purple', edgecolor='black', label='Set up'),
-            Patch(facecolor='green', edgecolor='black', label='Coating'),
-            Patch(facecolor='orange', edgecolor='black', label='Warning', alpha=1.0),
-            Patch(facecolor='red', edgecolor='black', label='Error', alpha=1.0)
-        ]
-        self.ax.legend(handles=legend_elements, loc='upper left')
-
-        self.draw()
-
-class ErrorTable(QWidget):
-    def __init__(self, data, parent=None, table_type='count'):
-        super().__init__(parent)
-        self.data = data
-        self.table_type = table_type
-        self.initUI()
+def import_data_stack():
+    """ Import pandas, matplotlib and the analysis modules, which the later imports then find loaded """
+    import views, analysis, loader, cache, parallel, store
 
-    def initUI(self):
-        layout = QVBoxLayout(self)
-        self.table = QTableWidget()
-        layout.addWidget(self.table)
-        self.setLayout(layout)
-        self.populate_table()
-
-    def populate_table(self):
-        if self.data is not None:
-            if self.table_type == 'count':
-                error_data = self.data[(self.data['MsgNumber'] <= 175) & (self.data['StateAfter'] == 1)]
-                error_counts = error_data['MsgText'].value_counts().reset_index()
-                error_counts.columns = ['Error Message', 'Count']
-
-                self.table.setRowCount(len(error_counts))
-                self.table.setColumnCount(2)
-                self.table.setHorizontalHeaderLabels(['Error Message', 'Count'])
-
-                for row in range(len(error_counts)):
-                    self.table.setItem(row, 0, QTableWidgetItem(error_counts.iloc[row, 0]))
-                    self.table.setItem(row, 1, QTableWidgetItem(str(error_counts.iloc[row, 1])))
-
-            elif self.table_type == 'chronology':
-                error_data = self.data[(self.data['MsgNumber'] <= 175) & (self.data['StateAfter'] == 1)].sort_values(by='TimeString')
-                self.table.setRowCount(len(error_data))
-                self.table.setColumnCount(2)
-                self.table.setHorizontalHeaderLabels(['Time', 'Error Message'])
-
-                for row in range(len(error_data)):
-                    self.table.setItem(row, 0, QTableWidgetItem(error_data.iloc[row]['TimeString'].strftime('%d.%m.%Y %H:%M:%S')))
-                    self.table.setItem(row, 1, QTableWidgetItem(error_data.iloc[row]['MsgText']))
-
-            elif self.table_type == 'fail':
-                error_data = self.get_fail_data()
-                error_counts = error_data['MsgText'].value_counts().reset_index()
-                error_counts.columns = ['Error Message', 'Count']
-
-                self.table.setRowCount(len(error_counts))
-                self.table.setColumnCount(2)
-                self.table.setHorizontalHeaderLabels(['Error Message', 'Count'])
-
-                for row in range(len(error_counts)):
-                    self.table.setItem(row, 0, QTableWidgetItem(error_counts.iloc[row, 0]))
-                    self.table.setItem(row, 1, QTableWidgetItem(str(error_counts.iloc[row, 1])))
-
-                # Calculate and add percentage row
-                excluded_msg_numbers = list(range(29, 38)) + list(range(58, 66)) + list(range(73, 80)) + list(range(90, 93)) + list(range(125, 141)) + list(range(148, 152)) + [173, 174]
-                total_errors = len(self.data[(self.data['MsgNumber'] <= 175) & (~self.data['MsgNumber'].isin(excluded_msg_numbers)) & (self.data['StateAfter'] == 1)])
-                fail_errors = len(error_data)
-                percentage = (fail_errors / total_errors) * 100 if total_errors > 0 else 0
-
-                self.table.insertRow(self.table.rowCount())
-                self.table.setItem(self.table.rowCount()-1, 0, QTableWidgetItem("Percentage of Fail Errors"))
-                self.table.setItem(self.table.rowCount()-1, 1, QTableWidgetItem(f"{percentage:.2f}%"))
-
-            self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        else:
-            self.table.setRowCount(0)
-            self.table.setColumnCount(2)
-            if self.table_type == 'count':
-                self.table.setHorizontalHeaderLabels(['Error Message', 'Count'])
-            elif self.table_type == 'chronology':
-                self.table.setHorizontalHeaderLabels(['Time', 'Error Message'])
-            elif self.table_type == 'fail':
-                self.table.setHorizontalHeaderLabels(['Error Message', 'Count'])
-            self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-
-    def get_fail_data(self):
-        excluded_msg_numbers = list(range(29, 38)) + list(range(58, 66)) + list(range(73, 80)) + list(range(90, 93)) + list(range(125, 141)) + list(range(148, 152)) + [173, 174]
-        fail_errors = []
-        process_start_time = None
-        error_messages = ["Anlagezustand-BM : Prozess beenden", "Anlagezustand-VM : Anfahren Fehlerstatus", "Anlagezustand-BM : Anfahren Fehlerstatus"]
-
-        for index, row in self.data.iterrows():
-            if "Anlagezustand-BM : Prozess starten" in row['MsgText']:
-                process_start_time = row['TimeString']
-            if process_start_time is not None and any(error_msg in row['MsgText'] for error_msg in error_messages):
-                process_end_time = row['TimeString']
-                duration = (process_end_time - process_start_time).total_seconds() / 60
-                if duration >= 30:
-                    fail_window_start = process_end_time - timedelta(seconds=30)
-                    fail_window_end = process_end_time + timedelta(seconds=30)
-                    fail_data = self.data[(self.data['TimeString'] >= fail_window_start) &
-                                          (self.data['TimeString'] <= fail_window_end) &
-                                          (self.data['MsgNumber'] <= 175) &
-                                          (self.data['StateAfter'] == 1) &
-                                          (~self.data['MsgNumber'].isin(excluded_msg_numbers))]
-                    if not fail_data.empty:
-                        fail_errors.append(fail_data)
-                process_start_time = None
-        if fail_errors:
-            return pd.concat(fail_errors)
-        else:
-            return pd.DataFrame(columns=self.data.columns)
-
-    def get_fail_chronology_data(self):
-        excluded_msg_numbers = list(range(29, 38)) + list(range(58, 66)) + list(range(73, 80)) + list(range(90, 93)) + list(range(125, 141)) + list(range(148, 152)) + [173, 174]
-        fail_chronology_data = []
-        process_start_time = None
-        error_messages = ["Anlagezustand-BM : Prozess beenden", "Anlagezustand-VM : Anfahren Fehlerstatus", "Anlagezustand-BM : Anfahren Fehlerstatus"]
-
-        for index, row in self.data.iterrows():
-            if "Anlagezustand-BM : Prozess starten" in row['MsgText']:
-                process_start_time = row['TimeString']
-            if process_start_time is not None and any(error_msg in row['MsgText'] for error_msg in error_messages):
-                process_end_time = row['TimeString']
-                duration = (process_end_time - process_start_time).total_seconds() / 60
-                if duration >= 30:
-                    fail_window_start = process_end_time - timedelta(seconds=30)
-                    fail_window_end = process_end_time + timedelta(seconds=30)
-                    fail_data = self.data[(self.data['TimeString'] >= fail_window_start) &
-                                          (self.data['TimeString'] <= fail_window_end) &
-                                          (self.data['StateAfter'] == 1) &
-                                          (~self.data['MsgNumber'].isin(excluded_msg_numbers))]
-                    if not fail_data.empty:
-                        fail_chronology_data.append(fail_data)
-                process_start_time = None
-        if fail_chronology_data:
-            return pd.concat(fail_chronology_data)
-        else:
-            return pd.DataFrame(columns=self.data.columns)
-        
-class ErrorTableDay(QWidget):
-    def __init__(self, data, parent=None, table_type='count'):
-        super().__init__(parent)
-        self.data = data
-        self.table_type = table_type
-        self.initUI()
+class StartupReport:
+    """ Seconds from the start of the process to each startup phase, printed and optionally written as JSON """
+    def __init__(self, path=None):
+        self.path = path
+        self.phases = {}
 
-    def initUI(self):
-        layout = QVBoxLayout(self)
-        self.table = QTableWidget()
-        layout.addWidget(self.table)
-        self.setLayout(layout)
-        self.populate_table()
-
-    def populate_table(self):
-        if self.data is not None:
-            if self.table_type == 'fail':
-                fail_data = self.get_fail_data_day()
-                error_counts = fail_data['MsgText'].value_counts().reset_index()
-                error_counts.columns = ['Error Message', 'Count']
-
-                self.table.setRowCount(len(error_counts))
-                self.table.setColumnCount(2)
-                self.table.setHorizontalHeaderLabels(['Error Message', 'Count'])
-
-                for row in range(len(error_counts)):
-                    self.table.setItem(row, 0, QTableWidgetItem(error_counts.iloc[row, 0]))
-                    self.table.setItem(row, 1, QTableWidgetItem(str(error_counts.iloc[row, 1])))
-
-                self.table.insertRow(self.table.rowCount())
-                self.table.setItem(self.table.rowCount()-1, 0, QTableWidgetItem("Percentage of Fail Errors"))
-                self.table.setItem(self.table.rowCount()-1, 1, QTableWidgetItem(f"{self.calculate_percentage_fail(fail_data):.2f}%"))
-            elif self.table_type == 'fail_chronology':
-                fail_data = self.get_fail_data_day()
-                fail_data = fail_data.sort_values(by='TimeString')
-                self.table.setRowCount(len(fail_data))
-                self.table.setColumnCount(2)
-                self.table.setHorizontalHeaderLabels(['Time', 'Error Message'])
-
-                for row in range(len(fail_data)):
-                    self.table.setItem(row, 0, QTableWidgetItem(fail_data.iloc[row]['TimeString'].strftime('%d.%m.%Y %H:%M:%S')))
-                    self.table.setItem(row, 1, QTableWidgetItem(fail_data.iloc[row]['MsgText']))
-
-            self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        else:
-            self.table.setRowCount(0)
-            self.table.setColumnCount(2)
-            if self.table_type == 'count':
-                self.table.setHorizontalHeaderLabels(['Error Message', 'Count'])
-            elif self.table_type == 'chronology':
-                self.table.setHorizontalHeaderLabels(['Time', 'Error Message'])
-            elif self.table_type == 'fail':
-                self.table.setHorizontalHeaderLabels(['Error Message', 'Count'])
-            self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-
-    def get_fail_data_day(self):
-        excluded_msg_numbers = list(range(29, 38)) + list(range(58, 66)) + list(range(73, 80)) + list(range(90, 93)) + list(range(125, 141)) + list(range(148, 152)) + [173, 174]
-        error_messages = ["Anlagezustand-BM : Prozess beenden", "Anlagezustand-VM : Anfahren Fehlerstatus", "Anlagezustand-BM : Anfahren Fehlerstatus"]
-        fail_data = []
-        for index, row in self.data.iterrows():
-            if any(error_msg in row['MsgText'] for error_msg in error_messages):
-                error_window_start = row['TimeString'] - timedelta(seconds=30)
-                error_window_end = row['TimeString'] + timedelta(seconds=30)
-                fail_window_data = self.data[(self.data['TimeString'] >= error_window_start) & 
-                                             (self.data['TimeString'] <= error_window_end) & 
-                                             (self.data['StateAfter'] == 1) & 
-                                             (~self.data['MsgNumber'].isin(excluded_msg_numbers))]
-                fail_data.append(fail_window_data[fail_window_data['MsgNumber'] <= 175])
-        if fail_data:
-            return pd.concat(fail_data)
-        else:
-            return pd.DataFrame(columns=self.data.columns)
-
-    def calculate_percentage_fail(self, fail_data):
-        excluded_msg_numbers = list(range(29, 38)) + list(range(58, 66)) + list(range(73, 80)) + list(range(90, 93)) + list(range(125, 141)) + list(range(148, 152)) + [173, 174]
-        total_errors = len(self.data[(self.data['MsgNumber'] <= 175) & (self.data['StateAfter'] == 1) & (~self.data['MsgNumber'].isin(excluded_msg_numbers))])
-        fail_errors = len(fail_data)
-        return (fail_errors / total_errors) * 100 if total_errors > 0 else 0
+    def mark(self, phase):
+        self.phases[phase] = round(time.perf_counter() - STARTED, 3)
 
-
-class StatisticsTab(QWidget):
-    def __init__(self, data, parent=None):
-        super().__init__(parent)
-        self.data = data
-        self.initUI()
-
-    def initUI(self):
-        layout = QVBoxLayout(self)
-
-        # Add the plot
-        self.fig, self.ax = plt.subplots()
-        self.canvas = FigureCanvas(self.fig)
-        layout.addWidget(self.canvas)
-
-        # Add the statistics text
-        self.statistics_label = QLabel(self)
-        self.statistics_label.setFont(QFont("Arial", 12))
-        layout.addWidget(self.statistics_label)
-
-        self.setLayout(layout)
-        self.update_statistics()
-
-    def update_statistics(self):
-        if self.data is not None:
-            process_durations = []
-            failed_processes = 0
-            process_start_time = None
-            error_messages = ["Anlagezustand-BM : Prozess beenden", "Anlagezustand-VM : Anfahren Fehlerstatus", "Anlagezustand-BM : Anfahren Fehlerstatus"]
-
-            for index, row in self.data.iterrows():
-                if "Anlagezustand-BM : Prozess starten" in row['MsgText']:
-                    process_start_time = row['TimeString']
-                if any(error_msg in row['MsgText'] for error_msg in error_messages) and process_start_time is not None:
-                    process_end_time = row['TimeString']
-                    duration = (process_end_time - process_start_time).total_seconds() / 60
-                    if duration >= 30:
-                        process_durations.append(duration)
-                        if self.has_errors_within_window(process_end_time):
-                            failed_processes += 1
-                    process_start_time = None
-
-            total_processes = len(process_durations)
-            percentage_failed = (failed_processes / total_processes) * 100 if total_processes > 0 else 0
-
-            self.ax.clear()
-            self.ax.barh(['All', 'Failed'], [total_processes, failed_processes], color=['green', 'red'])
-            self.ax.set_xlabel('Amount of Processes')
-            self.ax.xaxis.set_major_locator(plt.MaxNLocator(integer=True))
-            self.fig.tight_layout()
-            self.canvas.draw()
-
-            self.statistics_label.setText(f"Amount of all processes: {total_processes}\nAmount of failed processes: {failed_processes}\nPercentage of failed processes: {percentage_failed:.2f}%")
-        else:
-            self.ax.clear()
-            self.ax.set_title('No Data')
-            self.canvas.draw()
-            self.statistics_label.setText("Amount of all processes: 0\nAmount of failed processes: 0\nPercentage of failed processes: 0.00%")
-
-    def has_errors_within_window(self, process_end_time):
-        excluded_msg_numbers = list(range(29, 38)) + list(range(58, 66)) + list(range(73, 80)) + list(range(90, 93)) + list(range(125, 141)) + list(range(148, 152)) + [173, 174]
-        error_window_start = process_end_time - timedelta(seconds=30)
-        error_window_end = process_end_time + timedelta(seconds=30)
-        error_data = self.data[(self.data['TimeString'] >= error_window_start) &
-                               (self.data['TimeString'] <= error_window_end) &
-                               (self.data['MsgNumber'] <= 175) &
-                               (self.data['StateAfter'] == 1) &
-                               (~self.data['MsgNumber'].isin(excluded_msg_numbers))]
-        return not error_data.empty
+    def write(self):
+        print("Startup: " + ", ".join(f"{phase} {seconds:.3f} s" for phase, seconds in self.phases.items()))
+        if self.path:
+            with open(self.path, 'w') as f:
+                json.dump(self.phases, f, indent=1)
 
 class LoadingDialog(QDialog):
     def __init__(self, parent=None):
@@ -433,89 +54,314 @@ class LoadingDialog(QDialog):
         self.progress_bar.setRange(0, 100)
         layout.addWidget(self.label)
         layout.addWidget(self.progress_bar)
+        self.file_bars = {}
+
+    def show_files(self, file_paths):
+        """ Add a progress bar per file below the overall one """
+        for file_path in file_paths:
+            bar = QProgressBar(self)
+            bar.setRange(0, 100)
+            name = os.path.join(os.path.basename(os.path.dirname(file_path)), os.path.basename(file_path))
+            bar.setFormat(f"{name}  %p%")
+            self.layout().addWidget(bar)
+            self.file_bars[file_path] = bar
+        self.setFixedSize(300, 100 + 30 * len(file_paths))
+
+    def set_file_progress(self, file_path, value):
+        self.file_bars[file_path].setValue(value)
+
+def to_qdate(day):
+    return QDate(day.year, day.month, day.day)
+
+def from_qdate(date):
+    import pandas as pd
+    return pd.Timestamp(date.toPyDate())
+
+def date_edit():
+    edit = QDateEdit()
+    edit.setCalendarPopup(True)
+    edit.setDisplayFormat('dd.MM.yyyy')
+    return edit
+
+class StoreRangeDialog(QDialog):
+    """ Choose a machine of the history store and the days to load, all of its days by default """
+    def __init__(self, store, machines, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.setWindowTitle("Open From History Store")
+        layout = QVBoxLayout(self)
+        row = QHBoxLayout()
+        self.machine_dropdown = QComboBox()
+        self.machine_dropdown.addItems(machines)
+        self.start_date = date_edit()
+        self.end_date = date_edit()
+        for label, widget in (("Machine", self.machine_dropdown), ("From", self.start_date), ("To", self.end_date)):
+            row.addWidget(QLabel(label))
+            row.addWidget(widget)
+        layout.addLayout(row)
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+        self.machine_dropdown.currentTextChanged.connect(self.show_date_range)
+        self.show_date_range(self.machine_dropdown.currentText())
+
+    def show_date_range(self, machine):
+        first, last = self.store.date_range(machine)
+        for edit in (self.start_date, self.end_date):
+            edit.setDateRange(to_qdate(first), to_qdate(last))
+        self.start_date.setDate(to_qdate(first))
+        self.end_date.setDate(to_qdate(last))
+
+    def selection(self):
+        """ Machine, first day and the day after the last one """
+        import pandas as pd
+        return (self.machine_dropdown.currentText(), from_qdate(self.start_date.date()),
+                from_qdate(self.end_date.date()) + pd.Timedelta(days=1))
 
 class DataLoaderThread(QThread):
-    data_loaded = pyqtSignal(pd.DataFrame)
+    data_loaded = pyqtSignal(object)  # DataFrame
     progress_updated = pyqtSignal(int)
+    failed = pyqtSignal(str)
 
-    def __init__(self, file_path):
+    def __init__(self, file_path, use_time_ms=False, cache=None):
         super().__init__()
         self.file_path = file_path
+        self.use_time_ms = use_time_ms
+        self.cache = cache
+        self.tail_reader = None
 
+    @traced('load file')
     def run(self):
-        chunk_size = 1000
-        total_rows = sum(1 for _ in open(self.file_path, 'r', encoding='latin1')) - 1
-        chunks = []
-        for chunk in pd.read_csv(self.file_path, delimiter=';', encoding='latin1', chunksize=chunk_size, on_bad_lines='skip'):
-            chunks.append(chunk)
-            self.progress_updated.emit(int(len(chunks) * chunk_size / total_rows * 100))
-        data = pd.concat(chunks, ignore_index=True)
+        try:
+            data = self.load()
+        except Exception as e:
+            self.failed.emit(f"Could not load {self.file_path}: {e}")
+            return
+        if not len(data):
+            self.failed.emit(f"{self.file_path} holds no messages.")
+            return
         self.data_loaded.emit(data)
 
-class MultipleDataLoaderThread(QThread):
-    common_errors_found = pyqtSignal(pd.DataFrame)
+    def load(self):
+        """ The messages of the file or machine directory, with their classes """
+        from analysis import sort_by_time
+        from classification import add_classes, machine_classification
+        from loader import TailReader, load_csv, load_rotated, rotated_files
+        # The message classes come from the profile of the machine and are added after the cache
+        classification = machine_classification(self.file_path)
+        if os.path.isdir(self.file_path):
+            # The rotated files of a machine, merged into one history; they are not refreshed
+            data = load_rotated(rotated_files(self.file_path), self.use_time_ms,
+                                lambda fraction: self.progress_updated.emit(int(fraction * 100)))
+            return add_classes(data, classification)
+
+        # Only the bytes present now are loaded, lines appended meanwhile are left to the tail reader
+        size = os.path.getsize(self.file_path)
+        self.tail_reader = TailReader(self.file_path, size, self.use_time_ms, classification)
+        options = f"single,time_ms={self.use_time_ms}"
+        if self.cache is not None:
+            data = self.cache.load(self.file_path, options)
+            if data is not None:
+                self.progress_updated.emit(100)
+                return add_classes(data, classification)
+            fingerprint = self.cache.fingerprint(self.file_path, size)
+
+        data = load_csv(self.file_path, size, self.use_time_ms, lambda fraction: self.progress_updated.emit(int(fraction * 100)))
+        try:
+            with span('sort_by_time', rows=len(data)):
+                data = sort_by_time(data)
+            if self.cache is not None:
+                self.cache.store(fingerprint, data, options)
+        except Exception as e:
+            print(f"Error processing data: {e}")
+        return add_classes(data, classification)
+
+class StoreLoaderThread(QThread):
+    data_loaded = pyqtSignal(object)  # DataFrame
     progress_updated = pyqtSignal(int)
+    failed = pyqtSignal(str)
 
-    def __init__(self, file_paths):
+    def __init__(self, store, machine, start, end):
         super().__init__()
-        self.file_paths = file_paths
+        self.store = store
+        self.machine = machine
+        self.start_time = start
+        self.end_time = end
+        self.tail_reader = None  # The store is not refreshed, new records come with the next ingest
 
+    @traced('load store')
     def run(self):
-        dataframes = []
-        total_files = len(self.file_paths)
-        with ThreadPoolExecutor(max_workers=4) as executor:
-            future_to_file = {executor.submit(self.load_file, file): file for file in self.file_paths}
-            for i, future in enumerate(as_completed(future_to_file)):
-                df = future.result()
-                dataframes.append(df)
-                self.progress_updated.emit(int((i + 1) / total_files * 100))
-        
-        common_errors = self.find_common_errors(dataframes)
-        self.common_errors_found.emit(common_errors)
+        try:
+            data = self.store.load(self.machine, self.start_time, self.end_time)
+        except Exception as e:
+            self.failed.emit(f"Could not load {self.machine} from {self.store.path}: {e}")
+            return
+        if not len(data):
+            self.failed.emit(f"The history store holds no records of {self.machine} between these dates.")
+            return
+        self.progress_updated.emit(100)
+        self.data_loaded.emit(data)
+
+class TailLoaderThread(QThread):
+    rows_loaded = pyqtSignal(object)  # DataFrame
+    reload_needed = pyqtSignal()
 
-    def load_file(self, file):
-        dtype = {
-            'TimeString': 'str',
-            'MsgNumber': 'int32',
-            'MsgText': 'str',
-            'StateAfter': 'int32'
-        }
-        df = pd.read_csv(file, delimiter=';', encoding='latin1', dtype=dtype, on_bad_lines='skip')
-        df['TimeString'] = pd.to_datetime(df['TimeString'].apply(self.correct_time_format))
-        return df
-
-    def correct_time_format(self, time_str):
+    def __init__(self, tail_reader):
+        super().__init__()
+        self.tail_reader = tail_reader
+
+    def run(self):
         try:
-            return datetime.strptime(time_str, '%d.%m.%Y %H:%M:%S')
-        except ValueError:
-            return datetime.strptime(time_str, '%d.%m.%Y %H:%M').replace(second=0)
+            rows = self.tail_reader.read_new()
+        except (OSError, ValueError) as e:
+            print(f"Error reading new lines: {e}")
+            return
+        if rows is None:
+            self.reload_needed.emit()
+        else:
+            self.rows_loaded.emit(rows)
 
-    def find_common_errors(self, dataframes):
-        common_errors = pd.DataFrame(columns=['Date', 'Error Message', 'Count'])
+class MultipleDataLoaderThread(QThread):
+    common_errors_found = pyqtSignal(object)  # DataFrame
+    co_occurrences_found = pyqtSignal(object)  # DataFrame
+    timelines_found = pyqtSignal(object)  # Dict of file path to Timeline
+    progress_updated = pyqtSignal(int)
+    file_progress = pyqtSignal(str, int)  # File path, percent
+    file_loaded = pyqtSignal(str, str)  # File path, memory report
+    skipped = pyqtSignal(str)  # Report of the files which could not be loaded, the others are compared
+    failed = pyqtSignal(str)
+
+    def __init__(self, file_paths, cache=None, timeline_cache=None, machines=None, window_seconds=10, store=None,
+                 date_range=None):
+        """ With a store, file_paths are the names of stored machines, loaded from date_range (start, end) """
+        super().__init__()
+        self.file_paths = list(file_paths)
+        self.cache = cache
+        self.timeline_cache = timeline_cache if timeline_cache is not None else {}  # File path -> (signature, Timeline)
+        self.machines = list(machines) if machines is not None else self.file_paths
+        self.window_seconds = window_seconds
+        self.store = store
+        self.date_range = date_range
+        self.errors = {}  # File path -> error of the files which could not be loaded
 
-        for date in pd.to_datetime(dataframes[0]['TimeString']).dt.date.unique():
-            errors = []
-            for df in dataframes:
-                df_on_date = df[pd.to_datetime(df['TimeString']).dt.date == date]
-                errors.append(df_on_date[(df_on_date['MsgNumber'] <= 175) & (df_on_date['StateAfter'] == 1)]['MsgText'].value_counts())
+    def run(self):
+        try:
+            dataframes = self.skip_failed(self.load_store() if self.store is not None else self.load_files())
+            self.timelines_found.emit(self.find_timelines(dataframes))
+            self.co_occurrences_found.emit(self.find_co_occurrences(dataframes))
+            common_errors = self.find_common_errors(dataframes)
+        except Exception as e:
+            self.failed.emit(f"Could not compare the machines: {e}")
+            return
+        self.common_errors_found.emit(common_errors)
 
-            common = errors[0]
-            for err in errors[1:]:
-                common = common.combine(err, min, fill_value=0)
+    def load_files(self):
+        from loader import describe_memory
+        from parallel import load_files
+        # The files are parsed in worker processes, the progress of each one is reported back here
+        fractions = dict.fromkeys(self.file_paths, 0.0)
 
-            for error, count in common[common > 0].items():
-                common_errors = pd.concat([common_errors, pd.DataFrame([{'Date': date, 'Error Message': error, 'Count': count}])], ignore_index=True)
+        def progress(file, fraction):
+            fractions[file] = fraction
+            self.file_progress.emit(file, int(fraction * 100))
+            self.progress_updated.emit(int(sum(fractions.values()) / len(fractions) * 100))
 
-        return common_errors
+        return load_files(self.file_paths, self.cache, "multiple", progress,
+                          lambda file, df: self.file_loaded.emit(file, describe_memory(df)), self.errors.__setitem__)
+
+    def load_store(self):
+        from loader import describe_memory
+        dataframes = []
+        for i, machine in enumerate(self.file_paths):
+            try:
+                dataframes.append(self.store.load(machine, *self.date_range))
+                self.file_loaded.emit(machine, describe_memory(dataframes[-1]))
+            except Exception as e:
+                dataframes.append(None)
+                self.errors[machine] = e
+            self.file_progress.emit(machine, 100)
+            self.progress_updated.emit(int((i + 1) / len(self.file_paths) * 100))
+        return dataframes
+
+    def skip_failed(self, dataframes):
+        """ Leave out the files which could not be loaded and report them, at least two have to remain """
+        if not self.errors:
+            return dataframes
+        report = "\n".join(f"{machine}: {path}: {self.errors[path]}" if machine != path else f"{machine}: {self.errors[path]}"
+                           for machine, path in zip(self.machines, self.file_paths) if path in self.errors)
+        kept = [i for i, data in enumerate(dataframes) if data is not None]
+        if len(kept) < 2:
+            raise ValueError(f"Fewer than two files could be loaded.\n{report}")
+        self.skipped.emit(f"These files could not be loaded and are left out:\n{report}")
+        self.file_paths = [self.file_paths[i] for i in kept]
+        self.machines = [self.machines[i] for i in kept]
+        return [dataframes[i] for i in kept]
+
+    def signature(self, path):
+        """ What the timeline of a file or stored machine depends on """
+        from loader import source_signature
+        if self.store is not None:
+            return self.date_range, self.store.revision(path)
+        return source_signature(path)
+
+    def find_common_errors(self, dataframes):
+        from analysis import common_errors
+        return common_errors(dataframes)
+
+    def find_co_occurrences(self, dataframes):
+        import pandas as pd
+        from analysis import co_occurrences
+        return co_occurrences(dataframes, self.machines, pd.Timedelta(seconds=self.window_seconds))
+
+    def find_timelines(self, dataframes):
+        """ Timeline of every file, built in parallel and kept while the file and its profile (or the stored records) stay the same """
+        from analysis import machine_timeline
+        from parallel import worker_count
+        signatures = [self.signature(path) for path in self.file_paths]
+        missing = [i for i, path in enumerate(self.file_paths) if self.timeline_cache.get(path, (None,))[0] != signatures[i]]
+        with ThreadPoolExecutor(worker_count(len(missing))) as executor:
+            for i, timeline in zip(missing, executor.map(machine_timeline, [dataframes[i] for i in missing])):
+                self.timeline_cache[self.file_paths[i]] = (signatures[i], timeline)
+        return {path: self.timeline_cache[path][1] for path in self.file_paths}
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, fast_start=False):
+        """
+        With fast_start the window comes up before pandas and matplotlib are imported, and the canvases and tables
+        of the Single tab are built when it receives its first data.
+        """
         super().__init__()
         self.setWindowTitle("Error Reporter")
         self.setGeometry(100, 100, 1200, 600)
         self.setWindowIcon(QIcon(resource_path('icon.png')))
-        self.data = None
+        self.history = None
+        self.file_path = None
+        self.tail_reader = None
+        self.tail_thread = None
+        self.canvas_day_shown = None
+        self.canvas_all_shown = None
+        self.prefetcher = ThreadPoolExecutor(max_workers=1)
+        self.frame_cache = None
+        self.history_store = None
+        self.fast_start = fast_start
+        self.canvas_day = None
+        self.day_views = []
+        self.all_views = []
+        self.tab_performance = None
         self.initUI()
+        if not fast_start:
+            self.load_data_stack()
+            self.init_single_views()
+
+    def load_data_stack(self):
+        """ Import the data stack and open the frame cache and the history store, once """
+        if self.frame_cache is None:
+            from cache import FrameCache
+            from store import HistoryStore
+            import_data_stack()
+            self.frame_cache = FrameCache()
+            self.history_store = HistoryStore()
 
     def initUI(self):
         self.central_widget = QWidget()
@@ -534,6 +380,8 @@ class MainWindow(QMainWindow):
         self.init_single_tab()
         self.init_multiple_tab()
         self.init_info_tab()
+        self.main_tabs.currentChanged.connect(self.on_main_tab_changed)
+        QShortcut(QKeySequence("Ctrl+Shift+P"), self, self.toggle_performance_tab)
 
         self.layout.addWidget(self.main_tabs)
 
@@ -544,6 +392,31 @@ class MainWindow(QMainWindow):
         self.button_open.clicked.connect(self.open_file)
         self.button_layout = QHBoxLayout()
         self.button_layout.addWidget(self.button_open)
+        self.button_open_folder = QPushButton("Open Machine Folder")
+        self.button_open_folder.setToolTip("Merge all CSV files a machine rolled its history into")
+        self.button_open_folder.clicked.connect(self.open_folder)
+        self.button_layout.addWidget(self.button_open_folder)
+        self.button_open_store = QPushButton("Open From Store")
+        self.button_open_store.setToolTip("Load days of a machine from the history store filled by store.py ingest")
+        self.button_open_store.clicked.connect(self.open_from_store)
+        self.button_layout.addWidget(self.button_open_store)
+        self.time_ms_checkbox = QCheckBox("Millisecond timestamps (Time_ms)")
+        self.time_ms_checkbox.setToolTip("Take the time from the Time_ms column, which also orders messages of the same second")
+        self.button_layout.addWidget(self.time_ms_checkbox)
+        self.button_refresh = QPushButton("Refresh")
+        self.button_refresh.setToolTip("Read the lines appended to the file since it was opened")
+        self.button_refresh.clicked.connect(self.refresh_file)
+        self.button_refresh.setEnabled(False)
+        self.button_layout.addWidget(self.button_refresh)
+        self.auto_refresh_checkbox = QCheckBox("Auto refresh")
+        self.auto_refresh_checkbox.toggled.connect(self.toggle_auto_refresh)
+        self.auto_refresh_checkbox.setEnabled(False)
+        self.button_layout.addWidget(self.auto_refresh_checkbox)
+        self.auto_refresh_timer = QTimer(self)
+        self.auto_refresh_timer.setInterval(AUTO_REFRESH_INTERVAL_MS)
+        self.auto_refresh_timer.timeout.connect(self.refresh_file)
+        self.memory_label = QLabel("")
+        self.button_layout.addWidget(self.memory_label)
         self.button_layout.setAlignment(Qt.AlignTop)
         layout.addLayout(self.button_layout)
 
@@ -553,29 +426,66 @@ class MainWindow(QMainWindow):
 
         self.tabs.addTab(self.tab_day, "Day")
         self.tabs.addTab(self.tab_all, "All")
-
-        self.init_day_tab()
-        self.init_all_tab()
+        self.tabs.currentChanged.connect(self.on_single_tab_changed)
 
         layout.addWidget(self.tabs)
         self.tabs.hide()
 
+    def init_single_views(self):
+        """ Build the canvases and tables of the Day and All tabs, once """
+        if self.canvas_day is None:
+            self.init_day_tab()
+            self.init_all_tab()
+
     def init_multiple_tab(self):
         layout = QVBoxLayout(self.tab_multiple)
         self.file_paths = {}
+        self.timeline_cache = {}
+        self.timeline_lanes = None
 
         self.buttons = ["ISD1A", "DECK1A", "SEED1A", "SL1A", "SL1B", "AG1A", "OX1A"]
         self.import_buttons = {}
 
         for button in self.buttons:
+            row = QHBoxLayout()
             btn = QPushButton(button)
             btn.clicked.connect(self.import_file)
-            layout.addWidget(btn)
+            row.addWidget(btn)
+            folder_btn = QPushButton("Folder")
+            folder_btn.setToolTip(f"Merge all CSV files {button} rolled its history into")
+            folder_btn.clicked.connect(lambda checked, button=button: self.import_folder(button))
+            row.addWidget(folder_btn)
+            layout.addLayout(row)
             self.import_buttons[button] = btn
             label = QLabel("")
             layout.addWidget(label)
             self.file_paths[button] = label
 
+        row = QHBoxLayout()
+        row.addWidget(QLabel("Errors of different machines occur together within \u00b1"))
+        self.co_occurrence_window = QSpinBox()
+        self.co_occurrence_window.setRange(1, 3600)
+        self.co_occurrence_window.setValue(10)
+        self.co_occurrence_window.setSuffix(" s")
+        row.addWidget(self.co_occurrence_window)
+        row.addStretch()
+        layout.addLayout(row)
+        self.co_occurrences = None
+
+        row = QHBoxLayout()
+        self.store_checkbox = QCheckBox("From history store")
+        self.store_checkbox.setToolTip("Show the stored machines between the dates instead of the imported files")
+        self.store_checkbox.toggled.connect(self.show_store_range)
+        row.addWidget(self.store_checkbox)
+        self.store_start_date = date_edit()
+        self.store_end_date = date_edit()
+        for label, widget in (("from", self.store_start_date), ("to", self.store_end_date)):
+            row.addWidget(QLabel(label))
+            row.addWidget(widget)
+            widget.setEnabled(False)
+        row.addStretch()
+        layout.addLayout(row)
+
         self.show_button = QPushButton("Show")
         self.show_button.clicked.connect(self.show_imported_files)
         layout.addWidget(self.show_button)
@@ -590,84 +500,121 @@ class MainWindow(QMainWindow):
         if file_path:
             self.file_paths[sender].setText(file_path)
 
+    def import_folder(self, button):
+        directory = QFileDialog.getExistingDirectory(self, f"Open {button} Folder")
+        if directory:
+            self.file_paths[button].setText(directory)
+
     def reset_imported_files(self):
         for button in self.buttons:
             self.file_paths[button].setText("")
+            self.file_paths[button].setToolTip("")
+
+    def show_file_memory(self, file_path, memory):
+        for label in self.file_paths.values():
+            if label.text() == file_path:
+                label.setToolTip(memory)
+
+    def stored_machines(self):
+        """ Names of the machines in the history store, after a warning if there are none """
+        self.load_data_stack()
+        machines = self.history_store.machines()
+        if not machines:
+            QMessageBox.information(self, "History Store", f"{self.history_store.path} holds no records yet. "
+                                    "Add the CSV files of the machines with: python store.py ingest <data directory>")
+        return machines
+
+    def show_store_range(self, checked):
+        """ Offer the days from the first to the last one stored when showing the machines from the store """
+        machines = self.stored_machines() if checked else []
+        if checked and not machines:
+            self.store_checkbox.setChecked(False)
+            return
+        for edit in (self.store_start_date, self.store_end_date):
+            edit.setEnabled(bool(machines))
+        if machines:
+            ranges = [self.history_store.date_range(machine) for machine in machines]
+            first, last = min(start for start, _ in ranges), max(end for _, end in ranges)
+            for edit in (self.store_start_date, self.store_end_date):
+                edit.setDateRange(to_qdate(first), to_qdate(last))
+            self.store_start_date.setDate(to_qdate(first))
+            self.store_end_date.setDate(to_qdate(last))
+
+    def store_date_range(self):
+        import pandas as pd
+        return from_qdate(self.store_start_date.date()), from_qdate(self.store_end_date.date()) + pd.Timedelta(days=1)
 
     def show_imported_files(self):
-        selected_files = {button: self.file_paths[button].text() for button in self.buttons if self.file_paths[button].text()}
-        
+        self.load_data_stack()
+        store, date_range = None, None
+        if self.store_checkbox.isChecked():
+            # The machines of the buttons with records between the dates, by name
+            store, date_range = self.history_store, self.store_date_range()
+            stored = self.history_store.machines()
+            selected_files = {}
+            for button in self.buttons:
+                if button in stored:
+                    first, last = store.date_range(button)
+                    if first < date_range[1] and last >= date_range[0]:
+                        selected_files[button] = button
+        else:
+            selected_files = {button: self.file_paths[button].text() for button in self.buttons if self.file_paths[button].text()}
+
         if len(selected_files) < 2:
-            QMessageBox.warning(self, "Error", "Please import at least two files.")
+            QMessageBox.warning(self, "Error", "Please import at least two files." if store is None
+                                else "The history store holds fewer than two machines between these dates.")
             return
 
+        self.co_occurrences = None
         self.loading_dialog = LoadingDialog(self)
+        self.loading_dialog.show_files(selected_files.values())
         self.loading_dialog.show()
 
-        self.loader_thread = MultipleDataLoaderThread(selected_files.values())
+        self.loader_thread = MultipleDataLoaderThread(selected_files.values(), self.frame_cache, self.timeline_cache,
+                                                      selected_files.keys(), self.co_occurrence_window.value(), store,
+                                                      date_range)
+        self.loader_thread.co_occurrences_found.connect(lambda co_occurrences: setattr(self, 'co_occurrences', co_occurrences))
+        self.loader_thread.timelines_found.connect(
+            lambda timelines: self.show_timelines({button: timelines[path] for button, path in selected_files.items()
+                                                   if path in timelines}))
         self.loader_thread.progress_updated.connect(self.loading_dialog.progress_bar.setValue)
-        self.loader_thread.common_errors_found.connect(lambda common_errors: self.display_common_errors(common_errors, " ".join(selected_files.keys()) + " Common Errors"))
+        self.loader_thread.file_progress.connect(self.loading_dialog.set_file_progress)
+        self.loader_thread.file_loaded.connect(self.show_file_memory)
+        self.loader_thread.skipped.connect(lambda report: QMessageBox.warning(self, "Warning", report))
+        self.loader_thread.common_errors_found.connect(lambda common_errors, thread=self.loader_thread: self.display_common_errors(common_errors, " ".join(thread.machines) + " Common Errors", thread.window_seconds))
+        self.loader_thread.failed.connect(self.on_load_failed)
         self.loader_thread.finished.connect(self.loading_dialog.close)
         self.loader_thread.start()
 
-    def display_common_errors(self, common_errors, window_title):
+    def show_timelines(self, timelines):
+        """ Show the process states of the machines one lane below the other, under the buttons """
+        from views import TimelineLanes
+        if self.timeline_lanes is None:
+            self.timeline_lanes = TimelineLanes(self.tab_multiple)
+            self.tab_multiple.layout().addWidget(self.timeline_lanes, 1)
+        self.timeline_lanes.plot(timelines)
+
+    def display_common_errors(self, common_errors, window_title, window_seconds):
+        import pandas as pd
+        from views import ColumnTableModel, table_view
         self.common_errors_window = QMainWindow(self)
         self.common_errors_window.setWindowTitle(window_title)
         self.common_errors_window.setGeometry(150, 150, 800, 600)
-        central_widget = QWidget()
-        layout = QVBoxLayout(central_widget)
-        table = QTableWidget()
-        table.setRowCount(len(common_errors))
-        table.setColumnCount(3)
-        table.setHorizontalHeaderLabels(['Date', 'Error Message', 'Count'])
-
-        for row in range(len(common_errors)):
-            table.setItem(row, 0, QTableWidgetItem(common_errors.iloc[row, 0].strftime('%d.%m.%Y')))
-            table.setItem(row, 1, QTableWidgetItem(common_errors.iloc[row, 1]))
-            table.setItem(row, 2, QTableWidgetItem(str(common_errors.iloc[row, 2])))
-
-        table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        layout.addWidget(table)
-        self.common_errors_window.setCentralWidget(central_widget)
+        tabs = QTabWidget()
+        model = ColumnTableModel(['Date', 'Error Message', 'Count'], time_format='%d.%m.%Y', parent=self.common_errors_window)
+        model.set_columns([pd.to_datetime(common_errors['Date']), common_errors['Error Message'], common_errors['Count'].astype('int64')])
+        tabs.addTab(table_view(model), "Same Day")
+        if self.co_occurrences is not None:
+            # Pairs of errors of two machines, most frequent first
+            pairs = self.co_occurrences
+            model = ColumnTableModel(list(pairs.columns), parent=self.common_errors_window)
+            model.set_columns([pairs[column] for column in pairs.columns[:-1]] + [pairs['Offset (s)'].round(1)])
+            tabs.addTab(table_view(model), f"Within \u00b1{window_seconds} s")
+        self.common_errors_window.setCentralWidget(tabs)
         self.common_errors_window.show()
 
-    def init_day_tab(self):
-        layout = QVBoxLayout(self.tab_day)
-        self.date_dropdown = QComboBox()
-        self.date_dropdown.currentIndexChanged.connect(self.update_day_tab)
-        layout.addWidget(self.date_dropdown)
-        self.canvas_day = BlockDiagramCanvas(self.tab_day)
-        layout.addWidget(self.canvas_day)
-
-        self.day_tabs = QTabWidget()
-        self.day_chronology_tab = QWidget()
-        self.day_count_tab = QWidget()
-        self.day_fail_chronology_tab = QWidget()
-        self.day_fail_count_tab = QWidget()
-
-        self.day_tabs.addTab(self.day_chronology_tab, "Chronology")
-        self.day_tabs.addTab(self.day_count_tab, "Count")
-        self.day_tabs.addTab(self.day_fail_chronology_tab, "Error Chronology")
-        self.day_tabs.addTab(self.day_fail_count_tab, "Error Count")
-
-        self.day_chronology_all_layout = QVBoxLayout(self.day_chronology_tab)
-        self.day_count_all_layout = QVBoxLayout(self.day_count_tab)
-        self.day_fail_chronology_layout = QVBoxLayout(self.day_fail_chronology_tab)
-        self.day_fail_count_layout = QVBoxLayout(self.day_fail_count_tab)
-
-        self.error_table_day_chronology_all = ErrorTable(None, self.day_chronology_tab, table_type='chronology')
-        self.error_table_day_count_all = ErrorTable(None, self.day_count_tab)
-        self.error_table_day_fail_chronology = ErrorTable(None, self.day_fail_chronology_tab, table_type='chronology')
-        self.error_table_day_fail_count = ErrorTable(None, self.day_fail_count_tab, table_type='fail')
-
-        self.day_chronology_all_layout.addWidget(self.error_table_day_chronology_all)
-        self.day_count_all_layout.addWidget(self.error_table_day_count_all)
-        self.day_fail_chronology_layout.addWidget(self.error_table_day_fail_chronology)
-        self.day_fail_count_layout.addWidget(self.error_table_day_fail_count)
-
-        layout.addWidget(self.day_tabs)
-
     def init_all_tab(self):
+        from views import BlockDiagramCanvas, ErrorTable, StatisticsTab
         layout = QVBoxLayout(self.tab_all)
         self.canvas_all = BlockDiagramCanvas(self.tab_all)
         layout.addWidget(self.canvas_all)
@@ -692,7 +639,7 @@ class MainWindow(QMainWindow):
 
         self.error_table_all_chronology_all = ErrorTable(None, self.all_chronology_tab, table_type='chronology')
         self.error_table_all_count_all = ErrorTable(None, self.all_count_tab)
-        self.error_table_all_fail_chronology = ErrorTable(None, self.all_fail_chronology_tab, table_type='chronology')
+        self.error_table_all_fail_chronology = ErrorTable(None, self.all_fail_chronology_tab, table_type='fail_chronology')
         self.error_table_all_fail_count = ErrorTable(None, self.all_fail_count_tab, table_type='fail')
 
         self.all_chronology_all_layout.addWidget(self.error_table_all_chronology_all)
@@ -700,12 +647,33 @@ class MainWindow(QMainWindow):
         self.all_fail_chronology_layout.addWidget(self.error_table_all_fail_chronology)
         self.all_fail_count_layout.addWidget(self.error_table_all_fail_count)
 
-        self.statistics_widget = StatisticsTab(self.data, self.statistics_tab)
+        self.statistics_widget = StatisticsTab(self.history, self.statistics_tab)
         self.statistics_layout = QVBoxLayout(self.statistics_tab)
         self.statistics_layout.addWidget(self.statistics_widget)
 
+        self.all_views = [self.error_table_all_chronology_all, self.error_table_all_count_all,
+                          self.error_table_all_fail_chronology, self.error_table_all_fail_count, self.statistics_widget]
+        self.all_tabs.currentChanged.connect(lambda index: self.all_views[index].refresh())
+
         layout.addWidget(self.all_tabs)
 
+    def toggle_performance_tab(self):
+        """ Show or hide the Performance tab with the timing spans, which is hidden unless asked for """
+        if self.tab_performance is None:
+            self.load_data_stack()
+            from views import PerformanceTab
+            self.tab_performance = PerformanceTab()
+        index = self.main_tabs.indexOf(self.tab_performance)
+        if index < 0:
+            self.main_tabs.addTab(self.tab_performance, "Performance")
+            self.main_tabs.setCurrentWidget(self.tab_performance)
+        else:
+            self.main_tabs.removeTab(index)
+
+    def on_main_tab_changed(self, index):
+        if self.tab_performance is not None and self.main_tabs.widget(index) is self.tab_performance:
+            self.tab_performance.refresh()
+
     def init_info_tab(self):
         layout = QVBoxLayout(self.tab_info)
         info_label = QLabel(self.tab_info)
@@ -724,150 +692,182 @@ class MainWindow(QMainWindow):
     def open_file(self):
         file_path, _ = QFileDialog.getOpenFileName(self, "Open CSV File", "", "CSV Files (*.csv)")
         if file_path:
-            self.reset_state()  # Reset state before loading new file
+            self.load_file(file_path)
+
+    def open_folder(self):
+        directory = QFileDialog.getExistingDirectory(self, "Open Machine Folder")
+        if directory:
+            self.load_file(directory)
+
+    def open_from_store(self):
+        machines = self.stored_machines()
+        if machines:
+            dialog = StoreRangeDialog(self.history_store, machines, self)
+            if dialog.exec_() == QDialog.Accepted:
+                self.load_from_store(*dialog.selection())
+
+    def load_from_store(self, machine, start, end):
+        self.load_data_stack()
+        self.reset_state()
+        self.file_path = None
+
+        self.loading_dialog = LoadingDialog(self)
+        self.loading_dialog.show()
+
+        self.loader_thread = StoreLoaderThread(self.history_store, machine, start, end)
+        self.loader_thread.progress_updated.connect(self.loading_dialog.progress_bar.setValue)
+        self.loader_thread.data_loaded.connect(self.on_data_loaded)
+        self.loader_thread.failed.connect(self.on_load_failed)
+        self.loader_thread.start()
+
+    def on_load_failed(self, message):
+        self.loading_dialog.close()
+        QMessageBox.warning(self, "Error", message)
 
-            self.loading_dialog = LoadingDialog(self)
-            self.loading_dialog.show()
+    def load_file(self, file_path):
+        self.load_data_stack()
+        self.reset_state()  # Reset state before loading new file
+        self.file_path = file_path
 
-            self.loader_thread = DataLoaderThread(file_path)
-            self.loader_thread.progress_updated.connect(self.loading_dialog.progress_bar.setValue)
-            self.loader_thread.data_loaded.connect(self.on_data_loaded)
-            self.loader_thread.start()
+        self.loading_dialog = LoadingDialog(self)
+        self.loading_dialog.show()
+
+        self.loader_thread = DataLoaderThread(file_path, self.time_ms_checkbox.isChecked(), self.frame_cache)
+        self.loader_thread.progress_updated.connect(self.loading_dialog.progress_bar.setValue)
+        self.loader_thread.data_loaded.connect(self.on_data_loaded)
+        self.loader_thread.failed.connect(self.on_load_failed)
+        self.loader_thread.start()
 
     def reset_state(self):
         # Clear existing data and reset relevant variables
-        self.data = None
-        self.date_dropdown.clear()
+        self.history = None
+        self.tail_reader = None
+        self.button_refresh.setEnabled(False)
+        self.auto_refresh_checkbox.setEnabled(False)
+        self.memory_label.setText("")
         self.tabs.hide()
+        self.canvas_day_shown = None
+        self.canvas_all_shown = None
+        if self.canvas_day is None:
+            return
+        self.date_dropdown.clear()
         self.canvas_day.process_intervals.clear()
         self.canvas_all.process_intervals.clear()
-        
-        self.error_table_day_chronology_all.data = None
-        self.error_table_day_chronology_all.populate_table()
-        self.error_table_day_count_all.data = None
-        self.error_table_day_count_all.populate_table()
-        self.error_table_day_fail_chronology.data = None
-        self.error_table_day_fail_chronology.populate_table()
-        self.error_table_day_fail_count.data = None
-        self.error_table_day_fail_count.populate_table()
-        
-        self.error_table_all_chronology_all.data = None
-        self.error_table_all_chronology_all.populate_table()
-        self.error_table_all_count_all.data = None
-        self.error_table_all_count_all.populate_table()
-        self.error_table_all_fail_chronology.data = None
-        self.error_table_all_fail_chronology.populate_table()
-        self.error_table_all_fail_count.data = None
-        self.error_table_all_fail_count.populate_table()
-        
-        self.statistics_widget.data = None
-        self.statistics_widget.update_statistics()
+        for view in self.day_views + self.all_views:
+            view.set_history(None)
+            view.refresh()
 
     def on_data_loaded(self, data):
-        self.data = data
-        self.process_data()
+        from analysis import History
+        from loader import describe_memory
+        self.init_single_views()
+        with span('History', rows=len(data)):
+            self.history = History(data)
+        self.tail_reader = self.loader_thread.tail_reader
+        self.memory_label.setText(describe_memory(data))
         self.populate_dates()
         self.update_all_tab()
         self.update_day_tab()
         self.tabs.show()  # Show tabs after successful import
+        self.button_refresh.setEnabled(self.tail_reader is not None)
+        self.auto_refresh_checkbox.setEnabled(self.tail_reader is not None)
         self.loading_dialog.close()
 
-    def process_data(self):
-        try:
-            self.data['TimeString'] = self.data['TimeString'].apply(self.correct_time_format)
-            self.data['TimeString'] = pd.to_datetime(self.data['TimeString'])
-        except Exception as e:
-            print(f"Error processing data: {e}")
+    def refresh_file(self):
+        if self.tail_reader is None or (self.tail_thread is not None and self.tail_thread.isRunning()):
+            return
+        self.tail_thread = TailLoaderThread(self.tail_reader)
+        self.tail_thread.rows_loaded.connect(self.on_rows_appended)
+        self.tail_thread.reload_needed.connect(self.on_reload_needed)
+        self.tail_thread.start()
+
+    def toggle_auto_refresh(self, checked):
+        if checked:
+            self.auto_refresh_timer.start()
+        else:
+            self.auto_refresh_timer.stop()
 
-    def correct_time_format(self, time_str):
-        try:
-            return datetime.strptime(time_str, '%d.%m.%Y %H:%M:%S')
-        except ValueError:
-            return datetime.strptime(time_str, '%d.%m.%Y %H:%M').replace(second=0)
+    def is_current_tail(self):
+        """ Whether the tail thread sending a signal reads the file shown now, another file may have been opened since """
+        return self.sender().tail_reader is self.tail_reader
+
+    def on_reload_needed(self):
+        if self.is_current_tail():
+            self.load_file(self.file_path)
+
+    def on_rows_appended(self, rows):
+        if self.history is None or not len(rows) or not self.is_current_tail():
+            return
+        from loader import describe_memory
+        self.history.append(rows)
+        self.memory_label.setText(describe_memory(self.history.data))
+        self.populate_dates()
+        self.update_all_tab()
+        self.update_day_tab()
 
     def populate_dates(self):
-        unique_dates = self.data['TimeString'].dt.date.unique()
+        import pandas as pd
+        # Keep the selected day, the day tab is updated by the caller
+        selected_date = self.date_dropdown.currentText()
+        self.date_dropdown.blockSignals(True)
         self.date_dropdown.clear()
-        for date in sorted(unique_dates, reverse=True):
-            self.date_dropdown.addItem(date.strftime('%d.%m.%Y'))
-
+        for date in sorted(self.history.days(), reverse=True):
+            self.date_dropdown.addItem(pd.Timestamp(date).strftime('%d.%m.%Y'), date)
+        self.date_dropdown.setCurrentIndex(max(self.date_dropdown.findText(selected_date), 0))
+        self.date_dropdown.blockSignals(False)
+
+    def on_single_tab_changed(self, index):
+        if self.history is not None:
+            self.update_day_tab()
+            self.update_all_tab()
+
+    def show_views(self, tabs, views, history):
+        """ Hand the data to the views of a tab widget, only the visible one is filled now, the others when selected """
+        for view in views:
+            view.set_history(history)
+        views[tabs.currentIndex()].refresh()
+
+    @traced('update_day_tab')
     def update_day_tab(self):
-        selected_date = self.date_dropdown.currentText()
-        if selected_date:
-            start_time = pd.Timestamp(datetime.strptime(selected_date, '%d.%m.%Y'))
+        import pandas as pd
+        # Only the visible one of Day and All is drawn, the other one when it is selected
+        index = self.date_dropdown.currentIndex()
+        if index >= 0 and self.tabs.currentWidget() is self.tab_day:
+            date = self.date_dropdown.itemData(index)
+            start_time = pd.Timestamp(date)
             end_time = start_time + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
-            self.canvas_day.plot(self.data, start_time, end_time, day_view=True)
-            self.update_error_tables_day(start_time, end_time)
-
-    def update_error_tables_day(self, start_time, end_time):
-        day_data = self.data[(self.data['TimeString'] >= start_time) & (self.data['TimeString'] <= end_time)]
-        self.error_table_day_chronology_all.data = day_data
-        self.error_table_day_chronology_all.populate_table()
-        self.error_table_day_count_all.data = day_data
-        self.error_table_day_count_all.populate_table()
-        self.error_table_day_fail_chronology.data = day_data
-        self.error_table_day_fail_chronology.populate_table()
-        self.error_table_day_fail_count.data = day_data
-        self.error_table_day_fail_count.populate_table()
-
-    def update_error_tables(self, start_time, end_time):
-        day_data = self.data[(self.data['TimeString'] >= start_time) & (self.data['TimeString'] <= end_time)]
-        self.error_table_day_chronology_all.data = day_data
-        self.error_table_day_chronology_all.populate_table()
-        self.error_table_day_count_all.data = day_data
-        self.error_table_day_count_all.populate_table()
-        self.error_table_day_fail_chronology.data = self.get_fail_chronology_data(day_data)
-        self.error_table_day_fail_chronology.populate_table()
-        self.error_table_day_fail_count.data = day_data
-        self.error_table_day_fail_count.populate_table()
+            shown = (self.history, self.history.version, start_time)
+            if self.canvas_day_shown != shown:
+                self.canvas_day.plot(self.history, start_time, end_time, day_view=True)
+                self.canvas_day_shown = shown
+            self.update_error_tables_day(date)
+
+            # Have the days before and after ready when the user flips on
+            for neighbour in (index - 1, index + 1):
+                if 0 <= neighbour < self.date_dropdown.count():
+                    self.prefetcher.submit(self.history.prefetch_day, self.date_dropdown.itemData(neighbour))
 
+    def update_error_tables_day(self, date):
+        self.show_views(self.day_tabs, self.day_views, self.history.day(date))
+
+    @traced('update_all_tab')
     def update_all_tab(self):
-        if self.data is not None:
-            start_time = self.data['TimeString'].min().normalize()
-            end_time = self.data['TimeString'].max().normalize() + pd.Timedelta(days=1)
-            self.canvas_all.plot(self.data, start_time, end_time, day_view=False, plot_coating_only=True)
-            self.error_table_all_chronology_all.data = self.data
-            self.error_table_all_chronology_all.populate_table()
-            self.error_table_all_count_all.data = self.data
-            self.error_table_all_count_all.populate_table()
-            self.error_table_all_fail_chronology.data = self.get_fail_chronology_data(self.data)
-            self.error_table_all_fail_chronology.populate_table()
-            self.error_table_all_fail_count.data = self.data
-            self.error_table_all_fail_count.populate_table()
-            self.statistics_widget.data = self.data
-            self.statistics_widget.update_statistics()
-
-    def get_fail_chronology_data(self, data):
-        excluded_msg_numbers = list(range(29, 38)) + list(range(58, 66)) + list(range(73, 80)) + list(range(90, 93)) + list(range(125, 141)) + list(range(148, 152)) + [173, 174]
-        fail_chronology_data = []
-        process_start_time = None
-        error_messages = ["Anlagezustand-BM : Prozess beenden", "Anlagezustand-VM : Anfahren Fehlerstatus", "Anlagezustand-BM : Anfahren Fehlerstatus"]
-
-        for index, row in data.iterrows():
-            if "Anlagezustand-BM : Prozess starten" in row['MsgText']:
-                process_start_time = row['TimeString']
-            if process_start_time is not None and any(error_msg in row['MsgText'] for error_msg in error_messages):
-                process_end_time = row['TimeString']
-                duration = (process_end_time - process_start_time).total_seconds() / 60
-                if duration >= 30:
-                    fail_window_start = process_end_time - timedelta(seconds=30)
-                    fail_window_end = process_end_time + timedelta(seconds=30)
-                    fail_data = self.data[(data['TimeString'] >= fail_window_start) &
-                                          (data['TimeString'] <= fail_window_end) &
-                                          (data['StateAfter'] == 1) &
-                                          (~data['MsgNumber'].isin(excluded_msg_numbers))]
-                    if not fail_data.empty:
-                        fail_chronology_data.append(fail_data)
-                process_start_time = None
-        if fail_chronology_data:
-            return pd.concat(fail_chronology_data)
-        else:
-            return pd.DataFrame(columns=self.data.columns)
-        
+        import pandas as pd
+        if self.history is not None and self.tabs.currentWidget() is self.tab_all:
+            shown = (self.history, self.history.version)
+            if self.canvas_all_shown != shown:
+                times = self.history.data['TimeString']
+                start_time = times.min().normalize()
+                end_time = times.max().normalize() + pd.Timedelta(days=1)
+                self.canvas_all.plot(self.history, start_time, end_time, day_view=False, plot_coating_only=True)
+                self.canvas_all_shown = shown
+            self.show_views(self.all_tabs, self.all_views, self.history)
+
     def init_day_tab(self):
+        from views import BlockDiagramCanvas, ErrorTable, ErrorTableDay
         layout = QVBoxLayout(self.tab_day)
         self.date_dropdown = QComboBox()
-        self.date_dropdown.currentIndexChanged.connect(self.update_day_tab)
+        self.date_dropdown.currentIndexChanged.connect(lambda index: self.update_day_tab())
         layout.addWidget(self.date_dropdown)
         self.canvas_day = BlockDiagramCanvas(self.tab_day)
         layout.addWidget(self.canvas_day)
@@ -898,12 +898,48 @@ class MainWindow(QMainWindow):
         self.day_fail_chronology_layout.addWidget(self.error_table_day_fail_chronology)
         self.day_fail_count_layout.addWidget(self.error_table_day_fail_count)
 
+        # Views in the order of their tabs, a view is filled when its tab is shown
+        self.day_views = [self.error_table_day_chronology_all, self.error_table_day_count_all,
+                          self.error_table_day_fail_chronology, self.error_table_day_fail_count]
+        self.day_tabs.currentChanged.connect(lambda index: self.day_views[index].refresh())
+
         layout.addWidget(self.day_tabs)
 
 
 
+def parse_arguments(argv):
+    parser = argparse.ArgumentParser(description="Error Reporter")
+    parser.add_argument('--fast-start', action='store_true',
+                        help="show the window first, import the data stack and build the views later")
+    parser.add_argument('--startup-report', nargs='?', const='', metavar='FILE',
+                        help="print the time of every startup phase, write it as JSON to FILE, and quit")
+    parser.add_argument('--trace', action='store_true',
+                        help="record timing spans from the start and show the Performance tab (also Ctrl+Shift+P)")
+    return parser.parse_known_args(argv)[0]
+
 if __name__ == '__main__':
+    freeze_support()  # Needed by the loader processes of the frozen executable
+    arguments = parse_arguments(sys.argv[1:])
+    report = StartupReport(arguments.startup_report) if arguments.startup_report is not None else None
+    if report is not None:
+        report.mark('imports')
+    tracer.enabled = tracer.enabled or arguments.trace
     app = QApplication(sys.argv)
-    main_window = MainWindow()
+    main_window = MainWindow(fast_start=arguments.fast_start)
+    if report is not None:
+        report.mark('window')
     main_window.showMaximized()
+
+    def after_show():
+        # Runs once the event loop has painted the window
+        if report is not None:
+            report.mark('shown')
+        main_window.load_data_stack()
+        if arguments.trace:
+            main_window.toggle_performance_tab()
+        if report is not None:
+            report.mark('data stack')
+            report.write()
+            app.quit()
+    QTimer.singleShot(0, after_show)
     sys.exit(app.exec_())
\ No newline at end of file
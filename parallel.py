@@ -0,0 +1,130 @@
+import multiprocessing
+import os
+import queue
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from cache import decode_frame, encode_frame
+from classification import add_classes, machine_classification
+from loader import load_csv, load_rotated, rotated_files
+from tracing import traced
+
+PROGRESS_STEP = 0.05  # Fraction of a file between two progress reports of a worker
+POLL_INTERVAL = 0.1  # Seconds between two looks at the progress reports while waiting for the workers
+
+_progress_queue = None  # Set in every worker process by init_worker
+
+
+def init_worker(progress_queue):
+    global _progress_queue
+    _progress_queue = progress_queue
+
+
+def load_path(path, progress=None):
+    """ Load a Fehlerhistorie file, or the rotated files of a machine directory merged into one """
+    if os.path.isdir(path):
+        return load_rotated(rotated_files(path), progress=progress)
+    return load_csv(path, progress=progress)
+
+
+def load_columns(path, cache=None, options=''):
+    """
+    Worker side of load_files: parse a file or directory, store it in the cache and return its column arrays.
+    The arrays of encode_frame are the ones the cache stores, so the worker hands its result to the cache and the
+    parent process in the same layout. They are pickled and copied to the parent like any result, not shared.
+    """
+    fingerprint = cache.fingerprint(path) if cache is not None else None
+    reported = [0.0]
+
+    def progress(fraction):
+        if fraction - reported[0] >= PROGRESS_STEP:
+            reported[0] = fraction
+            _progress_queue.put((path, fraction))
+
+    arrays = encode_frame(load_path(path, progress))
+    if cache is not None:
+        cache.store_arrays(fingerprint, arrays, options)
+    return arrays
+
+
+def worker_count(files):
+    return max(1, min(files, os.cpu_count() or 1))
+
+
+@traced('load_files')
+def load_files(paths, cache=None, options='', progress=None, file_loaded=None, file_failed=None):
+    """
+    Load several Fehlerhistorie files or machine directories and return their frames in the order of paths.
+    Directories are not cached. Cached files are read right away, the others are parsed in a pool of processes with one worker per core.
+    The Class column is added from the profile of each machine once a file is loaded, so it is never cached.
+    progress(path, fraction) is called while a file is parsed and file_loaded(path, data) once it is loaded.
+    A file which cannot be loaded (unreadable, malformed, invalid profile) keeps None as its frame and is reported
+    to file_failed(path, error), the other files are still loaded; without file_failed the error is raised.
+    """
+    frames = [None] * len(paths)
+    finished = set()
+
+    def failed(i, error):
+        finished.add(paths[i])
+        if file_failed is None:
+            raise error
+        file_failed(paths[i], error)
+
+    def loaded(i, data):
+        try:
+            data = add_classes(data, machine_classification(paths[i]))
+        except Exception as e:
+            failed(i, e)
+            return
+        frames[i] = data
+        finished.add(paths[i])
+        if progress is not None:
+            progress(paths[i], 1.0)
+        if file_loaded is not None:
+            file_loaded(paths[i], data)
+
+    missing = []
+    for i, path in enumerate(paths):
+        data = cache.load(path, options) if cache is not None and not os.path.isdir(path) else None
+        if data is None:
+            missing.append(i)
+        else:
+            loaded(i, data)
+
+    if len(missing) == 1:  # Not worth starting a process
+        i = missing[0]
+        file_cache = None if os.path.isdir(paths[i]) else cache
+        try:
+            fingerprint = file_cache.fingerprint(paths[i]) if file_cache is not None else None
+            data = load_path(paths[i], None if progress is None else lambda fraction: progress(paths[i], fraction))
+            if file_cache is not None:
+                cache.store(fingerprint, data, options)
+        except Exception as e:
+            failed(i, e)
+        else:
+            loaded(i, data)
+    elif missing:
+        # Spawned workers, forking a process with Qt and loader threads running is not safe
+        context = multiprocessing.get_context('spawn')
+        progress_queue = context.Queue()
+        with ProcessPoolExecutor(worker_count(len(missing)), mp_context=context,
+                                 initializer=init_worker, initargs=(progress_queue,)) as executor:
+            pending = {executor.submit(load_columns, paths[i], None if os.path.isdir(paths[i]) else cache, options): i
+                       for i in missing}
+            while pending:
+                done, _ = wait(pending, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+                try:
+                    while True:
+                        path, fraction = progress_queue.get_nowait()
+                        if progress is not None and path not in finished:
+                            progress(path, fraction)
+                except queue.Empty:
+                    pass
+                for future in done:
+                    i = pending.pop(future)
+                    try:
+                        data = decode_frame(future.result())
+                    except Exception as e:
+                        failed(i, e)
+                    else:
+                        loaded(i, data)
+        progress_queue.close()
+    return frames
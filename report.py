@@ -0,0 +1,247 @@
+"""
+Headless batch report: run the analyses of the Single tab over every machine of a data tree like
+Data/<machine>/*.csv and write the results as CSV, JSON and/or XLSX. Does not import Qt or matplotlib.
+
+    python report.py Data --output reports --format csv json xlsx
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import textwrap
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from analysis import History, StreamingHistory, message_counts, sort_by_time
+from classification import add_classes, machine_classification
+from loader import describe_memory, load_rotated, rotated_files, stream_rotated
+from parallel import worker_count
+
+FORMATS = ('csv', 'json', 'xlsx')
+SPOOL_ROWS = 100_000  # Rows of a spooled table read back at a time
+
+
+def machine_directories(root):
+    """ Map machine name to directory: the subdirectories of root with CSV files, or root itself if it has some """
+    if rotated_files(root):
+        return {os.path.basename(os.path.abspath(root)): root}
+    return {name: os.path.join(root, name) for name in sorted(os.listdir(root))
+            if os.path.isdir(os.path.join(root, name)) and rotated_files(os.path.join(root, name))}
+
+
+def count_table(counts):
+    return pd.DataFrame({'Error Message': counts.index.astype(object), 'Count': counts.to_numpy()})
+
+
+def chronology_table(data):
+    return pd.DataFrame({'Time': data['TimeString'].to_numpy(), 'Error Message': data['MsgText'].astype(object).to_numpy()})
+
+
+class SpooledTable:
+    """
+    A chronology table of --stream, appended part by part to a temporary file as its rows become final and read back
+    part by part when the report is written, so it is never in memory whole
+    """
+    def __init__(self, directory):
+        self.file = tempfile.TemporaryFile('w+', encoding='utf-8', newline='', dir=directory, suffix='.csv')
+        self.rows = 0
+
+    def append(self, table):
+        # Times as nanoseconds, so the parts read back the same whatever their precision
+        table.assign(Time=table['Time'].to_numpy(dtype='datetime64[ns]').view(np.int64)).to_csv(
+            self.file, sep=';', index=False, header=False)
+        self.rows += len(table)
+
+    def parts(self):
+        if not self.rows:
+            yield chronology_table(pd.DataFrame({'TimeString': np.zeros(0, dtype='datetime64[ns]'), 'MsgText': []}))
+            return
+        self.file.flush()
+        self.file.seek(0)
+        for part in pd.read_csv(self.file, sep=';', names=['Time', 'Error Message'], dtype={'Time': np.int64, 'Error Message': object},
+                                keep_default_na=False, na_values=[''], chunksize=SPOOL_ROWS):
+            yield part.assign(Time=part['Time'].to_numpy().view('datetime64[ns]'))
+
+    def close(self):
+        self.file.close()
+
+
+def table_parts(table):
+    return table.parts() if isinstance(table, SpooledTable) else [table]
+
+
+def machine_summary(history, errors, fail_errors, fail_percentage, durations, failed_processes):
+    """ The statistics tab of one machine, from the amounts of errors and fail errors """
+    processes = len(durations)
+    first, last = history.time_range()
+    return {
+        'Messages': len(history),
+        'First message': first.isoformat() if first is not None else None,
+        'Last message': last.isoformat() if last is not None else None,
+        'Errors': errors,
+        'Fail errors': fail_errors,
+        'Percentage of fail errors': round(fail_percentage, 2),
+        'Processes': processes,
+        'Failed processes': failed_processes,
+        'Percentage of failed processes': round(failed_processes / processes * 100, 2) if processes else 0.0,
+        'Mean process duration (min)': round(float(np.mean(durations)), 2) if processes else None,
+        'Median process duration (min)': round(float(np.median(durations)), 2) if processes else None,
+    }
+
+
+def machine_report(history):
+    """ The tables of the All tab and a summary of the statistics tab for one History """
+    fail_data = history.fail_data()
+    durations, failed_processes = history.process_statistics()
+    errors = history.errors()
+    summary = machine_summary(history, len(errors), len(fail_data), history.fail_percentage(fail_data), durations,
+                              failed_processes)
+    tables = {
+        'count': count_table(history.error_counts()),
+        'chronology': chronology_table(errors),
+        'fail_chronology': chronology_table(fail_data.sort_values(by='TimeString', kind='stable')),
+        'fail': count_table(message_counts(fail_data['MsgText'])),
+        'processes': pd.DataFrame({'Duration (min)': np.asarray(durations, dtype=float)}),
+    }
+    return summary, tables
+
+
+def json_text(value, indent):
+    """ value as json.dump(..., indent=1) writes it nested indent levels deep """
+    return textwrap.indent(json.dumps(value, ensure_ascii=False, indent=1), ' ' * indent)[indent:]
+
+
+def write_json(path, machine, summary, tables):
+    """ Write the report like json.dump(..., indent=1) of one dict, a table part after the other """
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f'{{\n "machine": {json_text(machine, 1)},\n "summary": {json_text(summary, 1)}')
+        for name, table in tables.items():
+            f.write(f',\n {json_text(name, 1)}: [')
+            records = 0
+            for part in table_parts(table):
+                for record in json.loads(part.to_json(orient='records', date_format='iso')):
+                    f.write(f'{"," if records else ""}\n  {json_text(record, 2)}')
+                    records += 1
+            f.write('\n ]' if records else ']')
+        f.write('\n}')
+
+
+def write_report(directory, machine, summary, tables, formats):
+    """ Write the report of one machine; the tables are DataFrames or SpooledTables, which are written part by part """
+    os.makedirs(directory, exist_ok=True)
+    if 'csv' in formats:
+        for name, table in tables.items():
+            for i, part in enumerate(table_parts(table)):
+                part.to_csv(os.path.join(directory, f"{machine}_{name}.csv"), sep=';', index=False, mode='a' if i else 'w',
+                            header=not i)
+    if 'json' in formats:
+        write_json(os.path.join(directory, f"{machine}.json"), machine, summary, tables)
+    if 'xlsx' in formats:
+        with pd.ExcelWriter(os.path.join(directory, f"{machine}.xlsx")) as writer:
+            pd.DataFrame(summary.items(), columns=['Statistic', 'Value']).to_excel(writer, sheet_name='summary', index=False)
+            for name, table in tables.items():
+                row = 0
+                for part in table_parts(table):
+                    part.to_excel(writer, sheet_name=name, index=False, startrow=row, header=not row)
+                    row += len(part) + (not row)
+
+
+def stream_report(directory, spool_directory, use_time_ms=False):
+    """
+    Analyse the files of a machine chunk by chunk and return the history, summary and tables like machine_report.
+    Only the aggregates are kept in memory, the chronologies are spooled to files in spool_directory.
+    """
+    classification = machine_classification(directory)
+    os.makedirs(spool_directory, exist_ok=True)
+    spooled = {name: SpooledTable(spool_directory) for name in ('errors', 'fail_data')}
+    try:
+        history = StreamingHistory(lambda name, rows: spooled[name].append(chronology_table(rows)))
+        for block in stream_rotated(rotated_files(directory), use_time_ms):
+            history.add(add_classes(block, classification))
+        history.finish()
+    except Exception:
+        for table in spooled.values():
+            table.close()
+        raise
+    durations, failed_processes = history.process_statistics()
+    summary = machine_summary(history, history.error_count(), history.fail_count(), history.fail_percentage(), durations,
+                              failed_processes)
+    tables = {
+        'count': count_table(history.error_counts()),
+        'chronology': spooled['errors'],
+        'fail_chronology': spooled['fail_data'],
+        'fail': count_table(history.fail_counts()),
+        'processes': pd.DataFrame({'Duration (min)': np.asarray(durations, dtype=float)}),
+    }
+    return history, summary, tables
+
+
+def run_machine(machine, directory, output, formats, use_time_ms=False, stream=False):
+    """ Worker: load, analyse and write one machine, return its summary """
+    start = time.perf_counter()
+    if stream:
+        history, summary, tables = stream_report(directory, output, use_time_ms)
+        memory = f"{len(history):,} messages streamed"
+        try:
+            write_report(output, machine, summary, tables, formats)
+        finally:
+            for table in tables.values():
+                if isinstance(table, SpooledTable):
+                    table.close()
+    else:
+        data = add_classes(sort_by_time(load_rotated(rotated_files(directory), use_time_ms)), machine_classification(directory))
+        history = History(data)
+        memory = describe_memory(data)
+        summary, tables = machine_report(history)
+        write_report(output, machine, summary, tables, formats)
+    print(f"{machine}: {memory}, {time.perf_counter() - start:.1f} s", flush=True)
+    return summary
+
+
+def run(root, output, formats=FORMATS, use_time_ms=False, workers=None, stream=False):
+    """ Report every machine below root in parallel, one process per machine; returns the failed machines """
+    machines = machine_directories(root)
+    if not machines:
+        print(f"No CSV files found in {root}", file=sys.stderr)
+        return [root]
+    summaries, failed = {}, []
+    with ProcessPoolExecutor(workers or worker_count(len(machines))) as executor:
+        futures = {executor.submit(run_machine, machine, directory, output, formats, use_time_ms, stream): machine
+                   for machine, directory in machines.items()}
+        for future in as_completed(futures):
+            machine = futures[future]
+            try:
+                summaries[machine] = future.result()
+            except Exception as e:
+                print(f"{machine}: {type(e).__name__}: {e}", file=sys.stderr)
+                failed.append(machine)
+
+    summary = pd.DataFrame.from_dict(summaries, orient='index').rename_axis('Machine').sort_index()
+    if 'csv' in formats:
+        summary.to_csv(os.path.join(output, 'summary.csv'), sep=';')
+    if 'json' in formats:
+        summary.reset_index().to_json(os.path.join(output, 'summary.json'), orient='records', indent=1, force_ascii=False)
+    if 'xlsx' in formats:
+        summary.to_excel(os.path.join(output, 'summary.xlsx'))
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write the error reports of every machine in a data tree.")
+    parser.add_argument('data', help="directory with one subdirectory of Fehlerhistorie CSV files per machine")
+    parser.add_argument('-o', '--output', default='reports', help="directory the reports are written to")
+    parser.add_argument('-f', '--format', nargs='+', choices=FORMATS, default=list(FORMATS), help="output formats")
+    parser.add_argument('--time-ms', action='store_true', help="take the time from the Time_ms column")
+    parser.add_argument('-j', '--workers', type=int, help="processes, by default one per CPU core")
+    parser.add_argument('--stream', action='store_true', help="analyse the files chunk by chunk instead of loading them "
+                                                              "whole, for histories larger than the memory")
+    args = parser.parse_args(argv)
+    os.makedirs(args.output, exist_ok=True)
+    failed = run(args.data, args.output, args.format, args.time_ms, args.workers, args.stream)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
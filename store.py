@@ -0,0 +1,347 @@
+"""
+Local history store: the messages of all machines in one SQLite database, so date ranges and message counts over
+years are queried without reading the CSV files again. Ingesting is idempotent and incremental: unchanged files are
+skipped, files which grew are read from where the last ingest stopped, and records stored already (also the ones
+several rotated files share) are kept once. Records stay in the store after WinCC dropped them from its files.
+
+    python store.py ingest Data
+    python store.py count SL1A 45 --from 2023-01-01
+    python store.py days --from 2024-06-01 --to 2024-06-30
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from contextlib import closing
+from itertools import repeat
+import numpy as np
+import pandas as pd
+from analysis import NS_PER_DAY
+from classification import add_classes, machine_classification
+from loader import TIME_RESOLUTIONS_NS, TailReader, load_csv, rotated_files, time_resolution
+from tracing import traced
+
+STORE_VERSION = 1  # PRAGMA user_version of the schema below
+MISSING = -1  # MsgNumber, StateAfter and message id of records without them, NULL would not be unique
+FIRST_NS, LAST_NS = -2 ** 63, 2 ** 63 - 1
+SECOND_NS = TIME_RESOLUTIONS_NS[1]
+
+# records has one row per message for SQL queries. Its primary key keeps the rows of a machine in time order and
+# identifies a record like merge_rotated does, by time, MsgNumber, StateAfter and the occurrence of that key in its
+# file; sequence is the ingest order of the machine, which orders the messages of the same time. days holds the same
+# records packed as column arrays per machine and day: loading a range reads a few blobs instead of creating Python
+# objects for every row, which would take seconds for years of messages.
+SCHEMA = """
+BEGIN;
+CREATE TABLE IF NOT EXISTS machines (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL, directory TEXT,
+                                     revision INTEGER NOT NULL DEFAULT 0, sequence INTEGER NOT NULL DEFAULT 0);
+CREATE TABLE IF NOT EXISTS messages (id INTEGER PRIMARY KEY, text TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS sources (path TEXT PRIMARY KEY, machine INTEGER NOT NULL, size INTEGER NOT NULL,
+                                    mtime INTEGER NOT NULL, position INTEGER NOT NULL, last_line BLOB NOT NULL,
+                                    partial_line BLOB, tail TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS records (machine INTEGER NOT NULL, time INTEGER NOT NULL, msg_number INTEGER NOT NULL,
+                                    state_after INTEGER NOT NULL, occurrence INTEGER NOT NULL,
+                                    sequence INTEGER NOT NULL, date INTEGER NOT NULL, message INTEGER,
+                                    PRIMARY KEY (machine, time, msg_number, state_after, occurrence)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS records_machine_number ON records (machine, msg_number, state_after, time);
+CREATE INDEX IF NOT EXISTS records_date ON records (date, machine);
+CREATE TABLE IF NOT EXISTS days (machine INTEGER NOT NULL, date INTEGER NOT NULL, times BLOB NOT NULL,
+                                 numbers BLOB NOT NULL, states BLOB NOT NULL, messages BLOB NOT NULL,
+                                 PRIMARY KEY (machine, date)) WITHOUT ROWID;
+PRAGMA user_version = 1;
+COMMIT;
+"""
+DAY_COLUMNS = (np.int64, np.int32, np.int8, np.int32)  # Types of times, numbers, states and messages in days
+
+
+def default_store_path():
+    """ Per-user database file, ERROR_REPORTER_STORE overrides it """
+    if os.environ.get('ERROR_REPORTER_STORE'):
+        return os.environ['ERROR_REPORTER_STORE']
+    if sys.platform == 'win32':
+        root = os.environ.get('LOCALAPPDATA', os.path.expanduser('~'))
+    else:
+        root = os.environ.get('XDG_DATA_HOME', os.path.join(os.path.expanduser('~'), '.local', 'share'))
+    return os.path.join(root, 'Error Reporter', 'history.sqlite')
+
+
+def time_bounds(start, end):
+    """ Nanoseconds of start and end, the whole time axis where they are None """
+    return (FIRST_NS if start is None else pd.Timestamp(start).value,
+            LAST_NS if end is None else pd.Timestamp(end).value)
+
+
+def occurrences(times, numbers, states, tail):
+    """
+    Number every record among the earlier records of its file with the same time, MsgNumber and StateAfter.
+    tail has the counts of the keys at the latest time read from the file before, as {'time': ns, 'counts':
+    [[MsgNumber, StateAfter, count], ...]}; return the numbers and the tail after these records.
+    """
+    keys = pd.DataFrame({'time': times, 'number': numbers, 'state': states})
+    occurrence = keys.groupby(['time', 'number', 'state'], sort=False).cumcount().to_numpy()
+    counts = {(number, state): count for number, state, count in tail.get('counts', [])}
+    if counts:
+        for i in np.flatnonzero(times == tail['time']):
+            occurrence[i] += counts.get((numbers[i], states[i]), 0)
+    if not len(times) or tail.get('time', FIRST_NS) > times.max():
+        return occurrence, tail
+
+    latest = int(times.max())
+    counts = counts if tail.get('time') == latest else {}
+    at = np.flatnonzero(times == latest)
+    for number, state, count in zip(numbers[at].tolist(), states[at].tolist(), (occurrence[at] + 1).tolist()):
+        counts[(number, state)] = max(counts.get((number, state), 0), count)
+    return occurrence, {'time': latest, 'counts': [[number, state, count] for (number, state), count in counts.items()]}
+
+
+class HistoryStore:
+    """
+    The messages of all machines in a SQLite database, see SCHEMA. Every call opens its own connection, so the
+    store can be used from loader threads while another process ingests.
+    """
+    def __init__(self, path=None):
+        self.path = path or default_store_path()
+
+    def connect(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=60)
+        connection.execute('PRAGMA journal_mode = WAL')  # Readers do not wait for an ingest
+        connection.execute('PRAGMA synchronous = NORMAL')
+        version = connection.execute('PRAGMA user_version').fetchone()[0]
+        if version == 0:
+            connection.executescript(SCHEMA)
+        elif version != STORE_VERSION:
+            connection.close()
+            raise ValueError(f"{self.path} is a store of version {version}, not {STORE_VERSION}")
+        return connection
+
+    def machine(self, connection, name):
+        """ (id, directory, revision) of a machine """
+        row = connection.execute('SELECT id, directory, revision FROM machines WHERE name = ?', (name,)).fetchone()
+        if row is None:
+            raise KeyError(f"No machine {name} in {self.path}")
+        return row
+
+    def machines(self):
+        """ Names of the machines with records """
+        with closing(self.connect()) as connection:
+            return [name for name, in connection.execute('SELECT name FROM machines WHERE EXISTS '
+                                                         '(SELECT 1 FROM days WHERE machine = machines.id) ORDER BY name')]
+
+    def revision(self, name):
+        """ Number which changes with every ingest adding records of the machine """
+        with closing(self.connect()) as connection:
+            return self.machine(connection, name)[2]
+
+    def date_range(self, name):
+        """ First and last day with records of a machine, as Timestamps """
+        with closing(self.connect()) as connection:
+            first, last = connection.execute('SELECT MIN(date), MAX(date) FROM days WHERE machine = ?',
+                                             (self.machine(connection, name)[0],)).fetchone()
+        return pd.Timestamp(first * NS_PER_DAY), pd.Timestamp(last * NS_PER_DAY)
+
+    @traced('store_ingest')
+    def ingest(self, name, directory, paths=None):
+        """
+        Add the records of the CSV files of a machine directory (or of the given ones) which are not stored yet,
+        return their amount
+        """
+        paths = rotated_files(directory) if paths is None else paths
+        directory = os.path.abspath(directory)
+        with closing(self.connect()) as connection:
+            with connection:
+                connection.execute('INSERT OR IGNORE INTO machines (name) VALUES (?)', (name,))
+                connection.execute('UPDATE machines SET directory = ? WHERE name = ?', (directory, name))
+            machine = self.machine(connection, name)[0]
+            reads = [read for read in (self.read_file(connection, path) for path in paths) if read is not None]
+            # The files with the finest times first, like merge_rotated ranks them
+            reads.sort(key=lambda read: time_resolution(read[2]['TimeString']))
+            return sum(self.store_file(connection, machine, *read) for read in reads)
+
+    def read_file(self, connection, path):
+        """
+        The records of a file not read by an earlier ingest, only the appended ones when possible, as
+        (path, stat, data, reader, tail) for store_file; None if the file did not change
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        source = connection.execute('SELECT size, mtime, position, last_line, partial_line, tail FROM sources '
+                                    'WHERE path = ?', (path,)).fetchone()
+        if source is not None and source[:2] == (stat.st_size, stat.st_mtime_ns):
+            return None
+        if source is not None:
+            reader = TailReader.resume(path, *source[2:5])
+            data = reader.read_new()
+            if data is not None:
+                return path, stat, data, reader, json.loads(source[5])
+        # New, rotated or rewritten: up to the last complete record, the records stored already are skipped
+        complete = TailReader(path, stat.st_size)
+        return path, stat, load_csv(path, complete.offset), TailReader.resume(path, complete.offset, complete.last_line), {}
+
+    def store_file(self, connection, machine, path, stat, data, reader, tail):
+        """ Insert the records read from a file and remember where reading stopped, in one transaction """
+        with connection:
+            added, tail = self.insert(connection, machine, data, tail)
+            connection.execute('INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                               (path, machine, stat.st_size, stat.st_mtime_ns, reader.offset, reader.last_line,
+                                reader.partial_line, json.dumps(tail)))
+        return added
+
+    def insert(self, connection, machine, data, tail):
+        """ Insert the records of a file read after tail, pack the days they fall on; return the amount added and the tail """
+        times = data['TimeString'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+        numbers = data['MsgNumber'].fillna(MISSING).to_numpy(dtype=np.int64)
+        states = data['StateAfter'].fillna(MISSING).to_numpy(dtype=np.int64)
+        occurrence, tail = occurrences(times, numbers, states, tail)
+        resolution = time_resolution(data['TimeString'])
+        if resolution > SECOND_NS and len(times):
+            new = self.not_stored(connection, machine, times, numbers, states, resolution)
+            data, times, numbers, states, occurrence = data[new], times[new], numbers[new], states[new], occurrence[new]
+        messages = self.message_ids(connection, data['MsgText']).tolist()
+        messages = [None if message == MISSING else message for message in messages]
+        sequence = connection.execute('SELECT sequence FROM machines WHERE id = ?', (machine,)).fetchone()[0]
+        before = connection.total_changes
+        connection.executemany('INSERT OR IGNORE INTO records VALUES (?, ?, ?, ?, ?, ?, ?, ?)', zip(
+            repeat(machine), times.tolist(), numbers.tolist(), states.tolist(), occurrence.tolist(),
+            range(sequence, sequence + len(times)), (times // NS_PER_DAY).tolist(), messages))
+        added = connection.total_changes - before
+        if added:
+            connection.execute('UPDATE machines SET sequence = ?, revision = revision + 1 WHERE id = ?',
+                               (sequence + len(times), machine))
+            self.pack_days(connection, machine, int(times.min()) // NS_PER_DAY, int(times.max()) // NS_PER_DAY)
+        return added, tail
+
+    def not_stored(self, connection, machine, times, numbers, states, resolution):
+        """
+        Mask of the records of a file which lost its seconds (saved again by Excel) that are not stored with finer
+        times: per minute, MsgNumber and StateAfter, the file adds the records beyond the amount stored already
+        """
+        minutes = times - times % resolution
+        stored = connection.execute('SELECT time - time % ?, msg_number, state_after FROM records '
+                                    'WHERE machine = ? AND time >= ? AND time < ?',
+                                    (resolution, machine, int(minutes.min()), int(minutes.max()) + resolution)).fetchall()
+        keys = ['time', 'number', 'state']
+        counts = pd.DataFrame(stored, columns=keys).groupby(keys).size()
+        file_keys = pd.DataFrame({'time': minutes, 'number': numbers, 'state': states})
+        occurrence = file_keys.groupby(keys, sort=False).cumcount().to_numpy()
+        return occurrence >= counts.reindex(pd.MultiIndex.from_frame(file_keys), fill_value=0).to_numpy()
+
+    def message_ids(self, connection, texts):
+        """ Id of the text of every record, MISSING without text; new texts are added with the next ids """
+        texts = texts.astype('category')
+        known = dict(connection.execute('SELECT text, id FROM messages'))
+        new = [text for text in texts.cat.categories if text not in known]
+        ids = range(len(known), len(known) + len(new))
+        connection.executemany('INSERT INTO messages VALUES (?, ?)', zip(ids, new))
+        known.update(zip(new, ids))
+        ids = np.array([known[text] for text in texts.cat.categories] + [MISSING], dtype=np.int64)
+        return ids[texts.cat.codes.to_numpy()]  # Code -1 takes the last entry
+
+    def pack_days(self, connection, machine, first_day, last_day):
+        """ Pack the records of a machine from first_day to last_day into days, by time and ingest order """
+        rows = connection.execute('SELECT time, msg_number, state_after, IFNULL(message, ?), sequence FROM records '
+                                  'WHERE machine = ? AND time >= ? AND time < ?',
+                                  (MISSING, machine, first_day * NS_PER_DAY, (last_day + 1) * NS_PER_DAY)).fetchall()
+        records = np.array(rows, dtype=np.int64).reshape(-1, 5)
+        records = records[np.lexsort((records[:, 4], records[:, 0]))]
+        days = records[:, 0] // NS_PER_DAY
+        connection.executemany('INSERT OR REPLACE INTO days VALUES (?, ?, ?, ?, ?, ?)', (
+            (machine, int(day[0, 0] // NS_PER_DAY), *(day[:, i].astype(dtype).tobytes() for i, dtype in enumerate(DAY_COLUMNS)))
+            for day in np.split(records, np.flatnonzero(np.diff(days)) + 1) if len(day)))
+
+    @traced('store_load')
+    def load(self, name, start=None, end=None):
+        """
+        Messages of a machine from start up to end (exclusive) in the layout of load_csv, sorted by time with
+        messages of the same time in ingest order, classified by the profile of the machine
+        """
+        first, last = time_bounds(start, end)
+        with closing(self.connect()) as connection:
+            machine, directory, _ = self.machine(connection, name)
+            blocks = connection.execute('SELECT times, numbers, states, messages FROM days WHERE machine = ? '
+                                        'AND date >= ? AND date <= ? ORDER BY date',
+                                        (machine, first // NS_PER_DAY, last // NS_PER_DAY)).fetchall()
+            texts = [text for text, in connection.execute('SELECT text FROM messages ORDER BY id')]
+        times, numbers, states, messages = (
+            np.concatenate([np.frombuffer(block[i], dtype) for block in blocks] or [np.zeros(0, dtype)])
+            for i, dtype in enumerate(DAY_COLUMNS))
+        lo, hi = np.searchsorted(times, [first, last])
+        data = pd.DataFrame({
+            'StateAfter': states[lo:hi],
+            'MsgNumber': numbers[lo:hi],
+            'TimeString': times[lo:hi].view('datetime64[ns]'),
+            'MsgText': pd.Categorical.from_codes(messages[lo:hi], texts).remove_unused_categories(),
+        })
+        for column in ('StateAfter', 'MsgNumber'):
+            if (data[column] == MISSING).any():  # Kept as float with NaN, like load_csv does
+                data[column] = data[column].where(data[column] != MISSING)
+        return add_classes(data, machine_classification(directory))
+
+    def message_count(self, name, number, start=None, end=None):
+        """ How often a message came (StateAfter 1) on a machine from start up to end """
+        with closing(self.connect()) as connection:
+            machine = self.machine(connection, name)[0]
+            return connection.execute('SELECT COUNT(*) FROM records WHERE machine = ? AND msg_number = ? AND '
+                                      'state_after = 1 AND time >= ? AND time < ?',
+                                      (machine, number, *time_bounds(start, end))).fetchone()[0]
+
+    def day_counts(self, start=None, end=None):
+        """ Messages per day and machine of the days from start up to end, as Date, Machine and Messages """
+        first, last = time_bounds(start, end)
+        with closing(self.connect()) as connection:
+            rows = connection.execute('SELECT date, name, COUNT(*) FROM records JOIN machines ON machines.id = machine '
+                                      'WHERE date >= ? AND date < ? GROUP BY date, machine ORDER BY date, name',
+                                      (first // NS_PER_DAY, -(-last // NS_PER_DAY))).fetchall()
+        counts = pd.DataFrame(rows, columns=['Date', 'Machine', 'Messages'])
+        counts['Date'] = pd.to_datetime(counts['Date'] * NS_PER_DAY)
+        return counts
+
+
+def ingest(store, roots):
+    """ Ingest every machine directory below the roots, one after the other; returns the failed machines """
+    from report import machine_directories
+    failed = []
+    for root in roots:
+        for machine, directory in machine_directories(root).items():
+            start = time.perf_counter()
+            try:
+                added = store.ingest(machine, directory)
+            except Exception as e:
+                print(f"{machine}: {type(e).__name__}: {e}", file=sys.stderr)
+                failed.append(machine)
+                continue
+            print(f"{machine}: {added:,} records added, {time.perf_counter() - start:.1f} s", flush=True)
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Keep the messages of all machines in a local SQLite database.")
+    parser.add_argument('--store', help="database file, by default history.sqlite in the user's data directory")
+    commands = parser.add_subparsers(dest='command', required=True)
+    command_ingest = commands.add_parser('ingest', help="add the records not stored yet")
+    command_ingest.add_argument('data', nargs='+', help="machine directory of Fehlerhistorie CSV files, or a directory "
+                                                        "with one subdirectory per machine")
+    command_count = commands.add_parser('count', help="how often a message came on a machine")
+    command_count.add_argument('machine')
+    command_count.add_argument('number', type=int, help="MsgNumber")
+    command_days = commands.add_parser('days', help="messages per day and machine")
+    for command in (command_count, command_days):
+        command.add_argument('--from', dest='start', type=pd.Timestamp, help="first day, e.g. 2024-01-31")
+        command.add_argument('--to', dest='end', type=pd.Timestamp, help="last day")
+    args = parser.parse_args(argv)
+
+    store = HistoryStore(args.store)
+    if args.command == 'ingest':
+        return 1 if ingest(store, args.data) else 0
+    end = None if args.end is None else args.end.normalize() + pd.Timedelta(days=1)  # --to includes its day
+    if args.command == 'count':
+        print(store.message_count(args.machine, args.number, args.start, end))
+    else:
+        print(store.day_counts(args.start, end).to_string(index=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,27 @@
+import functools
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA = os.path.join(ROOT, 'Data')
+sys.path.insert(0, ROOT)  # The modules live in the repository root, next to main.py
+MACHINES = sorted(os.listdir(DATA))
+
+
+def data_file(machine, name='Fehlerhistorie0.csv'):
+    return os.path.join(DATA, machine, name)
+
+
+@functools.lru_cache(maxsize=None)
+def _machine_data(machine):
+    from analysis import sort_by_time
+    from classification import add_classes, machine_classification
+    from loader import load_csv
+    return add_classes(sort_by_time(load_csv(data_file(machine))), machine_classification(data_file(machine)))
+
+
+@pytest.fixture
+def machine_data():
+    """ machine_data(machine) returns a copy of the sorted first file of a machine in Data/, with its classes """
+    return lambda machine: _machine_data(machine).copy()
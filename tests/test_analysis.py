@@ -0,0 +1,172 @@
+import collections
+import numpy as np
+import pandas as pd
+import pytest
+from analysis import (COATING, FAIL_WINDOW, MIN_COATING_DURATION, PROCESS_SEQUENCE, History, StreamingHistory,
+                      co_occurrences, common_errors, error_mask, fail_error_mask, message_counts, segment_processes)
+from conftest import MACHINES
+
+
+def reference_intervals(data):
+    """ (start, end) of every process per kind, paired like the original row-by-row loop of the canvas """
+    times, texts = data['TimeString'].tolist(), data['MsgText'].astype(object).tolist()
+    intervals = {}
+    for kind, start_messages, end_messages in PROCESS_SEQUENCE:
+        found, start = [], None
+        for time, text in zip(times, texts):
+            if not isinstance(text, str):
+                continue
+            if any(message in text for message in start_messages):
+                start = time
+            if start is not None and any(message in text for message in end_messages):
+                found.append((start, time))
+                start = None
+        intervals[kind] = found
+    return intervals
+
+
+@pytest.mark.parametrize('machine', MACHINES)
+def test_segments_pair_like_the_row_by_row_loop(machine, machine_data):
+    data = machine_data(machine)
+    segments = segment_processes(data)
+    for kind, expected in reference_intervals(data).items():
+        starts, ends = segments.intervals(kind)
+        assert list(zip(pd.to_datetime(starts), pd.to_datetime(ends))) == expected
+
+
+def reference_fail_windows(data):
+    """ Fail errors around the end of every coating process of at least 30 minutes, one block per process """
+    fail = data[fail_error_mask(data)]
+    durations, blocks = [], []
+    for start, end in reference_intervals(data)[COATING]:
+        if end - start >= MIN_COATING_DURATION:
+            durations.append((end - start) / pd.Timedelta(minutes=1))
+            blocks.append(fail[(fail['TimeString'] >= end - FAIL_WINDOW) & (fail['TimeString'] <= end + FAIL_WINDOW)])
+    return durations, blocks
+
+
+def assert_same_rows(actual, expected):
+    np.testing.assert_array_equal(actual['TimeString'].to_numpy(), expected['TimeString'].to_numpy())
+    assert list(actual['MsgText'].astype(object)) == list(expected['MsgText'].astype(object))
+
+
+@pytest.mark.parametrize('machine', MACHINES)
+def test_fail_windows_match_the_row_by_row_loop(machine, machine_data):
+    data = machine_data(machine)
+    history = History(data)
+    durations, blocks = reference_fail_windows(data)
+    fail_data = history.fail_data()
+    assert_same_rows(fail_data, pd.concat(blocks) if blocks else data.iloc[:0])
+    measured, failed = history.process_statistics()
+    np.testing.assert_allclose(measured, durations)
+    assert failed == sum(1 for block in blocks if len(block))
+
+
+def assert_same_history(history, full):
+    assert_same_rows(history.errors(), full.errors())
+    pd.testing.assert_series_equal(history.error_counts(), full.error_counts())
+    assert_same_rows(history.fail_data(), full.fail_data())
+    assert_same_rows(history.end_event_fail_data(), full.end_event_fail_data())
+    durations, failed = history.process_statistics()
+    np.testing.assert_array_equal(durations, full.process_statistics()[0])
+    assert failed == full.process_statistics()[1]
+    for name in ('start', 'end', 'kind', 'end_row'):
+        np.testing.assert_array_equal(getattr(history.segments, name), getattr(full.segments, name))
+
+
+@pytest.mark.parametrize('machine', MACHINES)
+def test_appended_history_equals_full_history(machine, machine_data):
+    data = machine_data(machine)
+    full = History(data)
+    cut = len(data) // 2
+    history = History(data.iloc[:cut].reset_index(drop=True))
+    history.errors(), history.error_counts(), history.fail_data(), history.process_statistics()  # Kept and updated
+    for part in np.array_split(np.arange(cut, len(data)), 4):
+        assert history.append(data.iloc[part].reset_index(drop=True))
+    assert_same_history(history, full)
+
+
+def test_history_appending_older_rows_is_rebuilt(machine_data):
+    data = machine_data('SL1A')
+    history = History(data.iloc[100:].reset_index(drop=True))
+    assert not history.append(data.iloc[:100].reset_index(drop=True))
+    assert_same_history(history, History(data))
+
+
+@pytest.mark.parametrize('machine', MACHINES)
+@pytest.mark.parametrize('chunk_rows', [997, 100000])
+def test_streaming_history_equals_full_history(machine, chunk_rows, machine_data):
+    data = machine_data(machine)
+    full = History(data)
+    rows = collections.defaultdict(list)
+    history = StreamingHistory(lambda name, done: rows[name].append(done))
+    for first in range(0, len(data), chunk_rows):
+        history.add(data.iloc[first:first + chunk_rows])
+    history.finish()
+
+    assert len(history) == len(full)
+    assert history.time_range() == full.time_range()
+    assert_same_rows(pd.concat(rows['errors']), full.errors())
+    assert history.error_count() == len(full.errors())
+    pd.testing.assert_series_equal(history.error_counts(), full.error_counts())
+    fail_data = full.fail_data()
+    assert_same_rows(pd.concat(rows['fail_data']) if rows['fail_data'] else fail_data,
+                     fail_data.sort_values(by='TimeString', kind='stable'))
+    assert history.fail_count() == len(fail_data)
+    pd.testing.assert_series_equal(history.fail_counts(), message_counts(fail_data['MsgText'].astype(object)),
+                                   check_names=False)
+    assert history.fail_percentage() == full.fail_percentage(fail_data)
+    durations, failed = history.process_statistics()
+    np.testing.assert_array_equal(durations, full.process_statistics()[0])
+    assert failed == full.process_statistics()[1]
+
+
+def test_streaming_history_needs_sorted_chunks(machine_data):
+    data = machine_data('SL1A')
+    history = StreamingHistory(lambda name, rows: None)
+    history.add(data.iloc[100:200])
+    with pytest.raises(ValueError):
+        history.add(data.iloc[:100])
+
+
+def test_common_errors_are_on_every_machine(machine_data):
+    frames = [machine_data(machine) for machine in ('SL1A', 'SEED1A')]
+    daily = [collections.Counter(zip(data['TimeString'].dt.normalize()[error_mask(data)],
+                                     data['MsgText'].astype(object)[error_mask(data)])) for data in frames]
+    expected = {key: min(counts[key] for counts in daily) for key in set.intersection(*(set(counts) for counts in daily))}
+    result = common_errors(frames)
+    assert dict(zip(zip(result['Date'], result['Error Message']), result['Count'])) == expected
+    assert len(expected)
+
+    # A machine without any of these errors leaves nothing in common
+    assert common_errors(frames + [machine_data('AG1A').iloc[:0]]).empty
+
+
+def reference_co_occurrences(frames, machines, window):
+    """ Count and mean offset of every pair of errors of two machines within window, comparing all pairs """
+    events = []
+    for i, data in enumerate(frames):
+        errors = data[error_mask(data) & data['MsgText'].notna().to_numpy()]
+        events += [(time.value, i, text) for time, text in zip(errors['TimeString'], errors['MsgText'].astype(object))]
+    events.sort(key=lambda event: event[0])
+    pairs = collections.defaultdict(lambda: [0, 0])
+    for x, first in enumerate(events):
+        for second in events[x + 1:]:
+            if second[0] - first[0] > window.value:
+                break
+            if first[1] != second[1]:
+                a, b = (first, second) if first[1] < second[1] else (second, first)
+                pair = pairs[(machines[a[1]], a[2], machines[b[1]], b[2])]
+                pair[0] += 1
+                pair[1] += b[0] - a[0]
+    return {key: (count, round(total / count / 1e9, 6)) for key, (count, total) in pairs.items()}
+
+
+@pytest.mark.parametrize('window', ['10s', '120s'])
+def test_co_occurrences_match_all_pairs(window, machine_data):
+    machines = ['SL1A', 'SEED1A', 'DECK1A']
+    frames = [machine_data(machine) for machine in machines]
+    result = co_occurrences(frames, machines, pd.Timedelta(window))
+    found = {tuple(row[:4]): (row[4], round(row[5], 6)) for row in result.itertuples(index=False)}
+    assert found == reference_co_occurrences(frames, machines, pd.Timedelta(window))
+    assert result['Count'].is_monotonic_decreasing
@@ -0,0 +1,58 @@
+import os
+import shutil
+import pytest
+from cache import FrameCache
+from conftest import data_file
+from loader import load_csv
+
+
+@pytest.fixture
+def cached_file(tmp_path):
+    """ A copy of a Fehlerhistorie file with its parsed frame in a new cache """
+    path = str(tmp_path / 'Fehlerhistorie0.csv')
+    shutil.copy(data_file('SL1A'), path)
+    cache = FrameCache(str(tmp_path / 'cache'))
+    cache.store(cache.fingerprint(path), load_csv(path))
+    return cache, path
+
+
+def test_unchanged_file_is_loaded_from_the_cache(cached_file):
+    cache, path = cached_file
+    data = cache.load(path)
+    assert data is not None
+    assert data.equals(load_csv(path))
+
+
+def test_touched_file_with_the_same_content_stays_cached(cached_file):
+    cache, path = cached_file
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10 ** 9))
+    assert cache.load(path) is not None
+
+
+def test_changed_content_is_a_miss(cached_file):
+    cache, path = cached_file
+    stat = os.stat(path)
+    with open(path, 'r+b') as f:
+        f.seek(stat.st_size - 10)
+        f.write(b'X')  # Same size
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert cache.load(path) is None
+
+
+def test_appended_file_is_a_miss(cached_file):
+    cache, path = cached_file
+    with open(path, 'ab') as f:
+        f.write(b'\r\n')
+    assert cache.load(path) is None
+
+
+def test_other_options_are_a_miss(cached_file):
+    cache, path = cached_file
+    assert cache.load(path, 'time_ms=True') is None
+
+
+def test_cache_is_evicted_beyond_its_size(cached_file):
+    cache, path = cached_file
+    cache.max_bytes = 0
+    cache.evict()
+    assert cache.load(path) is None
@@ -0,0 +1,44 @@
+import json
+import numpy as np
+import pytest
+from classification import (DEFAULT_CLASSIFICATION, ERROR, INFO, PROFILE_NAME, WARNING, Classification,
+                            machine_classification, profile_path)
+from conftest import data_file
+
+# The message numbers the original code treated as warnings, every other number up to 175 was an error
+WARNING_NUMBERS = list(range(29, 38)) + list(range(58, 66)) + list(range(73, 80)) + list(range(90, 93)) + \
+    list(range(125, 141)) + list(range(148, 152)) + [173, 174]
+
+
+def test_default_profile_matches_the_original_numbers():
+    numbers = np.arange(-1, 300)
+    expected = np.where(np.isin(numbers, WARNING_NUMBERS), WARNING, np.where((numbers >= 0) & (numbers <= 175), ERROR, INFO))
+    np.testing.assert_array_equal(DEFAULT_CLASSIFICATION.classify(numbers), expected)
+
+
+def test_later_classes_win():
+    classification = Classification.from_profile({'error': [[0, 10], 20], 'warning': [[5, 6]], 'info': [6]})
+    np.testing.assert_array_equal(classification.classify([0, 5, 6, 7, 20, 21]), [ERROR, WARNING, INFO, ERROR, ERROR, INFO])
+
+
+def test_missing_and_unknown_numbers_are_info():
+    np.testing.assert_array_equal(DEFAULT_CLASSIFICATION.classify(np.array([np.nan, 5000, 1.0])), [INFO, INFO, ERROR])
+
+
+@pytest.mark.parametrize('entry', [[-1, 3], [5, 4]])
+def test_invalid_profile_entries(entry):
+    with pytest.raises(ValueError):
+        Classification.from_profile({'error': [entry]})
+
+
+def test_profile_next_to_the_files(tmp_path):
+    assert profile_path(str(tmp_path)) is None
+    assert machine_classification(str(tmp_path / 'Fehlerhistorie0.csv')) is DEFAULT_CLASSIFICATION
+    (tmp_path / PROFILE_NAME).write_text(json.dumps({'error': [[200, 210]], 'warning': [205]}), encoding='utf-8')
+    assert profile_path(str(tmp_path / 'Fehlerhistorie0.csv')) == str(tmp_path / PROFILE_NAME)
+    classification = machine_classification(str(tmp_path))
+    np.testing.assert_array_equal(classification.classify([1, 200, 205]), [INFO, ERROR, WARNING])
+
+
+def test_machine_without_profile_uses_the_default():
+    assert machine_classification(data_file('SL1A')) is DEFAULT_CLASSIFICATION
@@ -0,0 +1,117 @@
+import collections
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import DATA, data_file
+from loader import TailReader, load_csv, load_rotated, rotated_files, time_resolution
+
+
+def read_lines(path):
+    with open(path, 'rb') as f:
+        return f.read().splitlines(keepends=True)
+
+
+@pytest.fixture
+def growing_file(tmp_path):
+    """ The first 1000 records of a Fehlerhistorie file, and the records after them """
+    lines = read_lines(data_file('SL1A'))
+    path = tmp_path / 'Fehlerhistorie0.csv'
+    path.write_bytes(b''.join(lines[:1001]))
+    return path, lines[1001:1501]
+
+
+def append(path, data):
+    with open(path, 'ab') as f:
+        f.write(data)
+
+
+def test_tail_reader_reads_the_appended_records(growing_file):
+    path, new_lines = growing_file
+    reader = TailReader(str(path), path.stat().st_size)
+    append(path, b''.join(new_lines[:200]))
+    assert len(reader.read_new()) == 200
+    assert len(reader.read_new()) == 0
+    append(path, b''.join(new_lines[200:]))
+    rows = reader.read_new()
+    assert len(rows) == 300
+    assert list(rows['TimeString']) == list(load_csv(str(path))['TimeString'][-300:])
+
+
+def test_tail_reader_skips_the_trailer(growing_file):
+    path, new_lines = growing_file
+    trailer = b'"$RT_COUNT$";1000\r\n'
+    append(path, trailer)
+    reader = TailReader(str(path), path.stat().st_size)
+    assert reader.offset == path.stat().st_size - len(trailer)
+
+    # WinCC rewrites the trailer behind the new records
+    with open(path, 'r+b') as f:
+        f.truncate(reader.offset)
+        f.seek(reader.offset)
+        f.write(b''.join(new_lines[:10]) + b'"$RT_COUNT$";1010\r\n')
+    assert len(reader.read_new()) == 10
+    assert len(reader.read_new()) == 0
+
+
+def test_tail_reader_keeps_a_last_line_without_line_break(growing_file):
+    path, new_lines = growing_file
+    line = new_lines[0]
+    append(path, line[:-2])  # Loaded as a record already, the line break is still missing
+    reader = TailReader(str(path), path.stat().st_size)
+    assert reader.partial_line == line[:-2]
+    assert len(reader.read_new()) == 0
+    append(path, line[-2:] + new_lines[1])
+    rows = reader.read_new()
+    assert len(rows) == 1  # The completed line is not loaded twice
+    assert rows['TimeString'].iloc[0] == load_csv(str(path))['TimeString'].iloc[-1]
+
+
+def test_tail_reader_asks_for_a_reload_when_a_loaded_line_changes(growing_file):
+    path, new_lines = growing_file
+    line = new_lines[0]
+    append(path, line[:20])
+    reader = TailReader(str(path), path.stat().st_size)
+    append(path, line[20:])
+    assert reader.read_new() is None
+
+
+def test_tail_reader_asks_for_a_reload_after_a_rewrite(growing_file):
+    path, new_lines = growing_file
+    reader = TailReader(str(path), path.stat().st_size)
+    path.write_bytes(read_lines(str(path))[0] + b''.join(new_lines))
+    assert reader.read_new() is None
+
+
+def test_rotated_files_are_merged_without_shared_records():
+    paths = rotated_files(os.path.join(DATA, 'SL1B'))
+    frames = [load_csv(path) for path in paths]
+    resolution = max(time_resolution(data['TimeString']) for data in frames)
+
+    # A record is kept as often as the file with the most of it has it, times compared at the coarsest resolution
+    counts = collections.Counter()
+    for data in frames:
+        keys = zip(data['TimeString'].to_numpy(dtype='datetime64[ns]').view(np.int64) // resolution,
+                   data['MsgNumber'], data['StateAfter'])
+        for key, count in collections.Counter(keys).items():
+            counts[key] = max(counts[key], count)
+
+    merged = load_rotated(paths)
+    assert len(merged) == sum(counts.values()) == 20106
+    assert merged['TimeString'].is_monotonic_increasing
+
+
+def test_rotated_files_are_merged_on_the_seconds_of_time_ms():
+    """ The times from Time_ms are matched with the Excel copy after rounding them like WinCC does for TimeString """
+    paths = rotated_files(os.path.join(DATA, 'SL1B'))
+    merged, precise = load_rotated(paths), load_rotated(paths, use_time_ms=True)
+    assert len(precise) == len(merged)
+    seconds = (precise['TimeString'] - pd.Timedelta(milliseconds=500)).dt.ceil('s')
+    assert collections.Counter(zip(seconds, precise['MsgNumber'], precise['StateAfter'])) == \
+        collections.Counter(zip(merged['TimeString'], merged['MsgNumber'], merged['StateAfter']))
+    assert precise['TimeString'].is_monotonic_increasing
+
+
+def test_rotated_files_of_an_empty_directory(tmp_path):
+    with pytest.raises(ValueError):
+        load_rotated(rotated_files(str(tmp_path)))
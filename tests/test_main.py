@@ -0,0 +1,30 @@
+import os
+import pytest
+from conftest import data_file
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+from main import DataLoaderThread  # noqa: E402
+
+
+def load(path):
+    """ The signals of a DataLoaderThread run in this thread """
+    thread, emitted = DataLoaderThread(str(path)), []
+    thread.data_loaded.connect(lambda data: emitted.append(('data_loaded', data)))
+    thread.failed.connect(lambda message: emitted.append(('failed', message)))
+    thread.run()
+    return emitted
+
+
+@pytest.mark.parametrize('content', [b'', None], ids=['empty', 'header only'])
+def test_a_file_without_messages_fails_to_load(tmp_path, content):
+    with open(data_file('SL1A'), 'rb') as f:
+        header = f.readline()
+    path = tmp_path / 'Fehlerhistorie0.csv'
+    path.write_bytes(header if content is None else content)
+    [(signal, message)] = load(path)
+    assert signal == 'failed' and str(path) in message
+
+
+def test_a_file_with_messages_is_loaded():
+    [(signal, data)] = load(data_file('SL1A'))
+    assert signal == 'data_loaded' and len(data)
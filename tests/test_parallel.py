@@ -0,0 +1,24 @@
+import pytest
+from conftest import data_file
+from loader import load_csv
+from parallel import load_files
+
+
+@pytest.fixture
+def broken_file(tmp_path):
+    path = tmp_path / 'Fehlerhistorie0.csv'
+    path.write_bytes(b'"TimeString";"MsgText"\r\n"unterminated\r\n')
+    return str(path)
+
+
+def test_files_which_cannot_be_loaded_are_reported(broken_file):
+    failed = {}
+    frames = load_files([broken_file, data_file('SL1A'), data_file('SEED1A')], file_failed=failed.__setitem__)
+    assert frames[0] is None
+    assert list(failed) == [broken_file]
+    assert [len(data) for data in frames[1:]] == [len(load_csv(data_file('SL1A'))), len(load_csv(data_file('SEED1A')))]
+
+
+def test_failures_are_raised_without_file_failed(broken_file):
+    with pytest.raises(Exception):
+        load_files([broken_file])
@@ -0,0 +1,16 @@
+import os
+import pytest
+from conftest import DATA
+from report import run_machine
+
+
+@pytest.mark.parametrize('machine', ['SL1A', 'SL1B'])
+def test_streamed_report_equals_the_loaded_one(machine, tmp_path, monkeypatch):
+    monkeypatch.setattr('loader.CHUNK_ROWS', 997)
+    monkeypatch.setattr('report.SPOOL_ROWS', 101)
+    loaded, streamed = tmp_path / 'loaded', tmp_path / 'streamed'
+    summary = run_machine(machine, os.path.join(DATA, machine), str(loaded), ['csv', 'json'])
+    assert run_machine(machine, os.path.join(DATA, machine), str(streamed), ['csv', 'json'], stream=True) == summary
+    assert sorted(os.listdir(streamed)) == sorted(os.listdir(loaded))  # No spooled files left behind
+    for name in os.listdir(loaded):
+        assert (streamed / name).read_bytes() == (loaded / name).read_bytes(), name
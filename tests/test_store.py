@@ -0,0 +1,65 @@
+import os
+import shutil
+import pandas as pd
+import pytest
+from analysis import sort_by_time
+from classification import add_classes, machine_classification
+from conftest import DATA, data_file
+from loader import load_csv, load_rotated, rotated_files
+from store import HistoryStore
+
+
+def assert_same_messages(actual, expected):
+    assert list(actual.columns) == list(expected.columns)
+    assert len(actual) == len(expected)
+    for column in expected.columns:
+        assert actual[column].astype(object).reset_index(drop=True).equals(expected[column].astype(object).reset_index(drop=True)), column
+
+
+@pytest.fixture
+def store(tmp_path):
+    return HistoryStore(str(tmp_path / 'history.sqlite'))
+
+
+def test_stored_machine_loads_like_its_rotated_files(store):
+    directory = os.path.join(DATA, 'SL1B')
+    assert store.ingest('SL1B', directory) == 20106
+    expected = add_classes(sort_by_time(load_rotated(rotated_files(directory))), machine_classification(directory))
+    assert_same_messages(store.load('SL1B'), expected)
+
+
+def test_ingesting_again_leaves_the_store_unchanged(store, tmp_path):
+    directory = tmp_path / 'SL1A'
+    shutil.copytree(os.path.join(DATA, 'SL1A'), directory)
+    added = store.ingest('SL1A', str(directory))
+    revision, data = store.revision('SL1A'), store.load('SL1A')
+    assert store.ingest('SL1A', str(directory)) == 0
+    os.utime(directory / 'Fehlerhistorie0.csv')  # Touched, but with the same records
+    assert store.ingest('SL1A', str(directory)) == 0
+    assert store.revision('SL1A') == revision
+    assert_same_messages(store.load('SL1A'), data)
+    assert len(data) == added
+
+
+def test_growing_file_is_ingested_incrementally(store, tmp_path):
+    with open(data_file('SL1A'), 'rb') as f:
+        content = f.read()
+    directory = tmp_path / 'SL1A'
+    directory.mkdir()
+    path = directory / 'Fehlerhistorie0.csv'
+    written = 0
+    for cut in (0.3, 0.3001, 0.55, 1.0):  # Also cut in the middle of a line
+        with open(path, 'ab') as f:
+            f.write(content[written:int(len(content) * cut)])
+        written = int(len(content) * cut)
+        store.ingest('SL1A', str(directory))
+    assert_same_messages(store.load('SL1A'), add_classes(sort_by_time(load_csv(data_file('SL1A')))))
+
+
+def test_stored_range(store):
+    store.ingest('SL1A', os.path.join(DATA, 'SL1A'))
+    start, end = pd.Timestamp('2024-05-10 12:00'), pd.Timestamp('2024-06-01')
+    data = store.load('SL1A', start, end)
+    times = add_classes(sort_by_time(load_csv(data_file('SL1A'))))['TimeString']
+    assert len(data) == ((times >= start) & (times < end)).sum()
+    assert data['TimeString'].min() >= start and data['TimeString'].max() < end
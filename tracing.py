@@ -0,0 +1,127 @@
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+ENV_VARIABLE = 'ERROR_REPORTER_TRACE'  # Set to 1 to trace from the start
+
+
+def memory_rss():
+    """ Resident memory of this process in bytes, None where it cannot be read cheaply """
+    if sys.platform == 'win32':
+        import ctypes
+        from ctypes import wintypes
+
+        class Counters(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD)] + [
+                (name, ctypes.c_size_t) for name in ('PeakWorkingSetSize', 'WorkingSetSize', 'QuotaPeakPagedPoolUsage',
+                                                     'QuotaPagedPoolUsage', 'QuotaPeakNonPagedPoolUsage',
+                                                     'QuotaNonPagedPoolUsage', 'PagefileUsage', 'PeakPagefileUsage')]
+        counters = Counters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return counters.WorkingSetSize
+        return None
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class Span:
+    """ One timed stage, recorded when the with block ends; set adds arguments like the amount of rows """
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def set(self, **args):
+        self.args.update(args)
+
+    def __enter__(self):
+        self.memory = memory_rss()
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        memory = memory_rss()
+        if memory is not None and self.memory is not None:
+            self.args['memory_delta_mb'] = round((memory - self.memory) / 2 ** 20, 2)
+        self.tracer.record(self.name, self.start, end - self.start, threading.current_thread().name, self.args)
+        return False
+
+
+class NoSpan:
+    """ Stand-in while tracing is off, so a disabled span costs a function call """
+    def set(self, **args):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NO_SPAN = NoSpan()
+
+
+class Tracer:
+    """
+    Collects timing spans of the stages load, parse, segment, aggregate, populate and draw. Events are appended from
+    any thread and can be exported in the Chrome trace format (chrome://tracing, Perfetto).
+    """
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.origin = time.perf_counter_ns()
+        self.events = []  # (name, start ns, duration ns, thread name, args); list.append is atomic
+
+    def span(self, name, **args):
+        return Span(self, name, args) if self.enabled else NO_SPAN
+
+    def record(self, name, start, duration, thread, args):
+        self.events.append((name, start - self.origin, duration, thread, args))
+
+    def clear(self):
+        self.events = []
+
+    def chrome_trace(self):
+        threads = {}
+        events = []
+        for name, start, duration, thread, args in list(self.events):
+            tid = threads.setdefault(thread, len(threads) + 1)
+            events.append({'name': name, 'ph': 'X', 'ts': start / 1000, 'dur': duration / 1000,
+                           'pid': os.getpid(), 'tid': tid, 'args': args})
+        events += [{'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid, 'args': {'name': thread}}
+                   for thread, tid in threads.items()]
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def export(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.chrome_trace(), f)
+
+
+tracer = Tracer(os.environ.get(ENV_VARIABLE, '') not in ('', '0'))
+
+
+def span(name, **args):
+    """ Time a with block as a stage: with span('parse_times', rows=len(data)) as s: ... s.set(rows=...) """
+    return tracer.span(name, **args)
+
+
+def traced(name):
+    """ Decorator timing every call of a function as the stage name """
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return function(*args, **kwargs)
+            with tracer.span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
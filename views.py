@@ -0,0 +1,571 @@
+import numpy as np
+import pandas as pd
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableView, QHeaderView, QLabel, QPushButton,
+                             QCheckBox, QFileDialog)
+from PyQt5.QtGui import QFont
+from PyQt5.QtCore import Qt, QAbstractTableModel
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+import matplotlib.pyplot as plt
+import matplotlib.dates as mdates
+from matplotlib.collections import LineCollection
+from matplotlib.colors import to_rgba
+from matplotlib.patches import Patch
+from analysis import COATING, MIN_COATING_DURATION, NS_PER_DAY, PROCESS_COLORS, error_mask, message_counts, warning_mask
+from loader import TIME_FORMAT
+from tracing import span, tracer
+
+BLOCK_HEIGHT = 10
+MAX_DAY_LABELS = 62
+MIN_DENSITY_ALPHA = 0.35  # Opacity of a pixel column with a single warning or error while zoomed out
+ZOOM_STEP = 1.25  # Factor of one mouse wheel step on the All timeline
+MIN_ZOOM = 1 / (24 * 60)  # Narrowest view of the All timeline, one minute in days
+TABLE_HEADERS = {
+    'count': ['Error Message', 'Count'],
+    'chronology': ['Time', 'Error Message'],
+    'fail_chronology': ['Time', 'Error Message'],
+    'fail': ['Error Message', 'Count'],
+}
+
+class BlockDiagramCanvas(FigureCanvas):
+    def __init__(self, parent=None):
+        self.fig, self.ax = plt.subplots(figsize=(12, 4))  # Adjusted figsize for tighter plot
+        self.fig.subplots_adjust(left=0.02, right=0.98, top=0.98, bottom=0.17)  # Adjust subplots to remove outer borders
+        super().__init__(self.fig)
+        self.setParent(parent)
+        self.process_intervals = []
+        self.static_key = None
+        self.static_intervals = []
+        self.open_intervals = []
+        self.open_artists = []
+        self.event_times = []  # (color, sorted int64 nanoseconds) of the warning and error lines
+        self.event_lines = []  # Their collections, drawn for the visible range only
+        self.full_range = None  # Date numbers of the whole history while zooming and panning is possible
+        self.drag_start = None
+        self.mpl_connect('scroll_event', self.on_scroll)
+        self.mpl_connect('button_press_event', self.on_press)
+        self.mpl_connect('motion_notify_event', self.on_motion)
+        self.mpl_connect('button_release_event', self.on_release)
+
+    def plot(self, history, start_time, end_time, day_view=False, plot_coating_only=False):
+        # The intervals, warnings and errors of the whole history are drawn as one collection per color and kept
+        # while the history does not change, a new day only moves the view and redraws the still open processes
+        key = (history, history.version, day_view, plot_coating_only)
+        if self.static_key != key:
+            with span('plot_static', rows=len(history), day_view=day_view):
+                self.plot_static(history, day_view, plot_coating_only)
+            self.static_key = key
+        self.plot_open_intervals(history.segments, end_time, plot_coating_only)
+        self.process_intervals = self.static_intervals + self.open_intervals
+        self.set_view(history, start_time, end_time, day_view)
+        self.render_events()
+        with span('draw', day_view=day_view):
+            self.draw()
+
+    def plot_static(self, history, day_view, plot_coating_only):
+        data, segments = history.data, history.segments
+        times = data['TimeString'].to_numpy(dtype='datetime64[ns]')
+        self.ax.clear()
+        self.ax.xaxis_date()
+        self.open_artists = []
+        self.event_lines = []
+        self.static_intervals = []
+        for kind in ([COATING] if plot_coating_only else PROCESS_COLORS):
+            starts, ends = segments.intervals(kind, MIN_COATING_DURATION if kind == COATING else None)
+            self.add_intervals(starts, ends, kind, self.static_intervals)
+
+        # Plot error and warning bars on top of the colored blocks
+        is_warning = warning_mask(data)
+        is_error = error_mask(data) & ~is_warning
+        if plot_coating_only:
+            # Only the errors and warnings during the coating processes
+            starts, ends = segments.coating()
+            interval = np.searchsorted(starts, times, side='right') - 1
+            in_coating = (interval >= 0) & (times <= ends[np.maximum(interval, 0)]) if len(starts) else np.zeros(len(times), dtype=bool)
+            is_warning &= in_coating
+            is_error &= in_coating
+        self.event_times = [(color, times[mask].view(np.int64)) for mask, color in ((is_warning, 'orange'), (is_error, 'red'))]
+
+        self.ax.set_ylim(0, BLOCK_HEIGHT)
+        self.ax.set_yticks([])
+        self.ax.grid(False)
+
+        # Add legend
+        self.ax.legend(handles=legend_elements(), loc='upper left')
+
+    def plot_open_intervals(self, segments, end_time, plot_coating_only):
+        # Processes without end yet last until the end of the view, so they are redrawn for every view
+        for artist in self.open_artists:
+            artist.remove()
+        self.open_artists = []
+        self.open_intervals = []
+        if plot_coating_only:
+            return
+        for kind in PROCESS_COLORS:
+            if not pd.isna(segments.open_start[kind]):
+                open_start = pd.Timestamp(segments.open_start[kind])
+                if kind != COATING or end_time - open_start >= MIN_COATING_DURATION:
+                    artist = self.add_intervals(np.array([open_start.to_datetime64()]), np.array([end_time.to_datetime64()]), kind, self.open_intervals)
+                    if artist is not None:
+                        self.open_artists.append(artist)
+
+    def add_intervals(self, starts, ends, kind, intervals):
+        """ Draw the intervals of one process kind as a single collection and list them as (start, duration, color) """
+        keep = ends > starts
+        starts, ends = starts[keep], ends[keep]
+        if not len(starts):
+            return None
+        color = PROCESS_COLORS[kind]
+        intervals += [(pd.Timestamp(start), pd.Timestamp(end) - pd.Timestamp(start), color) for start, end in zip(starts, ends)]
+        return draw_intervals(self.ax, starts, ends, kind)
+
+    def render_events(self):
+        """ Draw the warning and error lines of the visible time range, see draw_events """
+        for artist in self.event_lines:
+            artist.remove()
+        with span('render events'):
+            self.event_lines = draw_events(self.ax, self.event_times)
+
+    def zoom_to(self, x0, x1):
+        """ Show the date numbers [x0, x1] of the All view, kept within the history, and draw its events """
+        first, last = self.full_range
+        width = min(max(x1 - x0, MIN_ZOOM), last - first)
+        x0 = min(max(x0, first), last - width)
+        self.ax.set_xlim(x0, x0 + width)
+        set_time_axis(self.ax, mdates.num2date(x0), mdates.num2date(x0 + width))
+        self.render_events()
+        self.draw_idle()
+
+    def on_scroll(self, event):
+        if self.full_range is None or event.inaxes is not self.ax:
+            return
+        factor = ZOOM_STEP ** -event.step  # Wheel up zooms in around the mouse pointer
+        x0, x1 = self.ax.get_xlim()
+        self.zoom_to(event.xdata - (event.xdata - x0) * factor, event.xdata + (x1 - event.xdata) * factor)
+
+    def on_press(self, event):
+        if self.full_range is None or event.inaxes is not self.ax or event.button != 1:
+            return
+        if event.dblclick:
+            self.drag_start = None
+            self.zoom_to(*self.full_range)
+        else:
+            self.drag_start = (event.x, self.ax.get_xlim())
+
+    def on_motion(self, event):
+        if self.drag_start is None:
+            return
+        x, (x0, x1) = self.drag_start
+        shift = (event.x - x) / max(self.ax.bbox.width, 1) * (x1 - x0)
+        self.zoom_to(x0 - shift, x1 - shift)
+
+    def on_release(self, event):
+        self.drag_start = None
+
+    def set_view(self, history, start_time, end_time, day_view):
+        data = history.data
+        if day_view:
+            self.ax.set_xlim(start_time, end_time)
+            self.ax.xaxis.set_major_locator(mdates.HourLocator(interval=1))
+            self.ax.xaxis.set_major_formatter(mdates.DateFormatter('%H'))
+            self.ax.set_xticks([start_time + pd.Timedelta(hours=i) for i in range(25)])
+            self.ax.set_xticklabels([str(i) for i in range(24)] + ['24'])
+            self.ax.set_xlabel('Hour')
+            self.full_range = None
+        else:
+            first, last = data['TimeString'].min(), data['TimeString'].max()
+            self.ax.set_xlim(first, last)
+            self.full_range = self.ax.get_xlim() if last > first else None  # Wheel zooms, dragging pans, double click resets
+            set_time_axis(self.ax, first, last)
+
+def set_time_axis(ax, first, last):
+    """ A label per day, thinned out when there are more than fit next to each other, and hours when zoomed in """
+    days = (last - first).days + 1
+    if days > 2:
+        ax.xaxis.set_major_locator(mdates.DayLocator(interval=-(-days // MAX_DAY_LABELS)))
+        ax.xaxis.set_major_formatter(mdates.DateFormatter('%d.%m'))
+        ax.set_xlabel('')
+    else:
+        ax.xaxis.set_major_locator(mdates.AutoDateLocator())
+        ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))
+        dates = sorted({first.strftime('%d.%m.%Y'), last.strftime('%d.%m.%Y')})
+        ax.set_xlabel(' - '.join(dates))
+    plt.setp(ax.get_xticklabels(), rotation=45, ha="right")
+
+def draw_events(ax, event_times):
+    """
+    Draw the (color, sorted int64 nanoseconds) event_times within the x range of ax as one line collection per color
+    and return them. While there are no more lines than pixel columns every line is drawn, else one line per pixel
+    column with events, the more opaque the more events it holds. The sorted times are searched, so the cost
+    depends on the width, not on the amount of messages.
+    """
+    epoch = np.datetime64(mdates.get_epoch(), 'ns').view(np.int64)
+    x0, x1 = ax.get_xlim()
+    start, end = epoch + int(x0 * NS_PER_DAY), epoch + int(x1 * NS_PER_DAY)
+    pixels = max(int(ax.bbox.width), 1)
+    collections = []
+    for color, times in event_times:
+        visible = times[np.searchsorted(times, start, side='left'):np.searchsorted(times, end, side='right')]
+        if not len(visible):
+            continue
+        alpha = np.ones(len(visible))
+        if len(visible) > pixels:
+            # Bins of one pixel column, each drawn at its first event
+            edges = np.linspace(start, end, pixels + 1)[1:-1]
+            bounds = np.concatenate(([0], np.searchsorted(visible, edges, side='left'), [len(visible)]))
+            counts = np.diff(bounds)
+            occupied = counts > 0
+            visible, counts = visible[bounds[:-1][occupied]], counts[occupied]
+            density = np.log(counts) / np.log(counts.max()) if counts.max() > 1 else np.zeros(len(counts))
+            alpha = MIN_DENSITY_ALPHA + (1 - MIN_DENSITY_ALPHA) * density
+        x = mdates.date2num(visible.astype('datetime64[ns]'))
+        segments = np.stack((np.column_stack((x, np.zeros(len(x)))), np.column_stack((x, np.full(len(x), BLOCK_HEIGHT)))), axis=1)
+        colors = np.tile(to_rgba(color), (len(x), 1))
+        colors[:, 3] = alpha
+        lines = LineCollection(segments, colors=colors, capstyle='butt')
+        ax.add_collection(lines, autolim=False)
+        collections.append(lines)
+    return collections
+
+def draw_intervals(ax, starts, ends, kind):
+    """ Draw the intervals of one process kind as a single collection """
+    left = mdates.date2num(starts)
+    xranges = np.column_stack((left, mdates.date2num(ends) - left))
+    # Kinds are stacked in the order of PROCESS_COLORS, like they were drawn one after another
+    return ax.broken_barh(xranges, (0, BLOCK_HEIGHT), facecolors=PROCESS_COLORS[kind], alpha=1.0, zorder=1 + 0.01 * kind)
+
+def legend_elements():
+    return [
+        Patch(facecolor='cyan', edgecolor='black', label='Ventilation'),
+        Patch(facecolor='blue', edgecolor='black', label='Pump out'),
+        Patch(facecolor='purple', edgecolor='black', label='Set up'),
+        Patch(facecolor='green', edgecolor='black', label='Coating'),
+        Patch(facecolor='orange', edgecolor='black', label='Warning', alpha=1.0),
+        Patch(facecolor='red', edgecolor='black', label='Error', alpha=1.0)
+    ]
+
+class TimelineLanes(FigureCanvas):
+    """
+    Stacked timelines of several machines over a shared time axis, one lane per machine drawn from its Timeline.
+    The lanes of timelines which did not change are kept as they are, only their warning and error lines follow
+    the time range.
+    """
+    def __init__(self, parent=None):
+        self.fig = plt.figure(figsize=(12, 4))
+        super().__init__(self.fig)
+        self.setParent(parent)
+        self.lanes = {}  # Machine -> [timeline, axes, event line collections]
+        self.view = None  # Shown time range in nanoseconds
+
+    def plot(self, timelines):
+        """ Show the timelines, a dict of machine to Timeline, from top to bottom """
+        with span('plot lanes', lanes=len(timelines)) as trace:
+            if list(self.lanes) != list(timelines):
+                self.fig.clear()
+                axes = self.fig.subplots(len(timelines), 1, sharex=True, squeeze=False)[:, 0] if timelines else []
+                self.lanes = {machine: [None, ax, []] for machine, ax in zip(timelines, axes)}
+                self.view = None
+                self.fig.subplots_adjust(left=0.07, right=0.98, top=0.92, bottom=0.12, hspace=0.15)
+                if timelines:
+                    self.fig.legend(handles=legend_elements(), loc='upper center', ncol=6, frameon=False)
+            changed = [machine for machine, timeline in timelines.items() if self.lanes[machine][0] is not timeline]
+            for machine in changed:
+                self.plot_lane(machine, timelines[machine])
+            trace.set(changed=len(changed))
+
+            # The warning and error lines depend on the time range, if it stays only the changed lanes are binned again
+            firsts = [timeline.first for timeline in timelines.values() if timeline.first is not None]
+            lasts = [timeline.last for timeline in timelines.values() if timeline.last is not None]
+            view = (min(firsts), max(lasts)) if firsts else None
+            rebinned = list(self.lanes) if view != self.view else changed
+            self.view = view
+            if view is not None:
+                first, last = pd.Timestamp(view[0]), pd.Timestamp(view[1])
+                axes = [lane[1] for lane in self.lanes.values()]
+                axes[0].set_xlim(first, last)  # The lanes share the x axis
+                set_time_axis(axes[-1], first, last)
+                for machine in rebinned:
+                    lane = self.lanes[machine]
+                    for artist in lane[2]:
+                        artist.remove()
+                    lane[2] = draw_events(lane[1], [('orange', lane[0].warnings), ('red', lane[0].errors)])
+        with span('draw lanes'):
+            self.draw()
+
+    def plot_lane(self, machine, timeline):
+        lane = self.lanes[machine]
+        ax = lane[1]
+        ax.clear()
+        ax.xaxis_date()
+        for kind in PROCESS_COLORS:
+            selected = (timeline.kind == kind) & (timeline.end > timeline.start)
+            if selected.any():
+                draw_intervals(ax, timeline.start[selected], timeline.end[selected], kind)
+        ax.set_ylim(0, BLOCK_HEIGHT)
+        ax.set_yticks([])
+        ax.set_ylabel(machine, rotation=0, ha='right', va='center')
+        lane[0], lane[2] = timeline, []
+
+class ColumnTableModel(QAbstractTableModel):
+    """
+    Read-only table over column arrays. Cells are formatted only when the view asks for them, so filling the model
+    costs the same for ten rows as for a million, and sorting permutes row numbers instead of moving cells.
+    An optional footer row, like the percentage of fail errors, always stays last.
+    """
+    def __init__(self, headers, time_format=TIME_FORMAT, parent=None):
+        super().__init__(parent)
+        self.headers = headers
+        self.time_format = time_format
+        self.cells = []  # Per column a function from row number to cell text
+        self.keys = []  # Per column integer sort keys
+        self.order = np.zeros(0, dtype=np.int64)
+        self.footer = None
+        self.sort_column, self.sort_order = -1, Qt.AscendingOrder
+
+    def set_columns(self, columns, footer=None):
+        """ Show new columns (Series or Index of equal length) and keep the current sorting """
+        self.beginResetModel()
+        prepared = [self.prepare_column(values) for values in columns]
+        self.cells = [cells for cells, _ in prepared]
+        self.keys = [keys for _, keys in prepared]
+        self.order = np.arange(len(self.keys[0]) if self.keys else 0)
+        self.footer = footer
+        self.apply_sort()
+        self.endResetModel()
+
+    def prepare_column(self, values):
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            categorical = pd.Categorical(values)
+            codes = np.asarray(categorical.codes)
+            categories = np.append(np.asarray(categorical.categories, dtype=object), '')  # Code -1 shows as empty
+            rank = np.append(np.argsort(np.argsort(categories[:-1])), -1)
+            return (lambda row: categories[codes[row]]), rank[codes]
+        if values.dtype.kind == 'M':
+            times = values.to_numpy(dtype='datetime64[ns]').view(np.int64)
+            return (lambda row: pd.Timestamp(times[row]).strftime(self.time_format)), times
+        if values.dtype.kind in 'biu':
+            numbers = values.to_numpy()
+            return (lambda row: str(numbers[row])), numbers
+        if values.dtype.kind == 'f':
+            numbers = values.to_numpy()
+            return (lambda row: '' if np.isnan(numbers[row]) else f"{numbers[row]:.10g}"), np.nan_to_num(numbers, nan=-np.inf)
+        texts = values.to_numpy(dtype=object)
+        return (lambda row: str(texts[row])), pd.factorize(texts, sort=True)[0]
+
+    def rowCount(self, parent=None):
+        return len(self.order) + (self.footer is not None)
+
+    def columnCount(self, parent=None):
+        return len(self.headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        if index.row() >= len(self.order):
+            return self.footer[index.column()]
+        return self.cells[index.column()](self.order[index.row()])
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return super().headerData(section, orientation, role)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.layoutAboutToBeChanged.emit()
+        self.sort_column, self.sort_order = column, order
+        self.apply_sort()
+        self.layoutChanged.emit()
+
+    def apply_sort(self):
+        """ Stable sort of the rows, rows with equal keys keep their order in both directions """
+        if self.sort_column < 0 or not self.keys:
+            self.order = np.arange(len(self.order))
+            return
+        keys = self.keys[self.sort_column]
+        if self.sort_order == Qt.AscendingOrder:
+            self.order = np.argsort(keys, kind='stable')
+        else:
+            self.order = (len(keys) - 1 - np.argsort(keys[::-1], kind='stable'))[::-1]
+
+def table_view(model):
+    """ Sortable table view with stretched columns, initially in the order of the model """
+    table = QTableView()
+    table.setModel(model)
+    table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+    table.setSortingEnabled(True)
+    table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+    return table
+
+class HistoryView(QWidget):
+    """ Widget showing a History, refresh fills it only if the history or its data changed since the last time """
+    def __init__(self, history, parent=None):
+        super().__init__(parent)
+        self.history = history
+        self.shown = None
+
+    def set_history(self, history):
+        self.history = history
+
+    def refresh(self):
+        shown = (self.history, self.history.version if self.history is not None else None)
+        if self.shown is None or shown[0] is not self.shown[0] or shown[1] != self.shown[1]:
+            name = " ".join(["populate", type(self).__name__] + ([self.table_type] if hasattr(self, 'table_type') else []))
+            with span(name, rows=len(self.history) if self.history is not None else 0):
+                self.populate_table()
+            self.shown = shown
+
+class ErrorTable(HistoryView):
+    def __init__(self, history, parent=None, table_type='count'):
+        super().__init__(history, parent)
+        self.table_type = table_type
+        self.initUI()
+
+    def initUI(self):
+        layout = QVBoxLayout(self)
+        self.model = ColumnTableModel(TABLE_HEADERS[self.table_type], parent=self)
+        self.table = table_view(self.model)
+        layout.addWidget(self.table)
+        self.setLayout(layout)
+        self.populate_table()
+
+    def populate_table(self):
+        if self.history is None:
+            self.model.set_columns([])
+        elif self.table_type == 'count':
+            error_counts = self.history.error_counts()
+            self.model.set_columns([error_counts.index, error_counts])
+        elif self.table_type in ('chronology', 'fail_chronology'):
+            if self.table_type == 'chronology':
+                error_data = self.history.errors()
+            else:
+                error_data = self.history.fail_data().sort_values(by='TimeString', kind='stable')
+            self.model.set_columns([error_data['TimeString'], error_data['MsgText']])
+        elif self.table_type == 'fail':
+            error_data = self.history.fail_data()
+            error_counts = message_counts(error_data['MsgText'])
+            percentage = self.history.fail_percentage(error_data)
+            self.model.set_columns([error_counts.index, error_counts], footer=("Percentage of Fail Errors", f"{percentage:.2f}%"))
+
+class ErrorTableDay(HistoryView):
+    def __init__(self, history, parent=None, table_type='count'):
+        super().__init__(history, parent)
+        self.table_type = table_type
+        self.initUI()
+
+    def initUI(self):
+        layout = QVBoxLayout(self)
+        self.model = ColumnTableModel(TABLE_HEADERS[self.table_type], parent=self)
+        self.table = table_view(self.model)
+        layout.addWidget(self.table)
+        self.setLayout(layout)
+        self.populate_table()
+
+    def populate_table(self):
+        if self.history is None:
+            self.model.set_columns([])
+        elif self.table_type == 'fail':
+            fail_data = self.get_fail_data_day()
+            error_counts = message_counts(fail_data['MsgText'])
+            percentage = self.calculate_percentage_fail(fail_data)
+            self.model.set_columns([error_counts.index, error_counts], footer=("Percentage of Fail Errors", f"{percentage:.2f}%"))
+        elif self.table_type == 'fail_chronology':
+            fail_data = self.get_fail_data_day().sort_values(by='TimeString', kind='stable')
+            self.model.set_columns([fail_data['TimeString'], fail_data['MsgText']])
+
+    def get_fail_data_day(self):
+        # Every end of a coating process within the day, no matter how long the process was
+        return self.history.end_event_fail_data()
+
+    def calculate_percentage_fail(self, fail_data):
+        return self.history.fail_percentage(fail_data)
+
+
+class StatisticsTab(HistoryView):
+    def __init__(self, history, parent=None):
+        super().__init__(history, parent)
+        self.initUI()
+
+    def initUI(self):
+        layout = QVBoxLayout(self)
+
+        # Add the plot
+        self.fig, self.ax = plt.subplots()
+        self.canvas = FigureCanvas(self.fig)
+        layout.addWidget(self.canvas)
+
+        # Add the statistics text
+        self.statistics_label = QLabel(self)
+        self.statistics_label.setFont(QFont("Arial", 12))
+        layout.addWidget(self.statistics_label)
+
+        self.setLayout(layout)
+        self.update_statistics()
+
+    def populate_table(self):
+        self.update_statistics()
+
+    def update_statistics(self):
+        if self.history is not None:
+            process_durations, failed_processes = self.history.process_statistics()
+
+            total_processes = len(process_durations)
+            percentage_failed = (failed_processes / total_processes) * 100 if total_processes > 0 else 0
+
+            self.ax.clear()
+            self.ax.barh(['All', 'Failed'], [total_processes, failed_processes], color=['green', 'red'])
+            self.ax.set_xlabel('Amount of Processes')
+            self.ax.xaxis.set_major_locator(plt.MaxNLocator(integer=True))
+            self.fig.tight_layout()
+            self.canvas.draw()
+
+            self.statistics_label.setText(f"Amount of all processes: {total_processes}\nAmount of failed processes: {failed_processes}\nPercentage of failed processes: {percentage_failed:.2f}%")
+        else:
+            self.ax.clear()
+            self.ax.set_title('No Data')
+            self.canvas.draw()
+            self.statistics_label.setText("Amount of all processes: 0\nAmount of failed processes: 0\nPercentage of failed processes: 0.00%")
+
+class PerformanceTab(QWidget):
+    """ The spans recorded by the tracer, newest last, and the export as a Chrome trace """
+    HEADERS = ['Stage', 'Thread', 'Start (ms)', 'Duration (ms)', 'Rows', 'Memory delta (MB)']
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        layout = QVBoxLayout(self)
+        buttons = QHBoxLayout()
+        self.record_checkbox = QCheckBox("Record")
+        self.record_checkbox.setChecked(tracer.enabled)
+        self.record_checkbox.toggled.connect(self.set_recording)
+        buttons.addWidget(self.record_checkbox)
+        for text, slot in (("Refresh", self.refresh), ("Clear", self.clear), ("Export Chrome Trace", self.export)):
+            button = QPushButton(text)
+            button.clicked.connect(slot)
+            buttons.addWidget(button)
+        buttons.addStretch()
+        layout.addLayout(buttons)
+        self.model = ColumnTableModel(self.HEADERS, parent=self)
+        layout.addWidget(table_view(self.model))
+        self.refresh()
+
+    def set_recording(self, checked):
+        tracer.enabled = checked
+
+    def refresh(self):
+        events = list(tracer.events)
+        args = [event[4] for event in events]
+        self.model.set_columns([
+            pd.Series([event[0] for event in events], dtype=object),
+            pd.Series([event[3] for event in events], dtype=object),
+            pd.Series([round(event[1] / 1e6, 2) for event in events], dtype=float),
+            pd.Series([round(event[2] / 1e6, 2) for event in events], dtype=float),
+            pd.Series([arg.get('rows', np.nan) for arg in args], dtype=float),
+            pd.Series([arg.get('memory_delta_mb', np.nan) for arg in args], dtype=float),
+        ])
+
+    def clear(self):
+        tracer.clear()
+        self.refresh()
+
+    def export(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export Chrome Trace", "trace.json", "JSON Files (*.json)")
+        if path:
+            tracer.export(path)